@@ -0,0 +1,73 @@
+"""Import and load time of bundled exchange rate tables.
+
+    python -m benchmarks.bundled_rates --entries 25100
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from itertools import islice
+
+from benchmarks.exchange_rate_index import generate_exchange_rates
+from insurrector.cached_exchange_rates import (
+    EXCHANGE_RATES_FILE,
+    load_exchange_rates,
+    write_exchange_rates,
+)
+from insurrector.exchange_rates import ExchangeRateIndex
+
+# Dependencies of the module are imported before the timed import.
+IMPORT_SCRIPT = (
+    "import array, decimal, functools, struct, time;"
+    " start = time.perf_counter();"
+    " import insurrector.cached_exchange_rates;"
+    " print(time.perf_counter() - start)"
+)
+
+
+def measure_import():
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return float(output)
+
+
+def measure_load(file_path):
+    start = time.perf_counter()
+    index = ExchangeRateIndex(*load_exchange_rates.__wrapped__(file_path))
+    return len(index.ordinals), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=25100)
+    args = parser.parse_args()
+
+    print(f"import: {measure_import() * 1000:.2f} ms")
+
+    entries, elapsed = measure_load(EXCHANGE_RATES_FILE)
+    print(f"bundled: {entries} entries loaded in {elapsed * 1000:.2f} ms")
+
+    # Weekends and holidays have no rate, so generate more days than entries.
+    exchange_rates = dict(
+        islice(
+            generate_exchange_rates(datetime(1950, 1, 1), args.entries * 2).items(),
+            args.entries,
+        )
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "exchange_rates.bin")
+        write_exchange_rates(exchange_rates, file_path)
+        entries, elapsed = measure_load(file_path)
+    print(f"generated: {entries} entries loaded in {elapsed * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Decoding of CNB range and whole-year exchange rate responses.
+
+    python -m benchmarks.cnb_decoder --years 20
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from insurrector.cnb_server import (
+    CNB_SERVER_CURRENCIES,
+    format_range_rates,
+    format_year_rates,
+)
+from insurrector.exchange_rates import parse_exchange_rates, parse_year_exchange_rates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=20)
+    args = parser.parse_args()
+
+    first_year = 2000
+    last_year = first_year + args.years - 1
+    range_texts = [
+        format_range_rates(
+            currency, datetime(first_year, 1, 1), datetime(last_year, 12, 31)
+        )
+        for currency in CNB_SERVER_CURRENCIES
+    ]
+    year_texts = [format_year_rates(year) for year in range(first_year, last_year + 1)]
+
+    for name, parse, texts in (
+        ("range", parse_exchange_rates, range_texts),
+        ("year", parse_year_exchange_rates, year_texts),
+    ):
+        rows = sum(text.count("\n") for text in texts)
+        start = time.perf_counter()
+        for text in texts:
+            parse(text)
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {rows} rows in {elapsed:.3f} s, {rows / elapsed:.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Rows per second of parsing a generated CSV export per date format.
+
+    python -m benchmarks.csv_dates --rows 200000
+"""
+
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta
+
+from insurrector.parsers.csv import CSV_DATE_FORMATS, Parser
+
+
+def generate_csv(rows, date_format, seed=0):
+    rnd = random.Random(seed)
+    first_date = datetime(2010, 1, 1)
+    lines = ["Trade Date,Activity Type,Company,Symbol,Quantity,Price,Amount"]
+    for index in range(rows):
+        trade_date = (first_date + timedelta(days=index // 50)).strftime(date_format)
+        lines.append(
+            f"{trade_date},BUY,Apple,AAPL,{rnd.randint(1, 100)},"
+            f"{rnd.random() * 100:.2f},{rnd.random() * 1000:.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    for date_format in CSV_DATE_FORMATS:
+        text = generate_csv(args.rows, date_format)
+        start = time.perf_counter()
+        activities = Parser(None).extract_activities(csv.reader(io.StringIO(text)))
+        elapsed = time.perf_counter() - start
+        print(f"{date_format}: {len(activities) / elapsed:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
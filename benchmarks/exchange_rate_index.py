@@ -0,0 +1,54 @@
+"""Exchange rate lookups of many statements in a multi-year rate table.
+
+    python -m benchmarks.exchange_rate_index --statements 100000 --years 20
+"""
+
+import argparse
+import decimal
+import random
+import time
+from datetime import datetime, timedelta
+
+from insurrector.exchange_rates import EXCHANGE_RATE_LOOKUPS, ExchangeRateIndex
+
+
+def generate_exchange_rates(first_date, days, seed=0):
+    rnd = random.Random(seed)
+    exchange_rates = {}
+    for day in range(days):
+        date = first_date + timedelta(days=day)
+        # Weekends and a few holidays have no published rate.
+        if date.weekday() < 5 and rnd.random() > 0.03:
+            exchange_rates[date] = decimal.Decimal(f"{20 + rnd.random() * 5:.3f}")
+    return exchange_rates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--statements", type=int, default=100000)
+    parser.add_argument("--years", type=int, default=20)
+    args = parser.parse_args()
+
+    rnd = random.Random(1)
+    first_date = datetime(2000, 1, 1)
+    days = args.years * 365
+    # Like CNB downloads, rates start a month before the first trade.
+    exchange_rates = generate_exchange_rates(first_date - timedelta(days=31), days + 31)
+    trade_dates = [
+        first_date + timedelta(days=rnd.randrange(days)) for _ in range(args.statements)
+    ]
+
+    start = time.perf_counter()
+    index = ExchangeRateIndex.from_exchange_rates(exchange_rates)
+    print(f"index of {len(exchange_rates)} rates: {time.perf_counter() - start:.3f} s")
+
+    for lookup in EXCHANGE_RATE_LOOKUPS:
+        start = time.perf_counter()
+        for trade_date in trade_dates:
+            index.lookup(trade_date, lookup)
+        elapsed = time.perf_counter() - start
+        print(f"{lookup}: {len(trade_dates)} lookups in {elapsed:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
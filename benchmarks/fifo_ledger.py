@@ -0,0 +1,51 @@
+"""FIFO sales of alternating buys and sells of one symbol.
+
+    python -m benchmarks.fifo_ledger --statements 100000
+"""
+
+import argparse
+import decimal
+import time
+from datetime import datetime, timedelta
+
+from insurrector.calculators.fifo import calculate_sales_czk
+from insurrector.records import Activity
+
+
+def generate_statements(count):
+    statements = []
+    first_date = datetime(2000, 1, 1)
+    for index in range(count):
+        # Every sell takes half of the preceding buy, so lots pile up.
+        activity_type, quantity = ("BUY", 2) if index % 2 == 0 else ("SELL", -1)
+        statements.append(
+            Activity(
+                trade_date=first_date + timedelta(days=index // 2),
+                currency="USD",
+                activity_type=activity_type,
+                symbol="AAPL",
+                quantity=decimal.Decimal(quantity),
+                price=decimal.Decimal(100 + index % 50),
+                exchange_rate=decimal.Decimal("22.5"),
+            )
+        )
+    return statements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--statements", type=int, default=100000)
+    args = parser.parse_args()
+
+    statements = generate_statements(args.statements)
+    start = time.perf_counter()
+    sales, purchases, _ = calculate_sales_czk(statements)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{len(statements)} statements, {len(sales)} sales,"
+        f" {len(purchases['AAPL'])} open lots in {elapsed:.3f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
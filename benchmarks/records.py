@@ -0,0 +1,81 @@
+"""Memory per row and construction throughput of activity records.
+
+    python -m benchmarks.records --rows 200000
+"""
+
+import argparse
+import decimal
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from insurrector.records import Activity
+
+
+def build_activities(rows):
+    """Activities like the CSV parser builds them, strings made per row."""
+    first_date = datetime(2000, 1, 1)
+    return [
+        Activity(
+            trade_date=first_date + timedelta(days=index % 5000),
+            settle_date="-",
+            currency="".join(["U", "SD"]),
+            activity_type="".join(["BU", "Y"]),
+            symbol=f"S{index % 300}",
+            company=f"Company {index % 300}",
+            symbol_description=f"S{index % 300} - Company {index % 300}",
+            quantity=decimal.Decimal(index % 7 + 1),
+            price=decimal.Decimal("101.25"),
+            amount=decimal.Decimal("101.25") * (index % 7 + 1),
+        )
+        for index in range(rows)
+    ]
+
+
+def build_cash_activities(rows):
+    """Revolut cash activities, which leave the stock fields unset."""
+    trade_date = datetime(2000, 1, 1)
+    return [
+        Activity(
+            trade_date=trade_date,
+            settle_date=trade_date,
+            currency="USD",
+            activity_type="CDEP",
+            symbol_description=None,
+            amount=decimal.Decimal("1000.00"),
+        )
+        for _ in range(rows)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    activities = build_activities(args.rows)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del activities
+    print(f"activity row: {memory / args.rows:.0f} B")
+
+    for name, build in (
+        ("activity", build_activities),
+        ("cash activity", build_cash_activities),
+    ):
+        start = time.perf_counter()
+        build(args.rows)
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {args.rows / elapsed:.0f} rows/s")
+
+    activities = build_activities(args.rows)
+    start = time.perf_counter()
+    for activity in activities:
+        activity.copy()
+    elapsed = time.perf_counter() - start
+    print(f"activity copy: {args.rows / elapsed:.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Rows per second of tokenizing and extracting Revolut activity rows.
+
+Compares tokenize_activities() with the previous extraction, which walked
+the page strings from every activity type and tried to parse each string as
+a Decimal to find where the symbol description ends. It also formatted the
+whole page into a debug message for every activity, so it is timed with and
+without that message.
+
+    python -m benchmarks.revolut_tokenizer --rows 60 --repeat 300
+"""
+
+import argparse
+import decimal
+import logging
+import random
+import time
+from datetime import datetime
+
+from insurrector.parsers.revolut import (
+    REVOLUT_ACTIVITY_TYPES,
+    REVOLUT_CASH_ACTIVITY_TYPES,
+    REVOLUT_DATE_FORMAT,
+    REVOLUT_NO_COMPANY_ACTIVITY_TYPES,
+    Parser,
+)
+
+logger = logging.getLogger("parsers")
+
+
+def generate_page_strings(rows, seed=1):
+    rnd = random.Random(seed)
+    page_strings = []
+    for _ in range(rows):
+        date = f"{rnd.randint(1, 12):02d}/{rnd.randint(1, 28):02d}/2020"
+        if rnd.random() < 0.1:
+            amount = f"{rnd.randint(1, 9999):,}.00"
+            page_strings += [date, date, "USD", rnd.choice(["CDEP", "CSD"]), amount]
+            continue
+
+        description = ["AAPL - APPLE INC - COM"]
+        if rnd.random() < 0.3:
+            description = ["TSLA - TESLA", " INC - COM 88160R101"]
+        page_strings += [
+            date,
+            date,
+            "USD",
+            rnd.choice(["BUY", "SELL", "DIV", "DIVNRA", "SSO"]),
+            *description,
+            str(rnd.randint(1, 100)),
+            f"{rnd.random() * 500:.2f}",
+            f"({rnd.randint(1, 99999):,}.{rnd.randint(0, 99):02d})",
+        ]
+    return page_strings
+
+
+def extract_symbol_description(parser, begin_index, page_strings):
+    symbol_description = ""
+    end_index = begin_index
+    for page_string in page_strings[begin_index:]:
+        try:
+            decimal.Decimal(parser.clean_number(page_string))
+            break
+        except decimal.InvalidOperation:
+            symbol_description += page_string
+        end_index += 1
+
+    if page_strings[end_index - 1] in REVOLUT_CASH_ACTIVITY_TYPES:
+        symbol_description = None
+
+    return end_index, symbol_description
+
+
+def extract_activity(parser, begin_index, page_strings, num_fields, log_page=True):
+    if log_page:
+        # Formatted for every activity, even with debug logging disabled.
+        logger.debug(f"Page string: {page_strings}")
+    end_index, symbol_description = extract_symbol_description(
+        parser, begin_index + 4, page_strings
+    )
+    symbol = None
+    if symbol_description is not None:
+        symbol = parser.extract_symbol(symbol_description)
+
+    activity = {
+        "trade_date": datetime.strptime(page_strings[begin_index], REVOLUT_DATE_FORMAT),
+        "settle_date": datetime.strptime(
+            page_strings[begin_index + 1], REVOLUT_DATE_FORMAT
+        ),
+        "currency": page_strings[begin_index + 2],
+        "activity_type": page_strings[begin_index + 3],
+        "symbol_description": symbol_description,
+    }
+
+    if num_fields == 8:
+        activity["symbol"] = symbol
+        activity["quantity"] = decimal.Decimal(page_strings[end_index])
+        activity["price"] = decimal.Decimal(page_strings[end_index + 1])
+        activity["amount"] = page_strings[end_index + 2]
+        if activity["activity_type"] not in REVOLUT_NO_COMPANY_ACTIVITY_TYPES:
+            activity["company"] = parser.get_stock_company(symbol_description)
+    elif num_fields == 6:
+        activity["amount"] = page_strings[end_index]
+
+    activity["amount"] = decimal.Decimal(parser.clean_number(activity["amount"]))
+
+    return activity
+
+
+def extract_activities_reference(parser, page_strings, log_page=True):
+    """Activities of a page as extracted before tokenize_activities()."""
+    activities = []
+    for index, page_string in enumerate(page_strings):
+        if page_string in REVOLUT_ACTIVITY_TYPES:
+            num_fields = 8
+        elif page_string in REVOLUT_CASH_ACTIVITY_TYPES:
+            num_fields = 6
+        else:
+            continue
+        activities.append(
+            extract_activity(parser, index - 3, page_strings, num_fields, log_page)
+        )
+    return activities
+
+
+def extract_activities_reference_without_log(parser, page_strings):
+    return extract_activities_reference(parser, page_strings, log_page=False)
+
+
+def extract_activities(parser, page_strings):
+    return [
+        parser.extract_activity(*row)
+        for row in parser.tokenize_activities(page_strings)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=60, help="Rows per page.")
+    parser.add_argument("--repeat", type=int, default=300, help="Pages parsed.")
+    args = parser.parse_args()
+
+    revolut_parser = Parser(None)
+    page_strings = generate_page_strings(args.rows)
+    activities = extract_activities(revolut_parser, page_strings)
+    if [dict(activity.items()) for activity in activities] != (
+        extract_activities_reference(revolut_parser, page_strings)
+    ):
+        raise SystemExit("The extractions differ.")
+
+    print(f"rows per page: {len(activities)}")
+    for name, extract in (
+        ("before", extract_activities_reference),
+        ("before without page log", extract_activities_reference_without_log),
+        ("after", extract_activities),
+    ):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            extract(revolut_parser, page_strings)
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {len(activities) * args.repeat / elapsed:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Pricing sold lots with Decimal against a minimal scaled-integer engine.
+
+    python -m benchmarks.sale_pricing --lots 200000
+
+The scaled-integer engine is the one removed from calculators/fixed_point.py.
+It splits every Decimal into an int coefficient and exponent, multiplies and
+subtracts ints and rounds over 28 digits half up like the Decimal context.
+"""
+
+import argparse
+import decimal
+import random
+import time
+
+import insurrector.calculators.fifo  # noqa: F401, sets the rounding of sales
+
+PRECISION = 28
+LIMIT = 10**PRECISION
+
+
+def to_scaled(value):
+    _, _, exponent = value.as_tuple()
+    return int(value.scaleb(-exponent)), exponent
+
+
+def round_scaled(coefficient, exponent):
+    magnitude = abs(coefficient)
+    if magnitude < LIMIT:
+        return coefficient, exponent
+
+    shift = len(str(magnitude)) - PRECISION
+    magnitude, remainder = divmod(magnitude, 10**shift)
+    if 2 * remainder >= 10**shift:
+        magnitude += 1
+    if magnitude == LIMIT:
+        magnitude //= 10
+        shift += 1
+    return (magnitude if coefficient > 0 else -magnitude), exponent + shift
+
+
+def multiply_scaled(left, right):
+    return round_scaled(left[0] * right[0], left[1] + right[1])
+
+
+def subtract_scaled(left, right):
+    exponent = min(left[1], right[1])
+    return round_scaled(
+        left[0] * 10 ** (left[1] - exponent) - right[0] * 10 ** (right[1] - exponent),
+        exponent,
+    )
+
+
+def to_decimal(value):
+    return decimal.Decimal(value[0]).scaleb(value[1])
+
+
+def price_decimal(
+    purchase_item_price, purchase_rate, quantity, sell_item_price, sell_rate
+):
+    """Sold lot prices the way SalesCalculatorCzechia computes them."""
+    purchase_price_in_currency = purchase_item_price * quantity
+    purchase_price = purchase_price_in_currency * purchase_rate
+    sell_price_in_currency = sell_item_price * quantity
+    sell_price = sell_price_in_currency * sell_rate
+    return (
+        purchase_price_in_currency,
+        purchase_price,
+        sell_price_in_currency,
+        sell_price,
+        sell_price - purchase_price,
+        sell_price_in_currency - purchase_price_in_currency,
+    )
+
+
+def price_scaled(
+    purchase_item_price, purchase_rate, quantity, sell_item_price, sell_rate
+):
+    """Sold lot prices of scaled ints."""
+    purchase_price_in_currency = multiply_scaled(purchase_item_price, quantity)
+    purchase_price = multiply_scaled(purchase_price_in_currency, purchase_rate)
+    sell_price_in_currency = multiply_scaled(sell_item_price, quantity)
+    sell_price = multiply_scaled(sell_price_in_currency, sell_rate)
+    return (
+        purchase_price_in_currency,
+        purchase_price,
+        sell_price_in_currency,
+        sell_price,
+        subtract_scaled(sell_price, purchase_price),
+        subtract_scaled(sell_price_in_currency, purchase_price_in_currency),
+    )
+
+
+def price_scaled_decimals(*values):
+    """Scaled-integer prices of Decimals, converting in and out per lot."""
+    return tuple(to_decimal(price) for price in price_scaled(*map(to_scaled, values)))
+
+
+def random_decimal(rnd, digits, places):
+    return decimal.Decimal(rnd.randrange(1, 10**digits)).scaleb(-places)
+
+
+def generate_lots(count, digits, seed=0):
+    """Lots as (purchase price, purchase rate, quantity, sell price, sell rate)."""
+    rnd = random.Random(seed)
+    return [
+        (
+            random_decimal(rnd, digits, 2),
+            random_decimal(rnd, 5, 3),
+            random_decimal(rnd, min(digits, 6), rnd.randrange(0, 5)),
+            random_decimal(rnd, digits, 2),
+            random_decimal(rnd, 5, 3),
+        )
+        for _ in range(count)
+    ]
+
+
+def check(lots):
+    for lot in lots:
+        expected = [price.as_tuple() for price in price_decimal(*lot)]
+        if [price.as_tuple() for price in price_scaled_decimals(*lot)] != expected:
+            raise AssertionError(f"Scaled prices of {lot} differ from Decimal.")
+
+
+def measure(func, lots):
+    start = time.perf_counter()
+    for lot in lots:
+        func(*lot)
+    return (time.perf_counter() - start) / len(lots) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lots", type=int, default=200000)
+    args = parser.parse_args()
+
+    # Long values make products exceed 28 digits, so rounding is checked too.
+    check(generate_lots(args.lots // 10, 6) + generate_lots(args.lots // 10, 20, 1))
+    print("scaled-integer prices equal Decimal prices")
+
+    lots = generate_lots(args.lots, 6)
+    scaled_lots = [tuple(map(to_scaled, lot)) for lot in lots]
+    for name, func, inputs in (
+        ("decimal", price_decimal, lots),
+        ("scaled ints with conversion", price_scaled_decimals, lots),
+        ("scaled ints only", price_scaled, scaled_lots),
+    ):
+        print(f"{name}: {measure(func, inputs):.2f} us per lot")
+
+
+if __name__ == "__main__":
+    main()
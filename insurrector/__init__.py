@@ -1,8 +1,18 @@
-CNB_BASE_URL = "https://www.cnb.cz/cs/financni-trhy/devizovy-trh/kurzy-devizoveho-trhu/kurzy-devizoveho-trhu/vybrane.txt?"
+import os
+
+CNB_DEFAULT_URL = "https://www.cnb.cz/cs/financni-trhy/devizovy-trh/kurzy-devizoveho-trhu/kurzy-devizoveho-trhu/"
+CNB_URL = os.environ.get("INSURRECTOR_CNB_URL", CNB_DEFAULT_URL)
+CNB_BASE_URL = CNB_URL + "vybrane.txt?"
+CNB_YEAR_URL = CNB_URL + "rok.txt?"
+CNB_YEAR_DATE_COLUMN = "Datum"
 
 CNB_DATE_FORMAT = "%d.%m.%Y"
 CNB_SPLIT_BY_MONTHS = 3
 CNB_CSV_HEADER_ROWS = 2
+CNB_MAX_WORKERS = 4
+CNB_MAX_ATTEMPTS = 4
+CNB_RETRY_BACKOFF = 0.5
+CNB_TIMEOUT = 30
 
 MFCR_DATE_FORMAT = "%d.%m.%Y"
 MFCR_DIGIT_PRECISION = "0.01"
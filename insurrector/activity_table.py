@@ -0,0 +1,300 @@
+import decimal
+import logging
+from datetime import datetime
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from insurrector.exchange_rates import (
+    CNB_SOURCE_RANGE,
+    EXCHANGE_RATE_BASE_CURRENCY,
+    EXCHANGE_RATE_LOOKUP_LAST,
+    EXCHANGE_RATE_LOOKUP_NEAREST,
+    load_exchange_rates_range,
+)
+
+logger = logging.getLogger("calculations")
+
+decimal.getcontext().rounding = decimal.ROUND_HALF_UP
+
+ACTIVITY_TABLE_DECIMAL_COLUMNS = ["quantity", "price", "amount"]
+ACTIVITY_TABLE_CHUNK_SIZE = 10000
+ACTIVITY_TABLE_EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+
+def require_numpy():
+    if numpy is None:
+        logger.error(
+            "Activity tables require NumPy. Please, install insurrector with the numpy extra: pip install '.[numpy]'."
+        )
+        raise SystemExit(1)
+
+
+def encode_categories(values, categories):
+    """Dictionary-encode values as int32 codes into the {value: code} categories.
+
+    New values are added to categories, so chunks encoded with the same
+    categories share their codes.
+    """
+    return numpy.fromiter(
+        (categories.setdefault(value, len(categories)) for value in values),
+        dtype=numpy.int32,
+        count=len(values),
+    )
+
+
+def to_decimal_column(values):
+    # Some parsers keep amounts as strings, None marks a missing value.
+    column = numpy.empty(len(values), dtype=object)
+    column[:] = [
+        decimal.Decimal(value) if type(value) is str else value for value in values
+    ]
+    return column
+
+
+def concatenate_columns(columns, dtype):
+    if not columns:
+        return numpy.empty(0, dtype=dtype)
+    return numpy.concatenate(columns)
+
+
+def to_float_column(values):
+    return numpy.fromiter(
+        (numpy.nan if value is None else float(value) for value in values),
+        dtype=numpy.float64,
+        count=len(values),
+    )
+
+
+def find_exchange_rate_positions(ordinals, days, lookup=EXCHANGE_RATE_LOOKUP_NEAREST):
+    """Positions of the rates ExchangeRateIndex.find picks for sorted ordinals."""
+    index = numpy.searchsorted(ordinals, days, side="right")
+    previous = numpy.maximum(index - 1, 0)
+
+    if lookup == EXCHANGE_RATE_LOOKUP_LAST:
+        for day in days[index == 0].tolist():
+            logger.warning(
+                f"No exchange rate published before [{datetime.fromordinal(day)}], using the earliest one."
+            )
+        return previous
+
+    following = numpy.minimum(index, len(ordinals) - 1)
+    use_previous = (index > 0) & (
+        (index == len(ordinals))
+        | (days - ordinals[previous] <= ordinals[following] - days)
+    )
+    return numpy.where(use_previous, previous, following)
+
+
+class ActivityTable(object):
+    """Activities stored as columns for vectorized batch calculations.
+
+    Trade dates are day ordinals and numeric fields are float64 arrays for
+    bulk analytics. Their Decimal values are kept in object columns, so exact
+    tax figures can still be summed without rounding. Symbols, activity types
+    and currencies are dictionary-encoded as int32 codes into lists of the
+    distinct values.
+    """
+
+    def __init__(self, activities):
+        self.load_chunks([activities])
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Build a table from an iterable of activity lists.
+
+        Only the columns and the current chunk are held in memory, not the
+        activities of all chunks.
+        """
+        table = cls([])
+        table.load_chunks(chunks)
+        return table
+
+    def load_chunks(self, chunks):
+        require_numpy()
+
+        trade_days = []
+        decimal_columns = {name: [] for name in ACTIVITY_TABLE_DECIMAL_COLUMNS}
+        columns = {name: [] for name in ACTIVITY_TABLE_DECIMAL_COLUMNS}
+        symbols, activity_types, currencies = {}, {}, {}
+        symbol_codes, activity_type_codes, currency_codes = [], [], []
+        for activities in chunks:
+            trade_days.append(
+                numpy.fromiter(
+                    (activity["trade_date"].toordinal() for activity in activities),
+                    dtype=numpy.int64,
+                    count=len(activities),
+                )
+            )
+            for name in ACTIVITY_TABLE_DECIMAL_COLUMNS:
+                column = to_decimal_column(
+                    [activity.get(name) for activity in activities]
+                )
+                decimal_columns[name].append(column)
+                columns[name].append(to_float_column(column.tolist()))
+
+            symbol_codes.append(
+                encode_categories(
+                    [activity.get("symbol") for activity in activities], symbols
+                )
+            )
+            activity_type_codes.append(
+                encode_categories(
+                    [activity["activity_type"] for activity in activities],
+                    activity_types,
+                )
+            )
+            currency_codes.append(
+                encode_categories(
+                    [activity["currency"] for activity in activities], currencies
+                )
+            )
+
+        self.trade_days = concatenate_columns(trade_days, numpy.int64)
+        self.decimal_columns = {
+            name: concatenate_columns(column_chunks, object)
+            for name, column_chunks in decimal_columns.items()
+        }
+        self.columns = {
+            name: concatenate_columns(column_chunks, numpy.float64)
+            for name, column_chunks in columns.items()
+        }
+        self.symbol_codes = concatenate_columns(symbol_codes, numpy.int32)
+        self.symbols = list(symbols)
+        self.activity_type_codes = concatenate_columns(activity_type_codes, numpy.int32)
+        self.activity_types = list(activity_types)
+        self.currency_codes = concatenate_columns(currency_codes, numpy.int32)
+        self.currencies = list(currencies)
+
+        self.exchange_rate_days = None
+        self.exchange_rates = None
+        self.exchange_rate_decimals = None
+
+    def __len__(self):
+        return len(self.trade_days)
+
+    def get_years(self):
+        days = (self.trade_days - ACTIVITY_TABLE_EPOCH_ORDINAL).astype("datetime64[D]")
+        return days.astype("datetime64[Y]").astype(numpy.int64) + 1970
+
+    def get_activity_types_mask(self, activity_types):
+        codes = [
+            code
+            for code, activity_type in enumerate(self.activity_types)
+            if activity_type in activity_types
+        ]
+        return numpy.isin(self.activity_type_codes, codes)
+
+    def populate_exchange_rates(
+        self,
+        use_cnb,
+        lookup=EXCHANGE_RATE_LOOKUP_NEAREST,
+        store=None,
+        source=CNB_SOURCE_RANGE,
+        provider=None,
+    ):
+        """Join exchange rates of all activities, one sorted search per currency.
+
+        Picks the same rates as populate_exchange_rates() does for a list of
+        activities.
+        """
+        if not len(self):
+            return
+
+        exchange_rates = load_exchange_rates_range(
+            datetime.fromordinal(int(self.trade_days.min())),
+            datetime.fromordinal(int(self.trade_days.max())),
+            use_cnb,
+            self.currencies,
+            store,
+            source,
+            provider=provider,
+        )
+
+        self.exchange_rate_days = numpy.empty(len(self), dtype=numpy.int64)
+        self.exchange_rate_decimals = numpy.empty(len(self), dtype=object)
+        for code, currency in enumerate(self.currencies):
+            rows = numpy.flatnonzero(self.currency_codes == code)
+            days = self.trade_days[rows]
+            if currency == EXCHANGE_RATE_BASE_CURRENCY:
+                self.exchange_rate_days[rows] = days
+                self.exchange_rate_decimals[rows] = decimal.Decimal(1)
+                continue
+
+            index = exchange_rates.indexes[currency]
+            ordinals = numpy.asarray(index.ordinals, dtype=numpy.int64)
+            positions = find_exchange_rate_positions(ordinals, days, lookup=lookup)
+            self.exchange_rate_days[rows] = ordinals[positions]
+
+            # Rates may be decoded on access, so decode each used rate once.
+            used_positions, inverse = numpy.unique(positions, return_inverse=True)
+            rates = to_decimal_column(
+                [index.rates[position] for position in used_positions.tolist()]
+            )
+            self.exchange_rate_decimals[rows] = rates[inverse]
+
+        self.exchange_rates = to_float_column(self.exchange_rate_decimals.tolist())
+
+    def get_column(self, name, exact=False):
+        """Column by name, as Decimals with exact.
+
+        "amount_czk" is the amount converted with the populated exchange rates.
+        """
+        if name == "amount_czk":
+            if self.exchange_rates is None:
+                logger.error("Exchange rates of the activity table are not populated.")
+                raise SystemExit(1)
+            if exact:
+                return to_decimal_column(
+                    [
+                        None if amount is None else amount * exchange_rate
+                        for amount, exchange_rate in zip(
+                            self.decimal_columns["amount"].tolist(),
+                            self.exchange_rate_decimals.tolist(),
+                        )
+                    ]
+                )
+            return self.columns["amount"] * self.exchange_rates
+
+        if exact:
+            return self.decimal_columns[name]
+        return self.columns[name]
+
+    def sum_by_year_and_symbol(self, name, activity_types=None, exact=False):
+        """Sum a column per (year, symbol) as {(year, symbol): sum}.
+
+        Only activities of activity_types are summed, if given. Missing values
+        are skipped. Float sums are vectorized. Exact sums add the Decimals of
+        every group in Python.
+        """
+        values = self.get_column(name, exact)
+        years = self.get_years()
+        symbol_codes = self.symbol_codes
+        if activity_types is not None:
+            mask = self.get_activity_types_mask(activity_types)
+            values, years, symbol_codes = values[mask], years[mask], symbol_codes[mask]
+
+        keys = years * len(self.symbols) + symbol_codes
+        group_keys, groups = numpy.unique(keys, return_inverse=True)
+        if exact:
+            sums = [decimal.Decimal(0)] * len(group_keys)
+            for group, value in zip(groups.tolist(), values.tolist()):
+                if value is not None:
+                    sums[group] += value
+        else:
+            sums = numpy.bincount(
+                groups,
+                weights=numpy.where(numpy.isnan(values), 0, values),
+                minlength=len(group_keys),
+            ).tolist()
+
+        return {
+            (year, self.symbols[symbol_code]): total
+            for year, symbol_code, total in zip(
+                (group_keys // len(self.symbols)).tolist(),
+                (group_keys % len(self.symbols)).tolist(),
+                sums,
+            )
+        }
@@ -1,521 +1,89 @@
 import decimal
-from datetime import datetime
-
-from insurrector import CNB_DATE_FORMAT
+import os
+import struct
+import sys
+from array import array
+from functools import lru_cache
 
 decimal.getcontext().rounding = decimal.ROUND_HALF_UP
 
-exchange_rates = {
-    "02.01.2019": "22.594",
-    "03.01.2019": "22.634",
-    "04.01.2019": "22.494",
-    "07.01.2019": "22.347",
-    "08.01.2019": "22.416",
-    "09.01.2019": "22.376",
-    "10.01.2019": "22.221",
-    "11.01.2019": "22.199",
-    "14.01.2019": "22.290",
-    "15.01.2019": "22.382",
-    "16.01.2019": "22.446",
-    "17.01.2019": "22.407",
-    "18.01.2019": "22.432",
-    "21.01.2019": "22.528",
-    "22.01.2019": "22.559",
-    "23.01.2019": "22.605",
-    "24.01.2019": "22.659",
-    "25.01.2019": "22.644",
-    "28.01.2019": "22.529",
-    "29.01.2019": "22.541",
-    "30.01.2019": "22.579",
-    "31.01.2019": "22.427",
-    "01.02.2019": "22.398",
-    "04.02.2019": "22.480",
-    "05.02.2019": "22.508",
-    "06.02.2019": "22.629",
-    "07.02.2019": "22.747",
-    "08.02.2019": "22.745",
-    "11.02.2019": "22.845",
-    "12.02.2019": "22.901",
-    "13.02.2019": "22.819",
-    "14.02.2019": "22.885",
-    "15.02.2019": "22.823",
-    "18.02.2019": "22.703",
-    "19.02.2019": "22.771",
-    "20.02.2019": "22.646",
-    "21.02.2019": "22.586",
-    "22.02.2019": "22.662",
-    "25.02.2019": "22.589",
-    "26.02.2019": "22.594",
-    "27.02.2019": "22.532",
-    "28.02.2019": "22.425",
-    "01.03.2019": "22.520",
-    "04.03.2019": "22.600",
-    "05.03.2019": "22.614",
-    "06.03.2019": "22.641",
-    "07.03.2019": "22.720",
-    "08.03.2019": "22.848",
-    "11.03.2019": "22.818",
-    "12.03.2019": "22.768",
-    "13.03.2019": "22.711",
-    "14.03.2019": "22.724",
-    "15.03.2019": "22.694",
-    "18.03.2019": "22.571",
-    "19.03.2019": "22.537",
-    "20.03.2019": "22.587",
-    "21.03.2019": "22.528",
-    "22.03.2019": "22.761",
-    "25.03.2019": "22.752",
-    "26.03.2019": "22.823",
-    "27.03.2019": "22.912",
-    "28.03.2019": "22.934",
-    "29.03.2019": "22.968",
-    "01.04.2019": "22.955",
-    "02.04.2019": "22.990",
-    "03.04.2019": "22.876",
-    "04.04.2019": "22.910",
-    "05.04.2019": "22.800",
-    "08.04.2019": "22.794",
-    "09.04.2019": "22.716",
-    "10.04.2019": "22.711",
-    "11.04.2019": "22.732",
-    "12.04.2019": "22.633",
-    "15.04.2019": "22.653",
-    "16.04.2019": "22.701",
-    "17.04.2019": "22.702",
-    "18.04.2019": "22.826",
-    "23.04.2019": "22.896",
-    "24.04.2019": "22.950",
-    "25.04.2019": "23.137",
-    "26.04.2019": "23.091",
-    "29.04.2019": "23.028",
-    "30.04.2019": "22.864",
-    "02.05.2019": "22.875",
-    "03.05.2019": "23.055",
-    "06.05.2019": "22.962",
-    "07.05.2019": "23.005",
-    "09.05.2019": "22.983",
-    "10.05.2019": "22.915",
-    "13.05.2019": "22.918",
-    "14.05.2019": "22.942",
-    "15.05.2019": "23.035",
-    "16.05.2019": "22.933",
-    "17.05.2019": "23.048",
-    "20.05.2019": "23.073",
-    "21.05.2019": "23.096",
-    "22.05.2019": "23.089",
-    "23.05.2019": "23.181",
-    "24.05.2019": "23.091",
-    "27.05.2019": "23.074",
-    "28.05.2019": "23.092",
-    "29.05.2019": "23.179",
-    "30.05.2019": "23.208",
-    "31.05.2019": "23.153",
-    "03.06.2019": "23.093",
-    "04.06.2019": "22.906",
-    "05.06.2019": "22.770",
-    "06.06.2019": "22.775",
-    "07.06.2019": "22.745",
-    "10.06.2019": "22.675",
-    "11.06.2019": "22.651",
-    "12.06.2019": "22.623",
-    "13.06.2019": "22.659",
-    "14.06.2019": "22.674",
-    "17.06.2019": "22.752",
-    "18.06.2019": "22.797",
-    "19.06.2019": "22.874",
-    "20.06.2019": "22.663",
-    "21.06.2019": "22.632",
-    "24.06.2019": "22.465",
-    "25.06.2019": "22.438",
-    "26.06.2019": "22.434",
-    "27.06.2019": "22.372",
-    "28.06.2019": "22.363",
-    "01.07.2019": "22.453",
-    "02.07.2019": "22.527",
-    "03.07.2019": "22.535",
-    "04.07.2019": "22.534",
-    "08.07.2019": "22.745",
-    "09.07.2019": "22.800",
-    "10.07.2019": "22.785",
-    "11.07.2019": "22.689",
-    "12.07.2019": "22.742",
-    "15.07.2019": "22.694",
-    "16.07.2019": "22.796",
-    "17.07.2019": "22.829",
-    "18.07.2019": "22.811",
-    "19.07.2019": "22.756",
-    "22.07.2019": "22.771",
-    "23.07.2019": "22.866",
-    "24.07.2019": "22.927",
-    "25.07.2019": "22.961",
-    "26.07.2019": "22.932",
-    "29.07.2019": "23.033",
-    "30.07.2019": "22.996",
-    "31.07.2019": "23.014",
-    "01.08.2019": "23.326",
-    "02.08.2019": "23.199",
-    "05.08.2019": "23.052",
-    "06.08.2019": "22.999",
-    "07.08.2019": "22.960",
-    "08.08.2019": "23.041",
-    "09.08.2019": "23.068",
-    "12.08.2019": "23.074",
-    "13.08.2019": "23.019",
-    "14.08.2019": "23.135",
-    "15.08.2019": "23.211",
-    "16.08.2019": "23.236",
-    "19.08.2019": "23.219",
-    "20.08.2019": "23.289",
-    "21.08.2019": "23.231",
-    "22.08.2019": "23.261",
-    "23.08.2019": "23.274",
-    "26.08.2019": "23.199",
-    "27.08.2019": "23.252",
-    "28.08.2019": "23.322",
-    "29.08.2019": "23.344",
-    "30.08.2019": "23.484",
-    "02.09.2019": "23.632",
-    "03.09.2019": "23.665",
-    "04.09.2019": "23.444",
-    "05.09.2019": "23.379",
-    "06.09.2019": "23.424",
-    "09.09.2019": "23.431",
-    "10.09.2019": "23.431",
-    "11.09.2019": "23.507",
-    "12.09.2019": "23.565",
-    "13.09.2019": "23.286",
-    "16.09.2019": "23.461",
-    "17.09.2019": "23.499",
-    "18.09.2019": "23.424",
-    "19.09.2019": "23.398",
-    "20.09.2019": "23.490",
-    "23.09.2019": "23.567",
-    "24.09.2019": "23.514",
-    "25.09.2019": "23.550",
-    "26.09.2019": "23.636",
-    "27.09.2019": "23.633",
-    "30.09.2019": "23.707",
-    "01.10.2019": "23.618",
-    "02.10.2019": "23.561",
-    "03.10.2019": "23.506",
-    "04.10.2019": "23.444",
-    "07.10.2019": "23.451",
-    "08.10.2019": "23.488",
-    "09.10.2019": "23.518",
-    "10.10.2019": "23.476",
-    "11.10.2019": "23.372",
-    "14.10.2019": "23.411",
-    "15.10.2019": "23.458",
-    "16.10.2019": "23.365",
-    "17.10.2019": "23.107",
-    "18.10.2019": "23.026",
-    "21.10.2019": "22.940",
-    "22.10.2019": "22.974",
-    "23.10.2019": "23.051",
-    "24.10.2019": "23.003",
-    "25.10.2019": "23.022",
-    "29.10.2019": "23.022",
-    "30.10.2019": "22.969",
-    "31.10.2019": "22.871",
-    "01.11.2019": "22.906",
-    "04.11.2019": "22.866",
-    "05.11.2019": "22.984",
-    "06.11.2019": "22.980",
-    "07.11.2019": "23.048",
-    "08.11.2019": "23.099",
-    "11.11.2019": "23.103",
-    "12.11.2019": "23.152",
-    "13.11.2019": "23.247",
-    "14.11.2019": "23.232",
-    "15.11.2019": "23.185",
-    "18.11.2019": "23.135",
-    "19.11.2019": "23.081",
-    "20.11.2019": "23.099",
-    "21.11.2019": "23.010",
-    "22.11.2019": "23.069",
-    "25.11.2019": "23.151",
-    "26.11.2019": "23.145",
-    "27.11.2019": "23.176",
-    "28.11.2019": "23.240",
-    "29.11.2019": "23.233",
-    "02.12.2019": "23.166",
-    "03.12.2019": "23.056",
-    "04.12.2019": "23.016",
-    "05.12.2019": "23.009",
-    "06.12.2019": "23.017",
-    "09.12.2019": "23.047",
-    "10.12.2019": "23.043",
-    "11.12.2019": "23.042",
-    "12.12.2019": "22.915",
-    "13.12.2019": "22.831",
-    "16.12.2019": "22.863",
-    "17.12.2019": "22.801",
-    "18.12.2019": "22.933",
-    "19.12.2019": "22.915",
-    "20.12.2019": "22.937",
-    "23.12.2019": "23.025",
-    "27.12.2019": "22.873",
-    "30.12.2019": "22.757",
-    "31.12.2019": "22.621",
-    "02.01.2020": "22.702",
-    "03.01.2020": "22.753",
-    "06.01.2020": "22.601",
-    "07.01.2020": "22.626",
-    "08.01.2020": "22.739",
-    "09.01.2020": "22.733",
-    "10.01.2020": "22.780",
-    "13.01.2020": "22.677",
-    "14.01.2020": "22.634",
-    "15.01.2020": "22.567",
-    "16.01.2020": "22.538",
-    "17.01.2020": "22.638",
-    "20.01.2020": "22.667",
-    "21.01.2020": "22.552",
-    "22.01.2020": "22.668",
-    "23.01.2020": "22.686",
-    "24.01.2020": "22.798",
-    "27.01.2020": "22.883",
-    "28.01.2020": "22.916",
-    "29.01.2020": "22.913",
-    "30.01.2020": "22.894",
-    "31.01.2020": "22.810",
-    "03.02.2020": "22.750",
-    "04.02.2020": "22.761",
-    "05.02.2020": "22.732",
-    "06.02.2020": "22.627",
-    "07.02.2020": "22.817",
-    "10.02.2020": "22.851",
-    "11.02.2020": "22.897",
-    "12.02.2020": "22.792",
-    "13.02.2020": "22.851",
-    "14.02.2020": "22.897",
-    "17.02.2020": "22.883",
-    "18.02.2020": "23.023",
-    "19.02.2020": "23.113",
-    "20.02.2020": "23.205",
-    "21.02.2020": "23.206",
-    "24.02.2020": "23.284",
-    "25.02.2020": "23.269",
-    "26.02.2020": "23.308",
-    "27.02.2020": "23.062",
-    "28.02.2020": "23.124",
-    "02.03.2020": "22.952",
-    "03.03.2020": "22.919",
-    "04.03.2020": "22.779",
-    "05.03.2020": "22.665",
-    "06.03.2020": "22.459",
-    "09.03.2020": "22.265",
-    "10.03.2020": "22.570",
-    "11.03.2020": "22.737",
-    "12.03.2020": "23.310",
-    "13.03.2020": "23.449",
-    "16.03.2020": "24.169",
-    "17.03.2020": "24.569",
-    "18.03.2020": "24.834",
-    "19.03.2020": "25.567",
-    "20.03.2020": "25.406",
-    "23.03.2020": "25.629",
-    "24.03.2020": "25.648",
-    "25.03.2020": "25.351",
-    "26.03.2020": "25.084",
-    "27.03.2020": "24.879",
-    "30.03.2020": "24.759",
-    "31.03.2020": "24.943",
-    "01.04.2020": "25.039",
-    "02.04.2020": "25.287",
-    "03.04.2020": "25.535",
-    "06.04.2020": "25.567",
-    "07.04.2020": "24.995",
-    "08.04.2020": "25.021",
-    "09.04.2020": "24.758",
-    "14.04.2020": "24.494",
-    "15.04.2020": "24.751",
-    "16.04.2020": "24.850",
-    "17.04.2020": "25.009",
-    "20.04.2020": "25.163",
-    "21.04.2020": "25.330",
-    "22.04.2020": "25.334",
-    "23.04.2020": "25.573",
-    "24.04.2020": "25.292",
-    "27.04.2020": "25.050",
-    "28.04.2020": "25.036",
-    "29.04.2020": "25.018",
-    "30.04.2020": "24.915",
-    "04.05.2020": "24.785",
-    "05.05.2020": "24.888",
-    "06.05.2020": "24.971",
-    "07.05.2020": "25.181",
-    "11.05.2020": "25.498",
-    "12.05.2020": "25.254",
-    "13.05.2020": "25.206",
-    "14.05.2020": "25.551",
-    "15.05.2020": "25.553",
-    "18.05.2020": "25.483",
-    "19.05.2020": "25.106",
-    "20.05.2020": "25.032",
-    "21.05.2020": "24.741",
-    "22.05.2020": "24.953",
-    "25.05.2020": "25.003",
-    "26.05.2020": "24.661",
-    "27.05.2020": "24.609",
-    "28.05.2020": "24.521",
-    "29.05.2020": "24.168",
-    "01.06.2020": "24.163",
-    "02.06.2020": "23.850",
-    "03.06.2020": "23.815",
-    "04.06.2020": "23.660",
-    "05.06.2020": "23.469",
-    "08.06.2020": "23.555",
-    "09.06.2020": "23.590",
-    "10.06.2020": "23.390",
-    "11.06.2020": "23.505",
-    "12.06.2020": "23.601",
-    "15.06.2020": "23.710",
-    "16.06.2020": "23.498",
-    "17.06.2020": "23.647",
-    "18.06.2020": "23.786",
-    "19.06.2020": "23.806",
-    "22.06.2020": "23.777",
-    "23.06.2020": "23.509",
-    "24.06.2020": "23.701",
-    "25.06.2020": "23.926",
-    "26.06.2020": "23.908",
-    "29.06.2020": "23.797",
-    "30.06.2020": "23.879",
-    "01.07.2020": "23.810",
-    "02.07.2020": "23.590",
-    "03.07.2020": "23.757",
-    "07.07.2020": "23.630",
-    "08.07.2020": "23.698",
-    "09.07.2020": "23.474",
-    "10.07.2020": "23.672",
-    "13.07.2020": "23.520",
-    "14.07.2020": "23.411",
-    "15.07.2020": "23.235",
-    "16.07.2020": "23.385",
-    "17.07.2020": "23.351",
-    "20.07.2020": "23.233",
-    "21.07.2020": "23.097",
-    "22.07.2020": "22.770",
-    "23.07.2020": "22.766",
-    "24.07.2020": "22.625",
-    "27.07.2020": "22.280",
-    "28.07.2020": "22.407",
-    "29.07.2020": "22.424",
-    "30.07.2020": "22.352",
-    "31.07.2020": "22.091",
-    "03.08.2020": "22.451",
-    "04.08.2020": "22.287",
-    "05.08.2020": "21.992",
-    "06.08.2020": "22.125",
-    "07.08.2020": "22.241",
-    "10.08.2020": "22.262",
-    "11.08.2020": "22.194",
-    "12.08.2020": "22.185",
-    "13.08.2020": "22.082",
-    "14.08.2020": "22.105",
-    "17.08.2020": "22.053",
-    "18.08.2020": "21.949",
-    "19.08.2020": "21.880",
-    "20.08.2020": "21.992",
-    "21.08.2020": "22.168",
-    "24.08.2020": "22.023",
-    "25.08.2020": "22.109",
-    "26.08.2020": "22.272",
-    "27.08.2020": "22.258",
-    "28.08.2020": "21.989",
-    "31.08.2020": "21.953",
-    "01.09.2020": "21.882",
-    "02.09.2020": "22.203",
-    "03.09.2020": "22.325",
-    "04.09.2020": "22.323",
-    "07.09.2020": "22.386",
-    "08.09.2020": "22.503",
-    "09.09.2020": "22.532",
-    "10.09.2020": "22.436",
-    "11.09.2020": "22.411",
-    "14.09.2020": "22.449",
-    "15.09.2020": "22.564",
-    "16.09.2020": "22.503",
-    "17.09.2020": "22.669",
-    "18.09.2020": "22.585",
-    "21.09.2020": "22.897",
-    "22.09.2020": "23.008",
-    "23.09.2020": "23.055",
-    "24.09.2020": "23.197",
-    "25.09.2020": "23.294",
-    "29.09.2020": "23.203",
-    "30.09.2020": "23.239",
-    "01.10.2020": "22.895",
-    "02.10.2020": "23.043",
-    "05.10.2020": "23.023",
-    "06.10.2020": "22.917",
-    "07.10.2020": "22.996",
-    "08.10.2020": "23.029",
-    "09.10.2020": "22.983",
-    "12.10.2020": "23.029",
-    "13.10.2020": "23.212",
-    "14.10.2020": "23.244",
-    "15.10.2020": "23.375",
-    "16.10.2020": "23.232",
-    "19.10.2020": "23.204",
-    "20.10.2020": "23.064",
-    "21.10.2020": "22.937",
-    "22.10.2020": "23.035",
-    "23.10.2020": "22.961",
-    "26.10.2020": "23.091",
-    "27.10.2020": "23.109",
-    "29.10.2020": "23.381",
-    "30.10.2020": "23.296",
-    "02.11.2020": "23.284",
-    "03.11.2020": "23.004",
-    "04.11.2020": "22.849",
-    "05.11.2020": "22.580",
-    "06.11.2020": "22.464",
-    "09.11.2020": "22.270",
-    "10.11.2020": "22.389",
-    "11.11.2020": "22.476",
-    "12.11.2020": "22.441",
-    "13.11.2020": "22.402",
-    "16.11.2020": "22.276",
-    "18.11.2020": "22.248",
-    "19.11.2020": "22.279",
-    "20.11.2020": "22.201",
-    "23.11.2020": "22.101",
-    "24.11.2020": "22.128",
-    "25.11.2020": "22.014",
-    "26.11.2020": "21.962",
-    "27.11.2020": "21.993",
-    "30.11.2020": "21.861",
-    "01.12.2020": "21.922",
-    "02.12.2020": "21.887",
-    "03.12.2020": "21.748",
-    "04.12.2020": "21.814",
-    "07.12.2020": "21.835",
-    "08.12.2020": "21.793",
-    "09.12.2020": "21.672",
-    "10.12.2020": "21.715",
-    "11.12.2020": "21.712",
-    "14.12.2020": "21.637",
-    "15.12.2020": "21.712",
-    "16.12.2020": "21.497",
-    "17.12.2020": "21.396",
-    "18.12.2020": "21.323",
-    "21.12.2020": "21.590",
-    "22.12.2020": "21.489",
-    "23.12.2020": "21.681",
-    "28.12.2020": "21.482",
-    "29.12.2020": "21.462",
-    "30.12.2020": "21.372",
-    "31.12.2020": "21.387",
-}
+EXCHANGE_RATES_FILE = os.path.join(
+    os.path.dirname(__file__), "data", "exchange_rates_usd.bin"
+)
+EXCHANGE_RATES_MAGIC = b"INSRATES"
+EXCHANGE_RATES_VERSION = 1
+EXCHANGE_RATES_SCALE = 3
+EXCHANGE_RATES_HEADER = struct.Struct("<8sHHI")
+
+
+class ScaledRates(object):
+    """Rates stored as integers scaled by 10 ** scale, decoded on access."""
+
+    def __init__(self, scaled_rates, scale):
+        self.scaled_rates = scaled_rates
+        self.scale = scale
+
+    def __len__(self):
+        return len(self.scaled_rates)
+
+    def __getitem__(self, index):
+        return decimal.Decimal(self.scaled_rates[index]).scaleb(-self.scale)
+
+
+def read_array(typecode, data, offset, count):
+    values = array(typecode)
+    values.frombytes(data[offset : offset + count * values.itemsize])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values, offset + count * values.itemsize
+
+
+@lru_cache(maxsize=None)
+def load_exchange_rates(file_path=EXCHANGE_RATES_FILE):
+    """Load the bundled USD rates as (sorted day ordinals, ScaledRates)."""
+    with open(file_path, "rb") as fd:
+        data = fd.read()
+
+    magic, version, scale, count = EXCHANGE_RATES_HEADER.unpack_from(data)
+    if magic != EXCHANGE_RATES_MAGIC or version != EXCHANGE_RATES_VERSION:
+        raise ValueError(f"Unsupported exchange rates file [{file_path}].")
+
+    offset = EXCHANGE_RATES_HEADER.size
+    ordinals, offset = read_array("I", data, offset, count)
+    scaled_rates, offset = read_array("q", data, offset, count)
+
+    return ordinals, ScaledRates(scaled_rates, scale)
+
 
+def write_exchange_rates(exchange_rates, file_path=EXCHANGE_RATES_FILE):
+    """Write a {date: Decimal} dict of rates to the bundled rates file.
 
-def load_exchange_rates():
-    result = {}
+    Every rate has to be representable with EXCHANGE_RATES_SCALE digits.
+    """
+    dates = sorted(exchange_rates)
+    ordinals = array("I", (date.toordinal() for date in dates))
+    scaled_rates = array("q")
+    for date in dates:
+        rate = exchange_rates[date]
+        scaled_rate = rate.scaleb(EXCHANGE_RATES_SCALE)
+        if scaled_rate != scaled_rate.to_integral_value():
+            raise ValueError(
+                f"Exchange rate [{rate}] of [{date}] has more than {EXCHANGE_RATES_SCALE} decimal digits."
+            )
+        scaled_rates.append(int(scaled_rate))
 
-    for date, exchange_rate in exchange_rates.items():
-        date = datetime.strptime(date, CNB_DATE_FORMAT)
-        result[date] = decimal.Decimal(exchange_rate)
+    if sys.byteorder == "big":
+        ordinals.byteswap()
+        scaled_rates.byteswap()
 
-    return result
+    with open(file_path, "wb") as fd:
+        fd.write(
+            EXCHANGE_RATES_HEADER.pack(
+                EXCHANGE_RATES_MAGIC,
+                EXCHANGE_RATES_VERSION,
+                EXCHANGE_RATES_SCALE,
+                len(dates),
+            )
+        )
+        fd.write(ordinals.tobytes())
+        fd.write(scaled_rates.tobytes())
@@ -1,42 +1,61 @@
 import decimal
+import heapq
 import logging
-from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
 
 from insurrector import MFCR_DATE_FORMAT
-from insurrector.calculators.utils import adjust_stock_data, get_stock_sales
+from insurrector.calculators.ledger import LotLedger
+from insurrector.calculators.utils import adjust_stock_data
+from insurrector.records import Lot, Sale
 
 logger = logging.getLogger("calculations")
 
 decimal.getcontext().rounding = decimal.ROUND_HALF_UP
 
+OLD_SYMBOL_SUFFIX = ".OLD"
+FIFO_TASKS_PER_JOB = 4
+
+
+def normalize_symbol(symbol):
+    """Symbol of the FIFO state an activity belongs to.
+
+    Stock splits surrender the old shares under "<symbol>.OLD", so both
+    symbols share the lots of <symbol>.
+    """
+    if symbol is None:
+        return None
+    return symbol.replace(OLD_SYMBOL_SUFFIX, "")
+
 
 class SalesCalculator(object):
-    def __init__(self, statements):
+    def __init__(self, statements, purchases=None, ssp_surrendered_data=None):
         self.statements = statements
 
         self.statement = None
         self.stock_symbol = None
 
-        self.purchases = {}
+        self.purchases = {} if purchases is None else purchases
         self.sales = []
-        self.ssp_surrendered_data = {}
+        self.ssp_surrendered_data = (
+            {} if ssp_surrendered_data is None else ssp_surrendered_data
+        )
 
     def _calculate_buy(self):
         activity_quantity = abs(self.statement.get("quantity", 0))
 
         logger.debug(
-            f"[BUY] [{self.stock_symbol}] td:[{self.statement['trade_date']}] qt:[{activity_quantity}] pr:[{self.statement['price']}] ex:[{self.statement['exchange_rate']}]"
+            f"[BUY] [{self.stock_symbol}] td:[{self.statement.trade_date}] qt:[{activity_quantity}] pr:[{self.statement.price}] ex:[{self.statement.exchange_rate}]"
         )
-        stock_queue = self.purchases.get(self.stock_symbol, deque())
-        stock_queue.append(
-            {
-                "price": self.statement["price"],
-                "exchange_rate": self.statement["exchange_rate"],
-                "quantity": activity_quantity,
-                "trade_date": self.statement["trade_date"],
-            }
+        stock_queue = self.purchases.setdefault(self.stock_symbol, LotLedger())
+        stock_queue.add(
+            Lot(
+                price=self.statement.price,
+                exchange_rate=self.statement.exchange_rate,
+                quantity=activity_quantity,
+                trade_date=self.statement.trade_date,
+            )
         )
-        self.purchases[self.stock_symbol] = stock_queue
 
     def _calculate_sell(self):
         raise NotImplementedError("Generic sale calculations are not implemented")
@@ -45,38 +64,39 @@ class SalesCalculator(object):
         activity_quantity = abs(self.statement.get("quantity", 0))
 
         logger.debug(
-            f"[SSO] [{self.stock_symbol}] td:[{self.statement['trade_date']}] qt:[{activity_quantity}] pr:[{self.statement['price']}] ex:[{self.statement['exchange_rate']}]"
+            f"[SSO] [{self.stock_symbol}] td:[{self.statement.trade_date}] qt:[{activity_quantity}] pr:[{self.statement.price}] ex:[{self.statement.exchange_rate}]"
         )
 
-        stock_queue = self.purchases.get(self.stock_symbol, deque())
-        stock_queue.append(
-            {
-                "price": decimal.Decimal(0),
-                "exchange_rate": decimal.Decimal(0),
-                "quantity": activity_quantity,
-                "trade_date": self.statement["trade_date"],
-            }
+        stock_queue = self.purchases.setdefault(self.stock_symbol, LotLedger())
+        stock_queue.add(
+            Lot(
+                price=decimal.Decimal(0),
+                exchange_rate=decimal.Decimal(0),
+                quantity=activity_quantity,
+                trade_date=self.statement.trade_date,
+            )
         )
-        self.purchases[self.stock_symbol] = stock_queue
 
     def _calculate_ssp_mas(self):
-        activity_type = self.statement["activity_type"]
-        activity_quantity = self.statement["quantity"]
-        stock_symbol = self.stock_symbol.replace(".OLD", "")
+        activity_type = self.statement.activity_type
+        activity_quantity = self.statement.quantity
+        stock_symbol = normalize_symbol(self.stock_symbol)
 
         logger.debug(
-            f"[{activity_type}] [{self.stock_symbol}] td:[{self.statement['trade_date']}] qt:[{activity_quantity}] pr:[{self.statement['price']}] ex:[{self.statement['exchange_rate']}]"
+            f"[{activity_type}] [{self.stock_symbol}] td:[{self.statement.trade_date}] qt:[{activity_quantity}] pr:[{self.statement.price}] ex:[{self.statement.exchange_rate}]"
         )
 
         if activity_quantity < 0:
             self.ssp_surrendered_data[stock_symbol] = {
                 "quantity": abs(activity_quantity),
-                "price": self.statement["price"],
+                "price": self.statement.price,
             }
             return
 
-        stock_queue = self.purchases.get(stock_symbol, deque())
-        logger.debug(f"Before addition: {stock_queue}")
+        stock_queue = self.purchases.get(stock_symbol, LotLedger())
+        # Printing the ledger brings every lot up to date, keep that to debugging.
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Before addition: {stock_queue}")
 
         if stock_symbol not in self.ssp_surrendered_data:
             logging.warn(f"No SSP surrender information found for: [{stock_symbol}].")
@@ -84,45 +104,53 @@ class SalesCalculator(object):
 
         surrendered_data = self.ssp_surrendered_data[stock_symbol]
         ssp_quantity_ratio = abs(activity_quantity) / surrendered_data["quantity"]
-        ssp_price_ratio = self.statement["price"] / surrendered_data["price"]
+        ssp_price_ratio = self.statement.price / surrendered_data["price"]
 
         logger.debug(
             f"SSP quantity ratio: [{ssp_quantity_ratio}], price ratio: [{ssp_price_ratio}]."
         )
         adjust_stock_data(stock_queue, ssp_quantity_ratio, ssp_price_ratio)
-        logger.debug(f"After addition: {stock_queue}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"After addition: {stock_queue}")
         del self.ssp_surrendered_data[stock_symbol]
 
-    def calculate_sales(self):
-        for statement in self.statements:
-            self.statement = statement
-            self.stock_symbol = statement.get("symbol", None)
+    def calculate_statement(self, statement):
+        self.statement = statement
+        self.stock_symbol = statement.get("symbol", None)
+
+        activity_type = statement.activity_type
+        if activity_type == "BUY":
+            self._calculate_buy()
 
-            if statement["activity_type"] == "BUY":
-                self._calculate_buy()
+        if activity_type == "SELL":
+            self._calculate_sell()
 
-            if statement["activity_type"] == "SELL":
-                self._calculate_sell()
+        if activity_type == "SSO":
+            self._calculate_sso()
 
-            if statement["activity_type"] == "SSO":
-                self._calculate_sso()
+        if activity_type == "SSP" or activity_type == "MAS":
+            self._calculate_ssp_mas()
 
-            if (
-                statement["activity_type"] == "SSP"
-                or statement["activity_type"] == "MAS"
-            ):
-                self._calculate_ssp_mas()
+    def calculate_sales(self):
+        for statement in self.statements:
+            self.calculate_statement(statement)
+
+    def iter_sales(self):
+        for statement in self.statements:
+            self.calculate_statement(statement)
+            yield from self.sales
+            self.sales.clear()
 
 
 class SalesCalculatorCzechia(SalesCalculator):
-    def __init__(self, statements):
-        super().__init__(statements)
+    def __init__(self, statements, purchases=None, ssp_surrendered_data=None):
+        super().__init__(statements, purchases, ssp_surrendered_data)
 
     def _calculate_sell(self):
         activity_quantity = abs(self.statement.get("quantity", 0))
 
         logger.debug(
-            f"[SELL] [{self.stock_symbol}] td:[{self.statement['trade_date']}] qt:[{activity_quantity}] pr:[{self.statement['price']}] ex:[{self.statement['exchange_rate']}]"
+            f"[SELL] [{self.stock_symbol}] td:[{self.statement.trade_date}] qt:[{activity_quantity}] pr:[{self.statement.price}] ex:[{self.statement.exchange_rate}]"
         )
 
         if (
@@ -134,48 +162,181 @@ class SalesCalculatorCzechia(SalesCalculator):
 
         stock_queue = self.purchases[self.stock_symbol]
 
-        for sale_item in get_stock_sales(stock_queue, activity_quantity):
-            purchase_price_in_currency = sale_item["price"] * sale_item["quantity"]
-            purchase_price = purchase_price_in_currency * sale_item["exchange_rate"]
-
-            sell_price_in_currency = self.statement["price"] * sale_item["quantity"]
-            sell_price = sell_price_in_currency * self.statement["exchange_rate"]
-
-            sale = {
-                "symbol": self.stock_symbol,
-                "quantity": sale_item["quantity"],
-                "purchase_date": sale_item["trade_date"].strftime(MFCR_DATE_FORMAT),
-                "trade_date": self.statement["trade_date"].strftime(MFCR_DATE_FORMAT),
-                "purchase_item_price_in_currency": sale_item["price"],
-                "purchase_price": purchase_price,
-                "purchase_price_in_currency": purchase_price_in_currency,
-                "purchase_exchange_rate": sale_item["exchange_rate"],
-                "sell_price": sell_price,
-                "sell_exchange_rate": self.statement["exchange_rate"],
-                "sell_price_in_currency": sell_price_in_currency,
-                "sell_item_price_in_currency": self.statement["price"],
-                "profit": decimal.Decimal(0),
-                "loss": decimal.Decimal(0),
-                "profit_in_currency": decimal.Decimal(0),
-                "loss_in_currency": decimal.Decimal(0),
-            }
-
-            profit_loss = sale["sell_price"] - sale["purchase_price"]
+        for sale_item in stock_queue.consume(activity_quantity):
+            purchase_price_in_currency = sale_item.price * sale_item.quantity
+            purchase_price = purchase_price_in_currency * sale_item.exchange_rate
+
+            sell_price_in_currency = self.statement.price * sale_item.quantity
+            sell_price = sell_price_in_currency * self.statement.exchange_rate
+
+            sale = Sale(
+                symbol=self.stock_symbol,
+                currency=self.statement.currency,
+                quantity=sale_item.quantity,
+                purchase_date=sale_item.trade_date.strftime(MFCR_DATE_FORMAT),
+                trade_date=self.statement.trade_date.strftime(MFCR_DATE_FORMAT),
+                purchase_item_price_in_currency=sale_item.price,
+                purchase_price=purchase_price,
+                purchase_price_in_currency=purchase_price_in_currency,
+                purchase_exchange_rate=sale_item.exchange_rate,
+                sell_price=sell_price,
+                sell_exchange_rate=self.statement.exchange_rate,
+                sell_price_in_currency=sell_price_in_currency,
+                sell_item_price_in_currency=self.statement.price,
+                profit=decimal.Decimal(0),
+                loss=decimal.Decimal(0),
+                profit_in_currency=decimal.Decimal(0),
+                loss_in_currency=decimal.Decimal(0),
+            )
+
+            profit_loss = sale.sell_price - sale.purchase_price
             if profit_loss > 0:
-                sale["profit"] = profit_loss
+                sale.profit = profit_loss
             else:
-                sale["loss"] = profit_loss
+                sale.loss = profit_loss
 
             profit_loss = sell_price_in_currency - purchase_price_in_currency
             if profit_loss > 0:
-                sale["profit_in_currency"] = profit_loss
+                sale.profit_in_currency = profit_loss
             else:
-                sale["loss_in_currency"] = profit_loss
+                sale.loss_in_currency = profit_loss
 
             self.sales.append(sale)
 
 
-def calculate_sales_czk(statements):
-    sales_calculator = SalesCalculatorCzechia(statements)
-    sales_calculator.calculate_sales()
-    return sales_calculator.sales, sales_calculator.purchases
+def partition_statements(statements):
+    """Split statement indexes into lists per normalized symbol."""
+    partitions = {}
+    for index, statement in enumerate(statements):
+        symbol = normalize_symbol(statement.get("symbol"))
+        partitions.setdefault(symbol, []).append(index)
+    return partitions
+
+
+def group_by_symbol(symbols_data):
+    """Group a dict keyed by symbols into dicts per normalized symbol."""
+    groups = {}
+    for symbol, data in symbols_data.items():
+        groups.setdefault(normalize_symbol(symbol), {})[symbol] = data
+    return groups
+
+
+def split_partitions(partitions, count):
+    """Distribute (symbol, indexes) partitions into count tasks of similar size."""
+    tasks = [[] for _ in range(min(count, len(partitions)))]
+    loads = [(0, task_index) for task_index in range(len(tasks))]
+    for partition in sorted(partitions, key=lambda p: len(p[1]), reverse=True):
+        load, task_index = heapq.heappop(loads)
+        tasks[task_index].append(partition)
+        heapq.heappush(loads, (load + len(partition[1]), task_index))
+    return tasks
+
+
+worker_statements = None
+worker_purchases = None
+worker_ssp_surrendered_data = None
+
+
+def set_worker_state(statements, purchases, ssp_surrendered_data):
+    global worker_statements, worker_purchases, worker_ssp_surrendered_data
+    worker_statements = statements
+    worker_purchases = purchases
+    worker_ssp_surrendered_data = ssp_surrendered_data
+
+
+def calculate_partitions_sales_czk(partitions):
+    """Calculate sales of independent symbol partitions of worker_statements.
+
+    Every sale is returned as (statement index, sale row) for merging the
+    sales of all partitions back into the statements order. Open lots are
+    returned as rows per symbol.
+    """
+    sales = []
+    purchases = {}
+    ssp_surrendered_data = {}
+    for symbol, partition in partitions:
+        sales_calculator = SalesCalculatorCzechia(
+            None,
+            worker_purchases.get(symbol),
+            worker_ssp_surrendered_data.get(symbol),
+        )
+        partition_sales = []
+        for index in partition:
+            sales_calculator.calculate_statement(worker_statements[index])
+            partition_sales.extend(
+                (index, sale.to_row()) for sale in sales_calculator.sales
+            )
+            sales_calculator.sales.clear()
+
+        sales.append(partition_sales)
+        for stock_symbol, stock_queue in sales_calculator.purchases.items():
+            purchases[stock_symbol] = [lot.to_row() for lot in stock_queue]
+        ssp_surrendered_data.update(sales_calculator.ssp_surrendered_data)
+    sales = list(heapq.merge(*sales, key=itemgetter(0)))
+    return sales, purchases, ssp_surrendered_data
+
+
+def calculate_sales_czk(statements, jobs=1, purchases=None, ssp_surrendered_data=None):
+    """Calculate sales, optionally continuing from earlier open lots.
+
+    Returns the sales, the open lots per symbol and the pending SSP surrenders.
+    """
+    partitions = None
+    if jobs > 1:
+        partitions = partition_statements(statements)
+
+    if partitions is None or len(partitions) <= 1:
+        sales_calculator = SalesCalculatorCzechia(
+            statements, purchases, ssp_surrendered_data
+        )
+        sales_calculator.calculate_sales()
+        return (
+            sales_calculator.sales,
+            sales_calculator.purchases,
+            sales_calculator.ssp_surrendered_data,
+        )
+
+    purchases = group_by_symbol(purchases or {})
+    ssp_surrendered_data = group_by_symbol(ssp_surrendered_data or {})
+
+    # FIFO state is independent per symbol, so symbols are calculated in
+    # separate processes. A statement belongs to exactly one partition and
+    # partition sales keep their statement order, so merging by statement
+    # index restores the order of the sequential calculation. Workers get the
+    # statements and open lots once at start, for free where processes are
+    # forked, and tasks carry only statement indexes.
+    tasks = split_partitions(list(partitions.items()), jobs * FIFO_TASKS_PER_JOB)
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=set_worker_state,
+        initargs=(statements, purchases, ssp_surrendered_data),
+    ) as executor:
+        results = list(executor.map(calculate_partitions_sales_czk, tasks))
+
+    # Symbols without statements keep their open lots untouched.
+    merged_purchases = {}
+    merged_ssp_surrendered_data = {}
+    for symbol, symbol_purchases in purchases.items():
+        if symbol not in partitions:
+            merged_purchases.update(symbol_purchases)
+    for symbol, symbol_ssp_surrendered_data in ssp_surrendered_data.items():
+        if symbol not in partitions:
+            merged_ssp_surrendered_data.update(symbol_ssp_surrendered_data)
+
+    for _, task_purchases, task_ssp_surrendered_data in results:
+        for symbol, lots in task_purchases.items():
+            merged_purchases[symbol] = LotLedger(Lot.from_row(lot) for lot in lots)
+        merged_ssp_surrendered_data.update(task_ssp_surrendered_data)
+
+    sales = heapq.merge(
+        *(task_sales for task_sales, _, _ in results), key=itemgetter(0)
+    )
+    return (
+        [Sale.from_row(sale) for _, sale in sales],
+        merged_purchases,
+        merged_ssp_surrendered_data,
+    )
+
+
+def iter_sales_czk(statements):
+    return SalesCalculatorCzechia(statements).iter_sales()
@@ -0,0 +1,93 @@
+import decimal
+import logging
+from collections import deque
+from itertools import islice
+
+logger = logging.getLogger("calculations")
+
+decimal.getcontext().rounding = decimal.ROUND_HALF_UP
+
+
+class LotLedger(object):
+    """Open purchase lots of one symbol, consumed First-In, First-Out.
+
+    Selling consumes lots in place, so a sale costs O(lots touched). A lot only
+    partially sold is split: the sold part is returned and the rest stays open.
+
+    Corporate actions (SSP/MAS) only append their quantity and price ratios to
+    a log, which is O(1). Every lot keeps the position in the log up to which
+    it is adjusted and catches up when it is read. Ratios are applied one by
+    one, exactly like adjusting every lot right away would. A single
+    cumulative factor would round differently.
+    """
+
+    def __init__(self, lots=()):
+        self.lots = deque(lots)
+        self.epochs = deque(0 for _ in self.lots)
+        self.ratios = []
+
+    def __len__(self):
+        return len(self.lots)
+
+    def __iter__(self):
+        self.apply_ratios()
+        return iter(self.lots)
+
+    def __repr__(self):
+        return f"LotLedger({list(self)})"
+
+    def _apply_ratios(self, lot, epoch):
+        for quantity_ratio, price_ratio in islice(self.ratios, epoch, None):
+            lot.quantity *= quantity_ratio
+            lot.price *= price_ratio
+
+    def apply_ratios(self):
+        """Bring all open lots up to date with the logged corporate actions."""
+        epoch = len(self.ratios)
+        for lot, lot_epoch in zip(self.lots, self.epochs):
+            if lot_epoch != epoch:
+                self._apply_ratios(lot, lot_epoch)
+        self.epochs = deque(epoch for _ in self.lots)
+
+    def get_first_lot(self):
+        lot = self.lots[0]
+        if self.epochs[0] != len(self.ratios):
+            self._apply_ratios(lot, self.epochs[0])
+            self.epochs[0] = len(self.ratios)
+        return lot
+
+    def add(self, lot):
+        if not self.lots:
+            self.ratios.clear()
+        self.lots.append(lot)
+        self.epochs.append(len(self.ratios))
+
+    def adjust(self, quantity_ratio, price_ratio):
+        """Multiply quantities and prices of all open lots by the ratios."""
+        if self.lots:
+            self.ratios.append((quantity_ratio, price_ratio))
+
+    def get_quantity(self):
+        return sum(lot.quantity for lot in self)
+
+    def consume(self, quantity):
+        """Remove quantity from the oldest lots and return the sold lots."""
+        sold_lots = []
+        while quantity > 0 and self.lots:
+            lot = self.get_first_lot()
+            if lot.quantity > quantity:
+                sold_lots.append(lot.copy(quantity=quantity))
+                lot.quantity -= quantity
+                quantity = 0
+                break
+
+            sold_lots.append(self.lots.popleft())
+            self.epochs.popleft()
+            quantity -= lot.quantity
+
+        if quantity > 0:
+            logger.warning(
+                f"Sold quantity exceeds open lots by [{quantity}], selling all open lots."
+            )
+
+        return sold_lots
@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+from datetime import datetime
+
+from insurrector.calculators.ledger import LotLedger
+from insurrector.parsers.cache import decode_value, encode_value
+from insurrector.records import Lot
+
+logger = logging.getLogger("calculations")
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_DATE_FORMAT = "%Y-%m-%d"
+
+
+def split_statements(statements, cutoff_date):
+    """Split statements into those traded up to cutoff_date and those after.
+
+    Continuing from a snapshot matches a full calculation only if no activity
+    up to the cutoff follows an activity after it.
+    """
+    statements_before, statements_after = [], []
+    for statement in statements:
+        if statement["trade_date"] > cutoff_date:
+            statements_after.append(statement)
+            continue
+
+        if statements_after:
+            logger.error(
+                f"Activity of [{statement['trade_date']:{SNAPSHOT_DATE_FORMAT}}] follows activities after the snapshot cutoff [{cutoff_date:{SNAPSHOT_DATE_FORMAT}}]. Statements have to be ordered by trade date."
+            )
+            raise SystemExit(1)
+        statements_before.append(statement)
+
+    return statements_before, statements_after
+
+
+def get_snapshot_state(purchases, ssp_surrendered_data):
+    """Copy open lots and pending SSP surrenders of a calculation."""
+    return {
+        "purchases": {
+            symbol: [dict(lot.items()) for lot in stock_queue]
+            for symbol, stock_queue in purchases.items()
+            if len(stock_queue)
+        },
+        "ssp_surrendered_data": {
+            symbol: dict(surrendered_data)
+            for symbol, surrendered_data in ssp_surrendered_data.items()
+        },
+    }
+
+
+def save_snapshot(file_path, cutoff_date, states):
+    """Save snapshot states per parser of open lots at cutoff_date."""
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "cutoff_date": cutoff_date.strftime(SNAPSHOT_DATE_FORMAT),
+        "parsers": states,
+    }
+
+    temp_path = file_path + ".tmp"
+    with open(temp_path, "w") as fd:
+        json.dump(snapshot, fd, default=encode_value, sort_keys=True)
+    os.replace(temp_path, file_path)
+
+
+def load_snapshot(file_path):
+    """Load a snapshot as (cutoff_date, {parser: (purchases, surrenders)})."""
+    try:
+        with open(file_path, "r") as fd:
+            snapshot = json.load(fd, object_hook=decode_value)
+    except FileNotFoundError:
+        logger.error(f"Open lots snapshot [{file_path}] not found.")
+        raise SystemExit(1)
+    except ValueError:
+        logger.error(f"Open lots snapshot [{file_path}] is corrupted.")
+        raise SystemExit(1)
+
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        logger.error(
+            f"Unsupported open lots snapshot [{file_path}] version [{snapshot.get('version')}], expected [{SNAPSHOT_VERSION}]."
+        )
+        raise SystemExit(1)
+
+    states = {}
+    for parser_name, state in snapshot["parsers"].items():
+        purchases = {
+            symbol: LotLedger(Lot(**lot) for lot in lots)
+            for symbol, lots in state["purchases"].items()
+        }
+        states[parser_name] = (purchases, state["ssp_surrendered_data"])
+
+    cutoff_date = datetime.strptime(snapshot["cutoff_date"], SNAPSHOT_DATE_FORMAT)
+    return cutoff_date, states
@@ -6,11 +6,31 @@ from __future__ import absolute_import
 
 import argparse
 import logging
+from datetime import datetime
 
-from insurrector.process import process_mfcr, supported_parsers
+from insurrector.calculators.snapshot import SNAPSHOT_DATE_FORMAT
+from insurrector.exchange_rates import (
+    CNB_SOURCE_RANGE,
+    CNB_SOURCES,
+    EXCHANGE_RATE_LOOKUP_NEAREST,
+    EXCHANGE_RATE_LOOKUPS,
+)
+from insurrector.process import STREAM_CHUNK_SIZE, process_mfcr, supported_parsers
+from insurrector.watch import WATCH_INTERVAL, watch_mfcr
 
 logging.basicConfig(level=logging.INFO, format="[%(levelname)s]: %(message)s")
 
+
+def positive_int(value):
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: '{value}'")
+    return number
+
+
 parser = argparse.ArgumentParser(description="Insurrector Stock calculator")
 parser.add_argument(
     "-i",
@@ -45,12 +65,117 @@ parser.add_argument(
     help="Use CNB online service as exchange rates source.",
     action="store_true",
 )
+parser.add_argument(
+    "--cnb-source",
+    dest="cnb_source",
+    help=(
+        "CNB exchange rates source: per-currency queries of three month ranges"
+        " or whole-year tables of all currencies, one request per year."
+        f" Default: {CNB_SOURCE_RANGE}."
+    ),
+    choices=CNB_SOURCES,
+    default=CNB_SOURCE_RANGE,
+)
+parser.add_argument(
+    "--rate-lookup",
+    dest="rate_lookup",
+    help=(
+        "Exchange rate used for days without a published rate: the nearest"
+        " published rate or the last one published before the trade."
+        f" Default: {EXCHANGE_RATE_LOOKUP_NEAREST}."
+    ),
+    choices=EXCHANGE_RATE_LOOKUPS,
+    default=EXCHANGE_RATE_LOOKUP_NEAREST,
+)
 parser.add_argument(
     "-c",
     dest="in_currency",
     help="Show profit/loss in original currency.",
     action="store_true",
 )
+parser.add_argument(
+    "-j",
+    "--jobs",
+    dest="jobs",
+    help=(
+        "Number of processes used to parse statement files and to calculate"
+        " sales of different symbols in parallel. Default: 1."
+    ),
+    type=positive_int,
+    default=1,
+)
+parser.add_argument(
+    "--no-cache",
+    dest="use_cache",
+    help="Do not use the cache of parsed statement files and CNB exchange rates.",
+    action="store_false",
+)
+parser.add_argument(
+    "--rebuild-cache",
+    dest="rebuild_cache",
+    help="Parse all statement files again, download CNB exchange rates again and refresh the caches.",
+    action="store_true",
+)
+parser.add_argument(
+    "--stream",
+    dest="stream",
+    help=(
+        "Stream activities through the calculation one statement file at a time"
+        " instead of loading all statement files into memory."
+    ),
+    action="store_true",
+)
+parser.add_argument(
+    "--chunk-size",
+    dest="chunk_size",
+    help=(
+        "Number of activity rows read and processed at once with --stream. The"
+        " memory used for large CSV exports is bounded by this many rows, not"
+        f" by a size in bytes. Default: {STREAM_CHUNK_SIZE}."
+    ),
+    type=positive_int,
+    default=STREAM_CHUNK_SIZE,
+)
+parser.add_argument(
+    "--snapshot-out",
+    dest="snapshot_out",
+    help=(
+        "Save open lots after activities up to --snapshot-date to this file,"
+        " so a later run can continue from it with --snapshot-in."
+    ),
+)
+parser.add_argument(
+    "--snapshot-date",
+    dest="snapshot_date",
+    help=(
+        "Cutoff date of --snapshot-out in YYYY-MM-DD format, usually the last"
+        " day of a tax year."
+    ),
+)
+parser.add_argument(
+    "--snapshot-in",
+    dest="snapshot_in",
+    help=(
+        "Start from open lots saved with --snapshot-out and calculate only"
+        " activities after its cutoff date."
+    ),
+)
+parser.add_argument(
+    "--watch",
+    dest="watch",
+    help=(
+        "Keep running and update output files whenever statement files in the"
+        " input directory are added, changed or removed."
+    ),
+    action="store_true",
+)
+parser.add_argument(
+    "--watch-interval",
+    dest="watch_interval",
+    help=f"Seconds between scans of the input directory. Default: {WATCH_INTERVAL}.",
+    type=float,
+    default=WATCH_INTERVAL,
+)
 parser.add_argument(
     "-v", dest="verbose", help="Enable verbose output.", action="store_true"
 )
@@ -68,10 +193,57 @@ def main():
     if parsers is None:
         parsers = ["revolut"]
 
+    snapshot_date = None
+    if parsed_args.snapshot_out is not None:
+        if parsed_args.snapshot_date is None:
+            parser.error("argument --snapshot-out: requires argument --snapshot-date")
+        try:
+            snapshot_date = datetime.strptime(
+                parsed_args.snapshot_date, SNAPSHOT_DATE_FORMAT
+            )
+        except ValueError:
+            parser.error(
+                f"argument --snapshot-date: invalid date: '{parsed_args.snapshot_date}'"
+            )
+    elif parsed_args.snapshot_date is not None:
+        parser.error("argument --snapshot-date: requires argument --snapshot-out")
+
+    if parsed_args.stream and (parsed_args.snapshot_out or parsed_args.snapshot_in):
+        parser.error("argument --stream: not allowed with snapshot arguments")
+
+    options = {
+        "jobs": parsed_args.jobs,
+        "use_cache": parsed_args.use_cache,
+        "rebuild_cache": parsed_args.rebuild_cache,
+        "rate_lookup": parsed_args.rate_lookup,
+        "cnb_source": parsed_args.cnb_source,
+        "snapshot_in": parsed_args.snapshot_in,
+        "snapshot_out": parsed_args.snapshot_out,
+        "snapshot_date": snapshot_date,
+    }
+
+    if parsed_args.watch:
+        if parsed_args.stream:
+            parser.error("argument --watch: not allowed with argument --stream")
+
+        watch_mfcr(
+            parsed_args.input_dir,
+            parsed_args.output_dir,
+            parsers,
+            parsed_args.use_cnb,
+            parsed_args.in_currency,
+            interval=parsed_args.watch_interval,
+            **options,
+        )
+        return
+
     process_mfcr(
         parsed_args.input_dir,
         parsed_args.output_dir,
         parsers,
         parsed_args.use_cnb,
         parsed_args.in_currency,
+        stream=parsed_args.stream,
+        chunk_size=parsed_args.chunk_size,
+        **options,
     )
@@ -0,0 +1,276 @@
+"""Local stand-in for the CNB exchange rates service.
+
+Serves "vybrane.txt" and "rok.txt" in the CNB text format either with
+generated rates, with responses recorded from the real service or while
+recording them. Run it and point insurrector at it with INSURRECTOR_CNB_URL:
+
+    python -m insurrector.cnb_server --port 8000 --latency 0.1 --error-rate 0.1
+    INSURRECTOR_CNB_URL=http://127.0.0.1:8000/ insurrector-cli -b ...
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+import urllib.request
+import zlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from insurrector import CNB_DATE_FORMAT, CNB_DEFAULT_URL
+
+logger = logging.getLogger("exchange_rates")
+
+CNB_SERVER_CURRENCIES = ["EUR", "GBP", "HUF", "JPY", "USD"]
+CNB_SERVER_AMOUNTS = {"HUF": 100, "IDR": 1000, "JPY": 100}
+
+
+def get_synthetic_rate(currency, date):
+    base = 10 + zlib.crc32(currency.encode("ascii")) % 20
+    return f"{base + date.toordinal() % 1000 / 1000:.3f}".replace(".", ",")
+
+
+def iter_business_days(first_date, last_date):
+    date = first_date
+    last_date = min(last_date, datetime.now())
+    while date <= last_date:
+        if date.weekday() < 5:
+            yield date
+        date += timedelta(days=1)
+
+
+def format_range_rates(currency, first_date, last_date):
+    lines = [
+        f"Měna: {currency}|Množství: {CNB_SERVER_AMOUNTS.get(currency, 1)}",
+        "Datum|Kurz",
+    ]
+    for date in iter_business_days(first_date, last_date):
+        lines.append(
+            f"{date.strftime(CNB_DATE_FORMAT)}|{get_synthetic_rate(currency, date)}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def format_year_rates(year, currencies=CNB_SERVER_CURRENCIES):
+    columns = [
+        f"{CNB_SERVER_AMOUNTS.get(currency, 1)} {currency}" for currency in currencies
+    ]
+    lines = ["|".join(["Datum"] + columns)]
+    for date in iter_business_days(datetime(year, 1, 1), datetime(year, 12, 31)):
+        rates = [get_synthetic_rate(currency, date) for currency in currencies]
+        lines.append("|".join([date.strftime(CNB_DATE_FORMAT)] + rates))
+    return "\n".join(lines) + "\n"
+
+
+class CNBRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(f"[cnb_server] {format % args}")
+
+    def send_text(self, status, text=""):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.count_request()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if self.server.is_throttled():
+            return self.send_text(429, "Too Many Requests\n")
+        if self.server.should_fail():
+            return self.send_text(503, "Service Unavailable\n")
+
+        try:
+            if self.server.replay_dir:
+                text = self.server.replay(self.path)
+            elif self.server.upstream_url:
+                text = self.server.record(self.path)
+            else:
+                text = self.generate(self.path)
+        except FileNotFoundError:
+            return self.send_text(404, "Not recorded\n")
+        except (KeyError, ValueError) as e:
+            return self.send_text(400, f"{e}\n")
+
+        self.send_text(200, text)
+
+    def generate(self, path):
+        url = urlsplit(path)
+        query = parse_qs(url.query)
+        if url.path.endswith("/rok.txt"):
+            return format_year_rates(int(query["rok"][0]))
+        if url.path.endswith("/vybrane.txt"):
+            return format_range_rates(
+                query["mena"][0],
+                datetime.strptime(query["od"][0], CNB_DATE_FORMAT),
+                datetime.strptime(query["do"][0], CNB_DATE_FORMAT),
+            )
+        raise ValueError(f"Unknown path [{url.path}]")
+
+
+class CNBServer(ThreadingHTTPServer):
+    """Threaded CNB stand-in with configurable latency, throttling and errors.
+
+    With replay_dir, responses recorded earlier are served instead of the
+    generated ones. With record_dir and upstream_url, requests are forwarded
+    to upstream_url and the responses are saved to record_dir.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        latency=0,
+        error_rate=0,
+        max_requests_per_second=None,
+        replay_dir=None,
+        record_dir=None,
+        upstream_url=None,
+        seed=None,
+    ):
+        super().__init__(address, CNBRequestHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_requests_per_second = max_requests_per_second
+        self.replay_dir = replay_dir
+        self.record_dir = record_dir
+        self.upstream_url = upstream_url
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.request_times = []
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def count_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def is_throttled(self):
+        if not self.max_requests_per_second:
+            return False
+
+        with self.lock:
+            now = time.monotonic()
+            self.request_times = [t for t in self.request_times if now - t < 1]
+            if len(self.request_times) >= self.max_requests_per_second:
+                return True
+            self.request_times.append(now)
+            return False
+
+    def should_fail(self):
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def get_record_path(self, directory, path):
+        url = urlsplit(path)
+        name = os.path.basename(url.path)
+        digest = hashlib.sha256(f"{name}?{url.query}".encode("utf-8")).hexdigest()
+        return os.path.join(directory, f"{name}-{digest[:16]}")
+
+    def replay(self, path):
+        with open(self.get_record_path(self.replay_dir, path), encoding="utf-8") as fd:
+            return fd.read()
+
+    def record(self, path):
+        url = urlsplit(path)
+        upstream_path = os.path.basename(url.path) + "?" + url.query
+        with urllib.request.urlopen(self.upstream_url + upstream_path) as response:
+            text = response.read().decode("utf-8")
+
+        os.makedirs(self.record_dir, exist_ok=True)
+        with open(
+            self.get_record_path(self.record_dir, path), "w", encoding="utf-8"
+        ) as fd:
+            fd.write(text)
+        return text
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local CNB exchange rates service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--latency", type=float, default=0, help="Seconds to wait per request."
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0,
+        help="Fraction of requests answered with HTTP 503.",
+    )
+    parser.add_argument(
+        "--max-requests-per-second",
+        type=int,
+        help="Answer requests over this rate with HTTP 429.",
+    )
+    parser.add_argument("--seed", type=int, help="Seed of the injected errors.")
+    parser.add_argument("--replay", dest="replay_dir", help="Serve recorded responses.")
+    parser.add_argument(
+        "--record",
+        dest="record_dir",
+        help="Record responses of the real service to this directory.",
+    )
+    parser.add_argument(
+        "--upstream",
+        dest="upstream_url",
+        default=CNB_DEFAULT_URL,
+        help="Service to record from. Default: the CNB service.",
+    )
+    parsed_args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s]: %(message)s")
+
+    server = CNBServer(
+        (parsed_args.host, parsed_args.port),
+        latency=parsed_args.latency,
+        error_rate=parsed_args.error_rate,
+        max_requests_per_second=parsed_args.max_requests_per_second,
+        replay_dir=parsed_args.replay_dir,
+        record_dir=parsed_args.record_dir,
+        upstream_url=parsed_args.upstream_url if parsed_args.record_dir else None,
+        seed=parsed_args.seed,
+    )
+    logger.info(f"Serving CNB exchange rates on [{server.url}].")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
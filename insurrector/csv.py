@@ -1,87 +1,77 @@
 import csv
 import decimal
+from contextlib import contextmanager
 
 from insurrector import MFCR_DIGIT_PRECISION
 from insurrector.utils import humanize_date
 
 decimal.getcontext().rounding = decimal.ROUND_HALF_UP
 
+MFCR_PRECISION = decimal.Decimal(MFCR_DIGIT_PRECISION)
 
-def export_to_csv(list_object, csv_file, fieldnames):
 
-    csv_list_object = humanize_date(list_object)
+STATEMENTS_FIELDNAMES = [
+    "trade_date",
+    "settle_date",
+    "currency",
+    "activity_type",
+    "company",
+    "symbol_description",
+    "symbol",
+    "quantity",
+    "price",
+    "amount",
+]
 
+
+@contextmanager
+def open_csv_writer(csv_file, fieldnames, extrasaction="raise"):
     with open(csv_file, "w") as fd:
         writer = csv.DictWriter(
             fd,
             fieldnames=fieldnames,
             quotechar='"',
             quoting=csv.QUOTE_ALL,
+            extrasaction=extrasaction,
         )
 
         header = {
             fieldname: fieldname.replace("_", " ").title() for fieldname in fieldnames
         }
         writer.writerow(header)
-        for elements in csv_list_object:
+        yield writer
+
+
+def export_to_csv(list_object, csv_file, fieldnames, extrasaction="raise"):
+    with open_csv_writer(csv_file, fieldnames, extrasaction) as writer:
+        for elements in humanize_date(list_object):
             writer.writerow(elements)
 
 
 def export_statements(file_path, statements):
-    export_to_csv(
-        statements,
-        file_path,
-        [
-            "trade_date",
-            "settle_date",
-            "currency",
-            "activity_type",
-            "company",
-            "symbol_description",
-            "symbol",
-            "quantity",
-            "price",
-            "amount",
-        ],
-    )
+    # Statements may already carry their populated exchange rates.
+    export_to_csv(statements, file_path, STATEMENTS_FIELDNAMES, extrasaction="ignore")
 
 
 def export_sales_in_currency_czk(file_path, sales):
-    sales = [
+    sales = (
         {
-            **{
-                k: v
-                for k, v in sale.items()
-                if k
-                not in [
-                    "purchase_exchange_rate",
-                    "purchase_price",
-                    "sell_exchange_rate",
-                    "sell_price",
-                    "profit",
-                    "loss",
-                    "purchase_price_in_currency",
-                    "sell_price_in_currency",
-                ]
-            },
-            **{
-                "profit_in_currency": sale["profit_in_currency"].quantize(
-                    decimal.Decimal(MFCR_DIGIT_PRECISION)
-                ),
-                "loss_in_currency": sale["loss_in_currency"].quantize(
-                    decimal.Decimal(MFCR_DIGIT_PRECISION)
-                ),
-                "purchase_item_price_in_currency": sale[
-                    "purchase_item_price_in_currency"
-                ].quantize(decimal.Decimal(MFCR_DIGIT_PRECISION)),
-                "sell_item_price_in_currency": sale[
-                    "sell_item_price_in_currency"
-                ].quantize(decimal.Decimal(MFCR_DIGIT_PRECISION)),
-            },
-            **{"currency": "USD"},
+            "symbol": sale.symbol,
+            "quantity": sale.quantity,
+            "sell_item_price_in_currency": sale.sell_item_price_in_currency.quantize(
+                MFCR_PRECISION
+            ),
+            "currency": sale.currency,
+            "trade_date": sale.trade_date,
+            "purchase_item_price_in_currency": sale.purchase_item_price_in_currency.quantize(
+                MFCR_PRECISION
+            ),
+            "purchase_date": sale.purchase_date,
+            "profit_in_currency": sale.profit_in_currency.quantize(MFCR_PRECISION),
+            "loss_in_currency": sale.loss_in_currency.quantize(MFCR_PRECISION),
         }
         for sale in sales
-    ]
+    )
     export_to_csv(
         sales,
         file_path,
@@ -100,43 +90,22 @@ def export_sales_in_currency_czk(file_path, sales):
 
 
 def export_sales_czk(file_path, sales):
-    sales = [
+    sales = (
         {
-            **{
-                k: v
-                for k, v in sale.items()
-                if k
-                not in [
-                    "purchase_price",
-                    "purchase_exchange_rate",
-                    "sell_exchange_rate",
-                    "sell_price",
-                    "profit_in_currency",
-                    "loss_in_currency",
-                    "purchase_price_in_currency",
-                    "purchase_item_price_in_currency",
-                    "sell_price_in_currency",
-                    "sell_item_price_in_currency",
-                ]
-            },
-            **{
-                "profit": sale["profit"].quantize(
-                    decimal.Decimal(MFCR_DIGIT_PRECISION)
-                ),
-                "loss": sale["loss"].quantize(decimal.Decimal(MFCR_DIGIT_PRECISION)),
-                "purchase_item_price": sale["purchase_item_price_in_currency"]
-                * sale["purchase_exchange_rate"].quantize(
-                    decimal.Decimal(MFCR_DIGIT_PRECISION)
-                ),
-                "sell_item_price": sale["sell_item_price_in_currency"]
-                * sale["sell_exchange_rate"].quantize(
-                    decimal.Decimal(MFCR_DIGIT_PRECISION)
-                ),
-            },
-            **{"currency": "CZK"},
+            "symbol": sale.symbol,
+            "quantity": sale.quantity,
+            "sell_item_price": sale.sell_item_price_in_currency
+            * sale.sell_exchange_rate.quantize(MFCR_PRECISION),
+            "currency": "CZK",
+            "trade_date": sale.trade_date,
+            "purchase_item_price": sale.purchase_item_price_in_currency
+            * sale.purchase_exchange_rate.quantize(MFCR_PRECISION),
+            "purchase_date": sale.purchase_date,
+            "profit": sale.profit.quantize(MFCR_PRECISION),
+            "loss": sale.loss.quantize(MFCR_PRECISION),
         }
         for sale in sales
-    ]
+    )
     export_to_csv(
         sales,
         file_path,
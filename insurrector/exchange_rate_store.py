@@ -0,0 +1,140 @@
+import decimal
+import logging
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from insurrector.utils import get_cache_dir
+
+logger = logging.getLogger("exchange_rates")
+
+EXCHANGE_RATE_STORE_FILE = "exchange_rates.sqlite3"
+
+
+class ExchangeRateStore(object):
+    """Exchange rates downloaded from CNB kept in a local SQLite database.
+
+    Besides the rates, the store records which date ranges were already
+    downloaded for each currency, so days without a published rate
+    (weekends, holidays) are not queried again.
+    """
+
+    def __init__(self, path=None, rebuild=False):
+        if path is None:
+            path = os.path.join(get_cache_dir(), EXCHANGE_RATE_STORE_FILE)
+
+        self.path = path
+        with self.connect() as connection:
+            if rebuild:
+                connection.execute("DROP TABLE IF EXISTS exchange_rates")
+                connection.execute("DROP TABLE IF EXISTS coverage")
+
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS exchange_rates ("
+                "currency TEXT NOT NULL, day INTEGER NOT NULL, rate TEXT NOT NULL,"
+                " PRIMARY KEY (currency, day))"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS coverage ("
+                "currency TEXT NOT NULL, first_day INTEGER NOT NULL,"
+                " last_day INTEGER NOT NULL)"
+            )
+
+    @contextmanager
+    def connect(self):
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get_coverage(self, connection, currency):
+        return connection.execute(
+            "SELECT first_day, last_day FROM coverage WHERE currency = ?"
+            " ORDER BY first_day",
+            (currency,),
+        ).fetchall()
+
+    def get_missing_ranges(self, currency, first_date, last_date):
+        first_day = first_date.toordinal()
+        last_day = last_date.toordinal()
+
+        with self.connect() as connection:
+            coverage = self.get_coverage(connection, currency)
+
+        missing_ranges = []
+        for covered_first_day, covered_last_day in coverage:
+            if covered_last_day < first_day:
+                continue
+            if covered_first_day > last_day:
+                break
+            if covered_first_day > first_day:
+                missing_ranges.append((first_day, covered_first_day - 1))
+            first_day = max(first_day, covered_last_day + 1)
+
+        if first_day <= last_day:
+            missing_ranges.append((first_day, last_day))
+
+        return [
+            (datetime.fromordinal(first), datetime.fromordinal(last))
+            for first, last in missing_ranges
+        ]
+
+    def save(self, currency, first_date, last_date, exchange_rates):
+        """Store rates downloaded for a date range and mark the range as done.
+
+        Today and future days are not marked as done because their rates may
+        not be published yet.
+        """
+        self.save_currencies(first_date, last_date, {currency: exchange_rates})
+
+    def save_currencies(self, first_date, last_date, currencies_exchange_rates):
+        first_day = first_date.toordinal()
+        last_day = min(
+            last_date.toordinal(), (datetime.now() - timedelta(days=1)).toordinal()
+        )
+
+        with self.connect() as connection:
+            for currency, exchange_rates in currencies_exchange_rates.items():
+                connection.executemany(
+                    "INSERT OR REPLACE INTO exchange_rates (currency, day, rate)"
+                    " VALUES (?, ?, ?)",
+                    [
+                        (currency, date.toordinal(), str(rate))
+                        for date, rate in exchange_rates.items()
+                    ],
+                )
+
+                if first_day <= last_day:
+                    self.add_coverage(connection, currency, first_day, last_day)
+
+    def add_coverage(self, connection, currency, first_day, last_day):
+        for covered_first_day, covered_last_day in self.get_coverage(
+            connection, currency
+        ):
+            if covered_last_day + 1 < first_day or covered_first_day - 1 > last_day:
+                continue
+            first_day = min(first_day, covered_first_day)
+            last_day = max(last_day, covered_last_day)
+
+        connection.execute(
+            "DELETE FROM coverage WHERE currency = ? AND first_day >= ?"
+            " AND last_day <= ?",
+            (currency, first_day, last_day),
+        )
+        connection.execute(
+            "INSERT INTO coverage (currency, first_day, last_day) VALUES (?, ?, ?)",
+            (currency, first_day, last_day),
+        )
+
+    def load(self, currency, first_date, last_date):
+        with self.connect() as connection:
+            rows = connection.execute(
+                "SELECT day, rate FROM exchange_rates WHERE currency = ?"
+                " AND day BETWEEN ? AND ? ORDER BY day",
+                (currency, first_date.toordinal(), last_date.toordinal()),
+            ).fetchall()
+
+        return {datetime.fromordinal(day): decimal.Decimal(rate) for day, rate in rows}
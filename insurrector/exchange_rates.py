@@ -1,11 +1,13 @@
-import csv
 import decimal
-import locale
+import http.client
 import logging
-import urllib.request
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from io import StringIO
-from urllib.parse import urlencode
+from urllib.parse import urlencode, urlsplit
 
 from dateutil.relativedelta import relativedelta
 
@@ -13,101 +15,617 @@ from insurrector import (
     CNB_BASE_URL,
     CNB_CSV_HEADER_ROWS,
     CNB_DATE_FORMAT,
+    CNB_MAX_ATTEMPTS,
+    CNB_MAX_WORKERS,
+    CNB_RETRY_BACKOFF,
     CNB_SPLIT_BY_MONTHS,
+    CNB_TIMEOUT,
+    CNB_YEAR_DATE_COLUMN,
+    CNB_YEAR_URL,
 )
 from insurrector.cached_exchange_rates import load_exchange_rates
 
 logger = logging.getLogger("exchange_rates")
 
+EXCHANGE_RATE_LOOKUP_NEAREST = "nearest"
+EXCHANGE_RATE_LOOKUP_LAST = "last"
+EXCHANGE_RATE_LOOKUPS = [EXCHANGE_RATE_LOOKUP_NEAREST, EXCHANGE_RATE_LOOKUP_LAST]
+
+CNB_SOURCE_RANGE = "range"
+CNB_SOURCE_YEAR = "year"
+CNB_SOURCES = [CNB_SOURCE_RANGE, CNB_SOURCE_YEAR]
+
+EXCHANGE_RATE_BASE_CURRENCY = "CZK"
+EXCHANGE_RATE_PROVIDER_MAX_ENTRIES = 32
+BUNDLED_EXCHANGE_RATES_CURRENCY = "USD"
+
 decimal.getcontext().rounding = decimal.ROUND_HALF_UP
 
 
-def get_exchange_rates(first_date, last_date):
+def get_exchange_rates(
+    first_date, last_date, currencies, store=None, source=CNB_SOURCE_RANGE
+):
+    """Get exchange rates of all currencies, returned as {currency: {date: rate}}."""
     first_date -= relativedelta(
         months=1
     )  # Get one extra month of data to ensure there was a published exchange rate
-    exchange_rates = {}
+    if store is None:
+        if source == CNB_SOURCE_YEAR:
+            years = range(first_date.year, last_date.year + 1)
+            return query_year_exchange_rates(years, currencies)
+        return query_exchange_rates_ranges(
+            [(currency, first_date, last_date) for currency in currencies]
+        )
+
+    # The nearest rate may be published after the last trade date
+    last_date = max(last_date, min(last_date + relativedelta(months=1), datetime.now()))
+    missing_ranges = [
+        (currency, missing_first_date, missing_last_date)
+        for currency in currencies
+        for missing_first_date, missing_last_date in store.get_missing_ranges(
+            currency, first_date, last_date
+        )
+    ]
+    if source == CNB_SOURCE_YEAR:
+        years = {
+            year
+            for _, missing_first_date, missing_last_date in missing_ranges
+            for year in range(missing_first_date.year, missing_last_date.year + 1)
+        }
+        if years:
+            query_year_exchange_rates(sorted(years), currencies, store)
+    elif missing_ranges:
+        query_exchange_rates_ranges(missing_ranges, store)
+
+    return {
+        currency: store.load(currency, first_date, last_date) for currency in currencies
+    }
+
+
+def get_cnb_date_ranges(first_date, last_date):
+    date_ranges = []
     while True:
         curr_fs_date = first_date
         curr_ls_date = first_date + relativedelta(months=CNB_SPLIT_BY_MONTHS)
-        exchange_rates.update(query_exchange_rates(curr_fs_date, curr_ls_date))
+        date_ranges.append((curr_fs_date, curr_ls_date))
         first_date = curr_ls_date + relativedelta(days=1)
 
         if first_date > last_date:
             break
 
+    return date_ranges
+
+
+def query_exchange_rates_ranges(currency_ranges, store=None):
+    """Download exchange rates of (currency, first date, last date) ranges.
+
+    Ranges are split into CNB_SPLIT_BY_MONTHS chunks, which are downloaded
+    concurrently, but decoded and stored in order as they become available.
+    """
+    chunks = [
+        (currency, curr_fs_date, curr_ls_date)
+        for currency, first_date, last_date in currency_ranges
+        for curr_fs_date, curr_ls_date in get_cnb_date_ranges(first_date, last_date)
+    ]
+
+    exchange_rates = {}
+    with ThreadPoolExecutor(max_workers=min(CNB_MAX_WORKERS, len(chunks))) as executor:
+        texts = iter_downloaded_exchange_rates(
+            executor.map(download_exchange_rates, *zip(*chunks))
+        )
+        for (currency, curr_fs_date, curr_ls_date), text in zip(chunks, texts):
+            chunk = parse_exchange_rates(text)
+            if store is not None:
+                store.save(currency, curr_fs_date, curr_ls_date, chunk)
+            exchange_rates.setdefault(currency, {}).update(chunk)
+
+    return exchange_rates
+
+
+def query_year_exchange_rates(years, currencies, store=None):
+    """Download whole-year tables of all currencies, one request per year.
+
+    Every currency of the table is saved to the store, so past years never
+    need to be downloaded again.
+    """
+    exchange_rates = {currency: {} for currency in currencies}
+    with ThreadPoolExecutor(max_workers=min(CNB_MAX_WORKERS, len(years))) as executor:
+        texts = iter_downloaded_exchange_rates(
+            executor.map(download_year_exchange_rates, years)
+        )
+        for year, text in zip(years, texts):
+            currencies_exchange_rates = parse_year_exchange_rates(text)
+            if store is not None:
+                store.save_currencies(
+                    datetime(year, 1, 1),
+                    datetime(year, 12, 31),
+                    currencies_exchange_rates,
+                )
+            for currency in currencies:
+                exchange_rates[currency].update(
+                    currencies_exchange_rates.get(currency, {})
+                )
+
     return exchange_rates
 
 
-def query_exchange_rates(first_date, last_date):
+def iter_downloaded_exchange_rates(texts):
+    try:
+        yield from texts
+    except Exception as e:
+        logger.error(
+            f"Unable to get exchange rate from CNB. Please, try again later: {e}."
+        )
+        raise SystemExit(1)
+
+
+def query_exchange_rates(currency, first_date, last_date):
+    texts = iter_downloaded_exchange_rates(
+        map(download_exchange_rates, [currency], [first_date], [last_date])
+    )
+    return parse_exchange_rates(next(texts))
+
+
+_connections = threading.local()
+
+
+def get_cnb_connection(url):
+    connections = getattr(_connections, "connections", None)
+    if connections is None:
+        connections = _connections.connections = {}
+
+    key = (url.scheme, url.netloc)
+    if key not in connections:
+        if url.scheme == "https":
+            connection_class = http.client.HTTPSConnection
+        else:
+            connection_class = http.client.HTTPConnection
+        connections[key] = connection_class(url.netloc, timeout=CNB_TIMEOUT)
+
+    return connections[key]
+
+
+def close_cnb_connection(url):
+    connections = getattr(_connections, "connections", {})
+    connection = connections.pop((url.scheme, url.netloc), None)
+    if connection is not None:
+        connection.close()
+
+
+def download_cnb_text(url):
+    """Download a CNB text file over a reused connection.
+
+    Connection errors, HTTP 429 and HTTP 5xx responses are retried with an
+    exponential backoff.
+    """
+    url = urlsplit(url)
+    path = f"{url.path}?{url.query}"
+
+    for attempt in range(1, CNB_MAX_ATTEMPTS + 1):
+        try:
+            connection = get_cnb_connection(url)
+            connection.request("GET", path)
+            response = connection.getresponse()
+            data = response.read()
+            if response.status == 200:
+                return data.decode("utf-8")
+
+            error = f"HTTP {response.status} {response.reason}"
+            if response.status != 429 and response.status < 500:
+                raise RuntimeError(error)
+        except (OSError, http.client.HTTPException) as e:
+            close_cnb_connection(url)
+            error = e
+
+        if attempt == CNB_MAX_ATTEMPTS:
+            raise RuntimeError(error)
+
+        delay = CNB_RETRY_BACKOFF * 2 ** (attempt - 1)
+        logger.debug(f"Retrying [{url.geturl()}] in {delay}s: {error}")
+        time.sleep(delay)
+
+
+def download_exchange_rates(currency, first_date, last_date):
     logger.debug(
-        f"Obtaining exchange rate from date range: [{first_date}] - [{last_date}]"
+        f"Obtaining [{currency}] exchange rate from date range: [{first_date}] - [{last_date}]"
     )
 
     params = {
-        "mena": "USD",
+        "mena": currency,
         "format": "txt",
+        "od": first_date.strftime(CNB_DATE_FORMAT),
+        "do": last_date.strftime(CNB_DATE_FORMAT),
     }
+    return download_cnb_text(CNB_BASE_URL + urlencode(params))
 
-    params["od"] = first_date.strftime(CNB_DATE_FORMAT)
-    params["do"] = last_date.strftime(CNB_DATE_FORMAT)
 
-    exchange_rates = {}
-    oldnumericlocale = locale.getlocale(locale.LC_NUMERIC)
+def download_year_exchange_rates(year):
+    logger.debug(f"Obtaining exchange rates of year: [{year}]")
+
+    return download_cnb_text(CNB_YEAR_URL + urlencode({"rok": year}))
 
-    try:
-        response = urllib.request.urlopen(CNB_BASE_URL + urlencode(params))
 
-        data = response.read()
-        text = data.decode("utf-8")
+def parse_cnb_decimal(s):
+    """Parse a CNB number with decimal comma and optional space thousands separators."""
+    if not s.isascii() or " " in s:
+        s = "".join(s.split())
+    return decimal.Decimal(s.replace(",", "."))
 
-        fd = StringIO(text)
 
-        reader = csv.reader(fd, delimiter="|")
+def parse_cnb_date(s):
+    day, month, year = s.split(".")
+    return datetime(int(year), int(month), int(day))
+
+
+def parse_year_exchange_rates(text):
+    """Parse a whole-year table into rates for one unit of every currency.
+
+    The table starts with a "Datum|1 AUD|...|100 IDR|..." header, which is
+    repeated whenever the set of published currencies changes.
+    """
+    exchange_rates = {}
+    columns = []
+    try:
+        for row in text.splitlines():
+            if not row.strip():
+                continue
 
-        locale.setlocale(locale.LC_NUMERIC, "cs_CZ.utf8")
-        locale.getlocale(locale.LC_NUMERIC)
-        for index, row in enumerate(reader):
-            if index < CNB_CSV_HEADER_ROWS:
+            row = row.split("|")
+            if row[0] == CNB_YEAR_DATE_COLUMN:
+                columns = []
+                for column in row[1:]:
+                    amount, currency = column.split()
+                    columns.append((currency, decimal.Decimal(amount)))
                 continue
 
-            if not row:
+            date = parse_cnb_date(row[0])
+            for (currency, amount), value in zip(columns, row[1:]):
+                if value.strip():
+                    exchange_rates.setdefault(currency, {})[date] = (
+                        parse_cnb_decimal(value) / amount
+                    )
+    except Exception as e:
+        logging.exception(
+            f"Unable to get exchange rate from CNB. Please, try again later: {e}."
+        )
+        raise SystemExit(1)
+
+    return exchange_rates
+
+
+def parse_exchange_rates(text):
+    """Parse a "vybrane.txt" response into rates for one unit of the currency.
+
+    The response starts with CNB_CSV_HEADER_ROWS header rows, the first one
+    being "Měna: JPY|Množství: 100" as rates are published per amount.
+    """
+    exchange_rates = {}
+
+    try:
+        rows = text.splitlines()
+        amount = decimal.Decimal(rows[0].rsplit(":", 1)[-1].strip())
+
+        for row in rows[CNB_CSV_HEADER_ROWS:]:
+            if not row.strip():
                 continue
 
-            date = datetime.strptime(row[0], CNB_DATE_FORMAT)
-            exchange_rates[date] = locale.atof(row[1].strip(), decimal.Decimal)
+            row = row.split("|")
+            rate = parse_cnb_decimal(row[1])
+            if amount != 1:
+                rate /= amount
+            exchange_rates[parse_cnb_date(row[0])] = rate
     except Exception as e:
         logging.exception(
             f"Unable to get exchange rate from CNB. Please, try again later: {e}."
         )
         raise SystemExit(1)
-    finally:
-        locale.setlocale(locale.LC_NUMERIC, oldnumericlocale)
 
     return exchange_rates
 
 
-def find_last_published_exchange_rate(exchange_rates, search_date):
-    return min(exchange_rates.keys(), key=lambda date: abs(date - search_date))
+class ExchangeRateIndex(object):
+    """Sorted exchange rates searchable by trade date in O(log n).
+
+    EXCHANGE_RATE_LOOKUP_NEAREST picks the closest published rate, preferring
+    the earlier one on ties. EXCHANGE_RATE_LOOKUP_LAST picks the last rate
+    published on or before the trade date. Rates can be any sequence, so they
+    may be decoded only when looked up.
+    """
+
+    def __init__(self, ordinals, rates):
+        self.ordinals = ordinals
+        self.rates = rates
+
+    @classmethod
+    def from_exchange_rates(cls, exchange_rates):
+        dates = sorted(exchange_rates)
+        return cls(
+            [date.toordinal() for date in dates],
+            [exchange_rates[date] for date in dates],
+        )
+
+    def find(self, search_date, lookup=EXCHANGE_RATE_LOOKUP_NEAREST):
+        ordinal = search_date.toordinal()
+        index = bisect_right(self.ordinals, ordinal)
+
+        if index and self.ordinals[index - 1] == ordinal:
+            return index - 1
+
+        if lookup == EXCHANGE_RATE_LOOKUP_LAST:
+            if index == 0:
+                logger.warning(
+                    f"No exchange rate published before [{search_date}], using the earliest one."
+                )
+                return 0
+            return index - 1
+
+        if index == 0:
+            return 0
+        if index == len(self.ordinals):
+            return index - 1
+
+        if ordinal - self.ordinals[index - 1] <= self.ordinals[index] - ordinal:
+            return index - 1
+        return index
+
+    def lookup(self, search_date, lookup=EXCHANGE_RATE_LOOKUP_NEAREST):
+        index = self.find(search_date, lookup)
+        return datetime.fromordinal(self.ordinals[index]), self.rates[index]
+
+
+class ExchangeRateTable(object):
+    """Exchange rates of several currencies indexed by currency and day ordinal."""
+
+    def __init__(self):
+        self.indexes = {}
+
+    def __contains__(self, currency):
+        return currency == EXCHANGE_RATE_BASE_CURRENCY or currency in self.indexes
+
+    def lookup(self, currency, search_date, lookup=EXCHANGE_RATE_LOOKUP_NEAREST):
+        if currency == EXCHANGE_RATE_BASE_CURRENCY:
+            return search_date, decimal.Decimal(1)
+        return self.indexes[currency].lookup(search_date, lookup)
+
+
+class ExchangeRateProvider(object):
+    """Loads exchange rate indexes and keeps recently used ranges in memory.
+
+    A cached range serves any request within it. CNB ranges reaching the day
+    they were loaded on are trusted only on that day, since the rate of that
+    day may not have been published yet. The provider is thread-safe and
+    meant to be shared by all runs in a process.
+    """
+
+    def __init__(self, max_entries=EXCHANGE_RATE_PROVIDER_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def find_index(self, currency, use_cnb, source, first_day, last_day):
+        today = datetime.now().toordinal()
+        for key, index in self.entries.items():
+            (
+                entry_currency,
+                entry_use_cnb,
+                entry_source,
+                entry_first_day,
+                entry_last_day,
+                loaded_day,
+            ) = key
+            if (entry_currency, entry_use_cnb, entry_source) != (
+                currency,
+                use_cnb,
+                source,
+            ):
+                continue
+
+            if use_cnb and loaded_day != today:
+                entry_last_day = min(entry_last_day, loaded_day - 1)
+
+            if entry_first_day <= first_day and last_day <= entry_last_day:
+                self.entries.move_to_end(key)
+                return index
+
+        return None
+
+    def add_index(self, currency, use_cnb, source, first_day, last_day, index):
+        key = (
+            currency,
+            use_cnb,
+            source,
+            first_day,
+            last_day,
+            datetime.now().toordinal(),
+        )
+        self.entries[key] = index
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get_indexes(
+        self,
+        first_date,
+        last_date,
+        use_cnb,
+        currencies,
+        store=None,
+        source=CNB_SOURCE_RANGE,
+    ):
+        """Get {currency: ExchangeRateIndex}, loading all missing currencies at once."""
+        if not use_cnb:
+            # Bundled rates do not depend on the date range or CNB source
+            source = None
+            first_date, last_date = datetime.min, datetime.max
+        first_day = first_date.toordinal()
+        last_day = last_date.toordinal()
+
+        with self.lock:
+            indexes = {}
+            missing_currencies = []
+            for currency in currencies:
+                index = self.find_index(currency, use_cnb, source, first_day, last_day)
+                if index is None:
+                    missing_currencies.append(currency)
+                else:
+                    indexes[currency] = index
+
+            self.hits += len(indexes)
+            self.misses += len(missing_currencies)
+            logger.debug(
+                f"Exchange rates cache hits: {sorted(indexes)}, misses: {missing_currencies}."
+            )
+
+            if missing_currencies:
+                loaded_indexes = load_exchange_rate_indexes(
+                    first_date, last_date, use_cnb, missing_currencies, store, source
+                )
+                for currency, index in loaded_indexes.items():
+                    self.add_index(
+                        currency, use_cnb, source, first_day, last_day, index
+                    )
+                indexes.update(loaded_indexes)
+
+        return indexes
+
+
+default_exchange_rate_provider = ExchangeRateProvider()
+
+
+def get_statement_currencies(statements):
+    return {statement["currency"] for statement in statements}
+
+
+def load_exchange_rate_indexes(
+    first_date, last_date, use_cnb, currencies, store=None, source=CNB_SOURCE_RANGE
+):
+    if not use_cnb:
+        unsupported_currencies = [
+            currency
+            for currency in currencies
+            if currency != BUNDLED_EXCHANGE_RATES_CURRENCY
+        ]
+        if unsupported_currencies:
+            logger.error(
+                f"Bundled exchange rates are available only for [{BUNDLED_EXCHANGE_RATES_CURRENCY}], found {unsupported_currencies}. Please, use CNB online service."
+            )
+            raise SystemExit(1)
+        return {
+            BUNDLED_EXCHANGE_RATES_CURRENCY: ExchangeRateIndex(*load_exchange_rates())
+        }
+
+    indexes = {}
+    for currency, exchange_rates in get_exchange_rates(
+        first_date, last_date, currencies, store, source
+    ).items():
+        if not exchange_rates:
+            logger.error(f"No exchange rates found for currency [{currency}].")
+            raise SystemExit(1)
+        indexes[currency] = ExchangeRateIndex.from_exchange_rates(exchange_rates)
+
+    return indexes
+
+
+def load_exchange_rates_range(
+    first_date,
+    last_date,
+    use_cnb,
+    currencies,
+    store=None,
+    source=CNB_SOURCE_RANGE,
+    exchange_rates=None,
+    provider=None,
+):
+    """Load rates of currencies missing in the exchange_rates table in one pass."""
+    if exchange_rates is None:
+        exchange_rates = ExchangeRateTable()
+    if provider is None:
+        provider = default_exchange_rate_provider
+
+    currencies = sorted(
+        currency for currency in currencies if currency not in exchange_rates
+    )
+    if currencies:
+        exchange_rates.indexes.update(
+            provider.get_indexes(
+                first_date, last_date, use_cnb, currencies, store, source
+            )
+        )
+
+    return exchange_rates
+
+
+def assign_exchange_rate(
+    statement, exchange_rates, lookup=EXCHANGE_RATE_LOOKUP_NEAREST
+):
+    (
+        statement["exchange_rate_date"],
+        statement["exchange_rate"],
+    ) = exchange_rates.lookup(statement["currency"], statement["trade_date"], lookup)
 
 
-def populate_exchange_rates(statements, use_cnb):
+def populate_exchange_rates(
+    statements,
+    use_cnb,
+    lookup=EXCHANGE_RATE_LOOKUP_NEAREST,
+    store=None,
+    source=CNB_SOURCE_RANGE,
+    provider=None,
+):
     first_date = statements[0]["trade_date"]
     last_date = statements[-1]["trade_date"]
 
-    exchange_rates = {}
-    if use_cnb:
-        exchange_rates = get_exchange_rates(first_date, last_date)
-    else:
-        exchange_rates = load_exchange_rates()
+    exchange_rates = load_exchange_rates_range(
+        first_date,
+        last_date,
+        use_cnb,
+        get_statement_currencies(statements),
+        store,
+        source,
+        provider=provider,
+    )
 
     for statement in statements:
-        if statement["trade_date"] in exchange_rates:
-            statement["exchange_rate"] = exchange_rates[statement["trade_date"]]
-            statement["exchange_rate_date"] = statement["trade_date"]
-            continue
+        assign_exchange_rate(statement, exchange_rates, lookup)
 
-        statement["exchange_rate_date"] = find_last_published_exchange_rate(
-            exchange_rates, statement["trade_date"]
-        )
-        statement["exchange_rate"] = exchange_rates[statement["exchange_rate_date"]]
+
+def iter_populated_exchange_rates(
+    statement_chunks,
+    use_cnb,
+    lookup=EXCHANGE_RATE_LOOKUP_NEAREST,
+    store=None,
+    source=CNB_SOURCE_RANGE,
+    provider=None,
+):
+    """Populate exchange rates of statement chunks consumed from an iterator.
+
+    The last trade date is not known in advance, so rates are loaded up to
+    today. Rates of currencies are loaded with the first chunk they appear in.
+    """
+    exchange_rates = ExchangeRateTable()
+    first_date = None
+    for statements in statement_chunks:
+        if first_date is None and statements:
+            first_date = statements[0]["trade_date"]
+
+        if statements:
+            load_exchange_rates_range(
+                first_date,
+                datetime.now(),
+                use_cnb,
+                get_statement_currencies(statements),
+                store,
+                source,
+                exchange_rates,
+                provider,
+            )
+
+        for statement in statements:
+            assign_exchange_rate(statement, exchange_rates, lookup)
+        yield statements
@@ -0,0 +1,111 @@
+import decimal
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+
+from insurrector.records import Record
+from insurrector.utils import get_cache_dir, hash_file
+
+logger = logging.getLogger("parsers")
+
+ACTIVITIES_CACHE_MAX_SIZE = 64 * 1024 * 1024
+ACTIVITIES_CACHE_FILE_EXTENSION = ".json"
+
+
+def encode_value(value):
+    if isinstance(value, Record):
+        return dict(value.items())
+    if isinstance(value, decimal.Decimal):
+        return {"__decimal__": str(value)}
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Unable to encode value of type [{type(value).__name__}].")
+
+
+def decode_value(value):
+    if "__decimal__" in value:
+        return decimal.Decimal(value["__decimal__"])
+    if "__datetime__" in value:
+        return datetime.fromisoformat(value["__datetime__"])
+    return value
+
+
+class ActivitiesCache(object):
+    """Parsed activities per statement file, stored as JSON files.
+
+    Writing entries does not evict old ones, since parsers may write from
+    several processes. Call evict() once all statement files are parsed.
+    """
+
+    def __init__(
+        self, cache_dir=None, max_size=ACTIVITIES_CACHE_MAX_SIZE, rebuild=False
+    ):
+        if cache_dir is None:
+            cache_dir = get_cache_dir("activities")
+
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.rebuild = rebuild
+
+    def get_key(self, statement_file, namespace):
+        return hash_file(statement_file, namespace)
+
+    def get_path(self, key):
+        return os.path.join(self.cache_dir, key + ACTIVITIES_CACHE_FILE_EXTENSION)
+
+    def get(self, key):
+        if self.rebuild:
+            return None
+
+        path = self.get_path(key)
+        try:
+            with open(path, "r") as fd:
+                activities = json.load(fd, object_hook=decode_value)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.warning(f"Ignoring corrupted cache entry[{path}].")
+            return None
+
+        os.utime(path)
+        return activities
+
+    def set(self, key, activities):
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as temp_fd:
+                json.dump(activities, temp_fd, default=encode_value)
+            os.replace(temp_path, self.get_path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_size."""
+        entries = []
+        total_size = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(ACTIVITIES_CACHE_FILE_EXTENSION):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_size += stat.st_size
+
+        if total_size <= self.max_size:
+            return
+
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            logger.debug(f"Evicted cache entry[{path}].")
+            total_size -= size
@@ -1,4 +1,5 @@
 import csv
+from itertools import islice
 from datetime import datetime
 import logging
 import decimal
@@ -6,8 +7,8 @@ import decimal
 decimal.getcontext().rounding = decimal.ROUND_HALF_UP
 
 from insurrector import RECEIVED_DIVIDEND_ACTIVITY_TYPES, TAX_DIVIDEND_ACTIVITY_TYPES
-from insurrector.utils import list_statement_files
 from insurrector.parsers.parser import StatementFilesParser
+from insurrector.records import Activity
 
 logger = logging.getLogger("parsers")
 
@@ -19,6 +20,7 @@ CSV_DATE_FORMATS = [
     "%m/%d/%Y",
     "%Y/%m/%d",
 ]
+CSV_ISO_DATE_FORMAT = "%Y-%m-%d"
 CSV_ACTIVITY_TYPES = (
     ["SELL", "BUY", "SSP", "SSO", "MAS"]
     + RECEIVED_DIVIDEND_ACTIVITY_TYPES
@@ -33,19 +35,38 @@ CSV_REQUIRED_COLUMNS = [
     "price",
     "amount",
 ]
+CSV_DEFAULT_CURRENCY = "USD"
 
 
 class Parser(StatementFilesParser):
-    def parse_date(self, date_string):
+    VERSION = 2
+    FILE_EXTENSION = "csv"
+    SORT_KEY_PARSES_FILE = False
+
+    def infer_date_format(self, date_string):
         for date_format in CSV_DATE_FORMATS:
             try:
-                return datetime.strptime(date_string, date_format)
+                datetime.strptime(date_string, date_format)
+                return date_format
             except ValueError:
                 pass
 
         logger.error(f"Unable to parse date: [{date_string}].")
         raise SystemExit(1)
 
+    def parse_date(self, date_string, date_format=None):
+        if date_format is None:
+            date_format = self.infer_date_format(date_string)
+
+        try:
+            if date_format == CSV_ISO_DATE_FORMAT and len(date_string) == 10:
+                return datetime.fromisoformat(date_string)
+            return datetime.strptime(date_string, date_format)
+        except ValueError:
+            pass
+
+        return datetime.strptime(date_string, self.infer_date_format(date_string))
+
     def clean_number(self, number_string):
         return number_string.replace("(", "").replace(")", "").replace(",", "")
 
@@ -66,10 +87,9 @@ class Parser(StatementFilesParser):
 
         return headers
 
-    def extract_activities(self, viewer):
-        activities = []
-
+    def iter_file_activities(self, viewer):
         headers = None
+        date_format = None
         for index, row in enumerate(viewer):
             if index == 0:
                 headers = self.read_headers(row)
@@ -78,50 +98,65 @@ class Parser(StatementFilesParser):
                 continue
 
             if row[headers["activity_type"]] in CSV_ACTIVITY_TYPES:
-                activity = {
-                    "trade_date": self.parse_date(row[headers["trade_date"]]),
-                    "settle_date": "-",
-                    "currency": "USD",
-                    "activity_type": row[headers["activity_type"]],
-                    "symbol": row[headers["symbol"]],
-                    "company": row[headers["company"]],
-                    "symbol_description": row[headers["symbol"]]
+                trade_date = row[headers["trade_date"]]
+                if date_format is None:
+                    date_format = self.infer_date_format(trade_date)
+
+                activity = Activity(
+                    trade_date=self.parse_date(trade_date, date_format),
+                    settle_date="-",
+                    currency=row[headers["currency"]]
+                    if "currency" in headers
+                    else CSV_DEFAULT_CURRENCY,
+                    activity_type=row[headers["activity_type"]],
+                    symbol=row[headers["symbol"]],
+                    company=row[headers["company"]],
+                    symbol_description=row[headers["symbol"]]
                     + " - "
                     + row[headers["company"]],
-                    "quantity": decimal.Decimal(
+                    quantity=decimal.Decimal(
                         self.clean_number(row[headers["quantity"]])
                     ),
-                    "price": decimal.Decimal(self.clean_number(row[headers["price"]])),
-                    "amount": decimal.Decimal(
-                        self.clean_number(row[headers["amount"]])
-                    ),
-                }
+                    price=decimal.Decimal(self.clean_number(row[headers["price"]])),
+                    amount=decimal.Decimal(self.clean_number(row[headers["amount"]])),
+                )
 
-                activities.append(activity)
+                yield activity
 
-        return activities
+    def extract_activities(self, viewer):
+        return list(self.iter_file_activities(viewer))
 
-    def parse(self):
-        statements = []
+    def read_activities(self, statement_file):
+        logger.debug(f"Processing statement file[{statement_file}]")
 
-        statement_files = list_statement_files(self.input_dir, "csv")
-        if not statement_files:
-            logger.error(f"No statement files found.")
-            raise SystemExit(1)
+        with open(statement_file, "r") as fd:
+            viewer = csv.reader(fd, delimiter=",")
+            return self.extract_activities(viewer)
 
-        logger.info(f"Collected statement files for processing: {statement_files}.")
+    def get_statement_file_sort_key(self, statement_file):
+        with open(statement_file, "r") as fd:
+            viewer = csv.reader(fd, delimiter=",")
+            for activity in self.iter_file_activities(viewer):
+                return activity["trade_date"]
 
-        for statement_file in statement_files:
+        return None
+
+    def iter_activity_chunks(self, chunk_size):
+        """Read statement files row by row in chunks of chunk_size activities.
+
+        The cache is bypassed because it keeps whole files.
+        """
+        for statement_file in self.get_sorted_statement_files():
             logger.debug(f"Processing statement file[{statement_file}]")
 
             with open(statement_file, "r") as fd:
                 viewer = csv.reader(fd, delimiter=",")
-                activities = self.extract_activities(viewer)
-                if not activities:
-                    continue
-                statements.extend(activities)
-
-        return statements
+                activities = self.iter_file_activities(viewer)
+                while True:
+                    chunk = list(islice(activities, chunk_size))
+                    if not chunk:
+                        break
+                    yield chunk
 
     @staticmethod
     def get_unsupported_activity_types(statements):
@@ -1,9 +1,143 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from insurrector.activity_table import ACTIVITY_TABLE_CHUNK_SIZE, ActivityTable
+from insurrector.records import Activity
+from insurrector.utils import list_statement_files
+
+logger = logging.getLogger("parsers")
+
+STATEMENT_FILES_MAX_CHUNKSIZE = 64
+
+
 class StatementFilesParser(object):
-    def __init__(self, input_dir):
+    VERSION = 1
+    FILE_EXTENSION = None
+    # Whether get_statement_file_sort_key() parses the whole statement file.
+    SORT_KEY_PARSES_FILE = True
+
+    def __init__(self, input_dir, jobs=1, cache=None):
         self.input_dir = input_dir
+        self.jobs = jobs
+        self.cache = cache
+
+    def get_statement_files(self):
+        statement_files = list_statement_files(self.input_dir, self.FILE_EXTENSION)
+        if not statement_files:
+            logger.error(f"No statement files found.")
+            raise SystemExit(1)
+
+        logger.info(f"Collected statement files for processing: {statement_files}.")
+        return statement_files
+
+    def map_statement_files(self, func, statement_files):
+        if self.jobs <= 1 or len(statement_files) <= 1:
+            return map(func, statement_files)
+
+        # Hand out several small files per task so thousands of per-day files do
+        # not pay the inter-process round trip each. Results keep the order of
+        # statement_files regardless of which worker finishes first.
+        chunksize = max(
+            1,
+            min(STATEMENT_FILES_MAX_CHUNKSIZE, len(statement_files) // (self.jobs * 4)),
+        )
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            return list(executor.map(func, statement_files, chunksize=chunksize))
+
+    def get_cache_namespace(self):
+        return f"{type(self).__module__}.{type(self).__name__}:{self.VERSION}"
+
+    def read_activities(self, statement_file):
+        raise NotImplementedError("Statement file reading is not implemented")
+
+    def extract_file_activities(self, statement_file):
+        if self.cache is None:
+            return self.read_activities(statement_file)
+
+        key = self.cache.get_key(statement_file, self.get_cache_namespace())
+        activities = self.cache.get(key)
+        if activities is not None:
+            logger.debug(f"Cache hit for statement file[{statement_file}].")
+            return [Activity(**activity) for activity in activities]
+
+        logger.debug(f"Cache miss for statement file[{statement_file}].")
+        activities = self.read_activities(statement_file)
+        self.cache.set(key, activities)
+        return activities
+
+    def get_statement_sort_key(self, activities):
+        return activities[0]["trade_date"]
+
+    def get_statement_file_sort_key(self, statement_file):
+        activities = self.extract_file_activities(statement_file)
+        if not activities:
+            return None
+        return self.get_statement_sort_key(activities)
+
+    def merge_statements(self, statements):
+        statements = sorted(
+            (activities for activities in statements if activities),
+            key=self.get_statement_sort_key,
+        )
+        return [activity for activities in statements for activity in activities]
 
     def parse(self):
-        pass
+        return self.merge_statements(
+            self.map_statement_files(
+                self.extract_file_activities, self.get_statement_files()
+            )
+        )
+
+    def parse_table(self, chunk_size=ACTIVITY_TABLE_CHUNK_SIZE):
+        """Parse all statement files into an ActivityTable. Requires NumPy.
+
+        Activities are read chunk_size rows at a time, in the order of
+        iter_activities(), so they are never all held in memory at once.
+        """
+        return ActivityTable.from_chunks(self.iter_activity_chunks(chunk_size))
+
+    def get_sorted_statement_files(self):
+        statement_files = self.get_statement_files()
+        if len(statement_files) == 1:
+            return statement_files
+
+        if self.cache is None and self.SORT_KEY_PARSES_FILE:
+            logger.warning(
+                "Statement files are parsed twice without the cache, once to order them and once to read their activities."
+            )
+
+        sort_keys = self.map_statement_files(
+            self.get_statement_file_sort_key, statement_files
+        )
+        statement_files = sorted(
+            (
+                (sort_key, statement_file)
+                for sort_key, statement_file in zip(sort_keys, statement_files)
+                if sort_key is not None
+            ),
+            key=lambda k: k[0],
+        )
+        return [statement_file for _, statement_file in statement_files]
+
+    def iter_activities(self):
+        """Yield activities of all statement files one file at a time.
+
+        Statement files are ordered the same way as in parse(). Only the sort
+        keys are kept for the first pass over the files, so at most one file's
+        activities are held in memory. Enable the cache to avoid parsing the
+        files twice.
+        """
+        for statement_file in self.get_sorted_statement_files():
+            yield from self.extract_file_activities(statement_file)
+
+    def iter_activity_chunks(self, chunk_size):
+        activities = self.iter_activities()
+        while True:
+            chunk = list(islice(activities, chunk_size))
+            if not chunk:
+                break
+            yield chunk
 
     @staticmethod
     def get_unsupported_activity_types(self):
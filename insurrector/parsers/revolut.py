@@ -1,16 +1,19 @@
 import decimal
 import logging
 import re
+from collections import deque
 from datetime import datetime
 
 from pdfreader import SimplePDFViewer
+from pdfreader.codecs.decoder import Decoder, default_decoder
+from pdfreader.types.native import HexString
 from pdfreader.viewer import PageDoesNotExist
 
 decimal.getcontext().rounding = decimal.ROUND_HALF_UP
 
 from insurrector import RECEIVED_DIVIDEND_ACTIVITY_TYPES, TAX_DIVIDEND_ACTIVITY_TYPES
 from insurrector.parsers.parser import StatementFilesParser
-from insurrector.utils import list_statement_files
+from insurrector.records import Activity
 
 logger = logging.getLogger("parsers")
 
@@ -26,14 +29,54 @@ REVOLUT_OUT_OF_ORDER_ACTIVITY_TYPES = ["SSP", "MAS"]
 REVOLUT_UNSUPPORTED_ACTIVITY_TYPES = ["SC", "NC", "MA"]
 REVOLUT_NO_COMPANY_ACTIVITY_TYPES = ["SSO"]
 REVOLUT_ACTIVITIES_PAGES_INDICATORS = ["Balance Summary", "ACTIVITY", "Equity"]
+REVOLUT_ACTIVITIES_END_INDICATOR = "SWEEP ACTIVITY"
 REVOLUT_DIGIT_PRECISION = "0.00000001"
 
+REVOLUT_TOKEN_DATE = "date"
+REVOLUT_TOKEN_CURRENCY = "currency"
+REVOLUT_TOKEN_ACTIVITY = "activity"
+REVOLUT_TOKEN_CASH_ACTIVITY = "cash_activity"
+REVOLUT_TOKEN_NUMBER = "number"
+REVOLUT_TOKEN_TEXT = "text"
+
+REVOLUT_DATE_RE = re.compile(r"\d{2}/\d{2}/\d{4}$")
+REVOLUT_CURRENCY_RE = re.compile(r"[A-Z]{3}$")
+REVOLUT_NUMBER_RE = re.compile(r"\s*[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?\s*$")
+
+
+# Font selections, string operands, graphics state saves and restores and
+# drawn XObjects of a page content stream. Used to find pages with activities
+# without interpreting the whole stream.
+REVOLUT_CONTENT_TOKEN_RE = re.compile(
+    rb"/([^\s/\[\]()<>{}%]+)\s+[-+.\d]+\s+Tf"
+    rb"|\(((?:\\.|[^\\()]|\((?:\\.|[^\\()])*\))*)\)"
+    rb"|(?<!<)<([0-9A-Fa-f\s]*)>(?!>)"
+    rb"|(?<![^\s\]>)}])([qQ])(?![^\s\[(<%/])"
+    rb"|/([^\s/\[\]()<>{}%]+)\s+Do\b",
+    re.DOTALL,
+)
+REVOLUT_INLINE_IMAGE_RE = re.compile(rb"\bBI\b")
+REVOLUT_LITERAL_ESCAPE_RE = re.compile(rb"\\(?:([0-7]{1,3})|(\r\n|.))", re.DOTALL)
+REVOLUT_LITERAL_ESCAPES = {
+    b"n": b"\n",
+    b"r": b"\r",
+    b"t": b"\t",
+    b"b": b"\b",
+    b"f": b"\f",
+    b"\n": b"",
+    b"\r": b"",
+    b"\r\n": b"",
+}
+
 
 class ActivitiesNotFound(Exception):
     pass
 
 
 class Parser(StatementFilesParser):
+    VERSION = 2
+    FILE_EXTENSION = "pdf"
+
     def get_activity_range(self, page_strings):
         begin_index = None
         end_index = None
@@ -65,22 +108,6 @@ class Parser(StatementFilesParser):
             )
             raise SystemExit(1)
 
-    def extract_symbol_description(self, begin_index, page_strings):
-        symbol_description = ""
-        end_index = begin_index
-        for page_string in page_strings[begin_index:]:
-            try:
-                decimal.Decimal(self.clean_number(page_string))
-                break
-            except decimal.InvalidOperation:
-                symbol_description += page_string
-            end_index += 1
-
-        if page_strings[end_index - 1] in REVOLUT_CASH_ACTIVITY_TYPES:
-            symbol_description = None
-
-        return end_index, symbol_description
-
     def clean_number(self, number_string):
         return number_string.replace("(", "").replace(")", "").replace(",", "")
 
@@ -99,47 +126,189 @@ class Parser(StatementFilesParser):
 
         return re.sub(r"\s{2,}", " ", company[:second_sep_index].strip())
 
-    def extract_activity(self, begin_index, page_strings, num_fields):
-        logger.debug(f"Page string: {page_strings}")
-        end_index, symbol_description = self.extract_symbol_description(
-            begin_index + 4, page_strings
+    def classify_string(self, page_string):
+        if page_string in REVOLUT_ACTIVITY_TYPES:
+            return REVOLUT_TOKEN_ACTIVITY
+        if page_string in REVOLUT_CASH_ACTIVITY_TYPES:
+            return REVOLUT_TOKEN_CASH_ACTIVITY
+        if REVOLUT_NUMBER_RE.match(self.clean_number(page_string)):
+            return REVOLUT_TOKEN_NUMBER
+        if REVOLUT_DATE_RE.match(page_string):
+            return REVOLUT_TOKEN_DATE
+        if REVOLUT_CURRENCY_RE.match(page_string):
+            return REVOLUT_TOKEN_CURRENCY
+        return REVOLUT_TOKEN_TEXT
+
+    def tokenize_activities(self, page_strings):
+        """Split activity page strings into activity rows in a single pass.
+
+        Yields tuples of the four leading row strings (trade date, settle date,
+        currency and activity type), the symbol description strings and the
+        trailing number strings.
+        """
+        preceding_strings = deque(maxlen=3)
+        row_strings = None
+        description_strings = None
+        number_strings = None
+        num_numbers = 0
+
+        for page_string in page_strings:
+            if number_strings:
+                number_strings.append(page_string)
+            else:
+                token = self.classify_string(page_string)
+
+                if row_strings is None:
+                    if token == REVOLUT_TOKEN_ACTIVITY:
+                        num_numbers = 3
+                    elif token == REVOLUT_TOKEN_CASH_ACTIVITY:
+                        num_numbers = 1
+                    else:
+                        preceding_strings.append(page_string)
+                        continue
+
+                    if len(preceding_strings) < 3:
+                        preceding_strings.append(page_string)
+                        continue
+
+                    row_strings = [*preceding_strings, page_string]
+                    description_strings = []
+                    number_strings = []
+                    continue
+
+                if token != REVOLUT_TOKEN_NUMBER:
+                    description_strings.append(page_string)
+                    continue
+
+                number_strings.append(page_string)
+
+            if len(number_strings) == num_numbers:
+                yield row_strings, description_strings, number_strings
+                preceding_strings.clear()
+                row_strings = None
+                number_strings = None
+
+    def extract_activity(self, row_strings, description_strings, number_strings):
+        logger.debug(
+            f"Activity strings: {row_strings + description_strings + number_strings}"
         )
+        trade_date, settle_date, currency, activity_type = row_strings
+
+        symbol_description = "".join(description_strings)
+        last_string = description_strings[-1] if description_strings else activity_type
+        if last_string in REVOLUT_CASH_ACTIVITY_TYPES:
+            symbol_description = None
+
         symbol = None
         if symbol_description is not None:
             symbol = self.extract_symbol(symbol_description)
 
-        activity = {
-            "trade_date": datetime.strptime(
-                page_strings[begin_index], REVOLUT_DATE_FORMAT
-            ),
-            "settle_date": datetime.strptime(
-                page_strings[begin_index + 1], REVOLUT_DATE_FORMAT
-            ),
-            "currency": page_strings[begin_index + 2],
-            "activity_type": page_strings[begin_index + 3],
-            "symbol_description": symbol_description,
-        }
-
-        if num_fields == 8:
+        activity = Activity(
+            trade_date=datetime.strptime(trade_date, REVOLUT_DATE_FORMAT),
+            settle_date=datetime.strptime(settle_date, REVOLUT_DATE_FORMAT),
+            currency=currency,
+            activity_type=activity_type,
+            symbol_description=symbol_description,
+        )
+
+        if len(number_strings) == 3:
             activity["symbol"] = symbol
-            activity["quantity"] = decimal.Decimal(page_strings[end_index])
-            activity["price"] = decimal.Decimal(page_strings[end_index + 1])
-            activity["amount"] = page_strings[end_index + 2]
+            activity["quantity"] = decimal.Decimal(number_strings[0])
+            activity["price"] = decimal.Decimal(number_strings[1])
+            activity["amount"] = number_strings[2]
             if activity["activity_type"] not in REVOLUT_NO_COMPANY_ACTIVITY_TYPES:
                 activity["company"] = self.get_stock_company(symbol_description)
-        elif num_fields == 6:
-            activity["amount"] = page_strings[end_index]
+        else:
+            activity["amount"] = number_strings[0]
 
         activity["amount"] = decimal.Decimal(self.clean_number(activity["amount"]))
 
         return activity
 
+    def unescape_literal_string(self, match):
+        octal, escape = match.groups()
+        if octal is not None:
+            return bytes([int(octal, 8) & 0xFF])
+
+        return REVOLUT_LITERAL_ESCAPES.get(escape, escape)
+
+    def scan_page_text(self, viewer):
+        """Decode the strings of a page without rendering it.
+
+        Raises ValueError for content the scan cannot follow, like inline
+        images or form XObjects, which may draw text of their own.
+        """
+        if REVOLUT_INLINE_IMAGE_RE.search(viewer.stream):
+            raise ValueError("page contains inline image data")
+
+        decoders = {}
+        decoder = default_decoder
+        # The font is part of the graphics state saved by q and restored by Q.
+        saved_decoders = []
+        text = []
+        for match in REVOLUT_CONTENT_TOKEN_RE.finditer(viewer.stream):
+            (
+                font_name,
+                literal,
+                hex_string,
+                state_operator,
+                xobject_name,
+            ) = match.groups()
+            if font_name is not None:
+                font_name = font_name.decode("latin1")
+                if font_name not in decoders:
+                    font = viewer.resources.Font.get(font_name)
+                    decoders[font_name] = (
+                        Decoder(font) if font is not None else default_decoder
+                    )
+                decoder = decoders[font_name]
+            elif literal is not None:
+                literal = REVOLUT_LITERAL_ESCAPE_RE.sub(
+                    self.unescape_literal_string, literal
+                )
+                text.append(decoder.decode_string(literal))
+            elif hex_string is not None:
+                hex_string = re.sub(rb"\s", b"", hex_string).upper().decode("ascii")
+                if len(hex_string) % 2:
+                    hex_string += "0"
+                text.append(decoder.decode_hexstring(HexString(hex_string)))
+            elif state_operator == b"q":
+                saved_decoders.append(decoder)
+            elif state_operator == b"Q":
+                if not saved_decoders:
+                    raise ValueError("graphics state restored without a save")
+                decoder = saved_decoders.pop()
+            else:
+                xobject_name = xobject_name.decode("latin1")
+                xobject = (viewer.resources.XObject or {}).get(xobject_name)
+                if xobject is None or xobject.get("Subtype") != "Image":
+                    raise ValueError(f"page draws XObject [{xobject_name}]")
+
+        return "".join(text)
+
+    def may_contain_activities(self, viewer):
+        try:
+            page_text = self.scan_page_text(viewer)
+        except Exception as e:
+            logger.debug(f"Unable to pre-scan page, rendering it instead: {e}.")
+            return True
+
+        return any(
+            indicator in page_text for indicator in REVOLUT_ACTIVITIES_PAGES_INDICATORS
+        )
+
     def extract_activities(self, viewer):
         activities = []
 
         while True:
-            viewer.render()
-            page_strings = viewer.canvas.strings
+            if self.may_contain_activities(viewer):
+                viewer.render()
+                page_strings = viewer.canvas.strings
+            else:
+                logger.debug(
+                    f"Skipping page [{viewer.current_page_number}] without activities"
+                )
+                page_strings = []
 
             logger.debug(f"Parsing page [{viewer.current_page_number}]")
 
@@ -149,23 +318,17 @@ class Parser(StatementFilesParser):
                 if page_strings[0] in REVOLUT_ACTIVITIES_PAGES_INDICATORS:
                     try:
                         begin_index, end_index = self.get_activity_range(page_strings)
-                        page_strings = page_strings[begin_index:end_index]
-                        for index, page_string in enumerate(page_strings):
-                            if page_string in REVOLUT_ACTIVITY_TYPES:
-                                activity = self.extract_activity(
-                                    index - 3, page_strings, 8
-                                )
-                            elif page_string in REVOLUT_CASH_ACTIVITY_TYPES:
-                                activity = self.extract_activity(
-                                    index - 3, page_strings, 6
-                                )
-                            else:
-                                continue
-
-                            activities.append(activity)
+                        for row in self.tokenize_activities(
+                            page_strings[begin_index:end_index]
+                        ):
+                            activities.append(self.extract_activity(*row))
                     except ActivitiesNotFound:
                         pass
 
+                if activities and REVOLUT_ACTIVITIES_END_INDICATOR in page_strings:
+                    logger.debug("Reached the end of activities.")
+                    break
+
             try:
                 viewer.next()
             except PageDoesNotExist:
@@ -178,31 +341,17 @@ class Parser(StatementFilesParser):
             if statement["activity_type"] not in REVOLUT_OUT_OF_ORDER_ACTIVITY_TYPES:
                 return index
 
-    def parse(self):
-        statements = []
-
-        statement_files = list_statement_files(self.input_dir, "pdf")
-        if not statement_files:
-            logger.error(f"No statement files found.")
-            raise SystemExit(1)
-
-        logger.info(f"Collected statement files for processing: {statement_files}.")
+    def read_activities(self, statement_file):
+        logger.debug(f"Processing statement file[{statement_file}]")
 
-        for statement_file in statement_files:
-            logger.debug(f"Processing statement file[{statement_file}]")
+        with open(statement_file, "rb") as fd:
+            viewer = SimplePDFViewer(fd)
+            return self.extract_activities(viewer)
 
-            with open(statement_file, "rb") as fd:
-                viewer = SimplePDFViewer(fd)
-                activities = self.extract_activities(viewer)
-                if not activities:
-                    continue
-                statements.append(activities)
-
-        statements = sorted(
-            statements,
-            key=lambda k: k[self.get_first_non_ssp_activity_index(k)]["trade_date"],
-        )
-        return [activity for activities in statements for activity in activities]
+    def get_statement_sort_key(self, activities):
+        return activities[self.get_first_non_ssp_activity_index(activities)][
+            "trade_date"
+        ]
 
     @staticmethod
     def get_unsupported_activity_types(statements):
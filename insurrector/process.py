@@ -1,19 +1,43 @@
 import logging
 import os
+from itertools import chain
 
 import insurrector.parsers.csv as csv
 import insurrector.parsers.revolut as revolut
-from insurrector.calculators.fifo import calculate_sales_czk
+from insurrector.parsers.cache import ActivitiesCache
+from insurrector.calculators.fifo import calculate_sales_czk, iter_sales_czk
+from insurrector.calculators.snapshot import (
+    SNAPSHOT_DATE_FORMAT,
+    get_snapshot_state,
+    load_snapshot,
+    save_snapshot,
+    split_statements,
+)
 from insurrector.csv import (
+    STATEMENTS_FIELDNAMES,
     export_sales_in_currency_czk,
     export_sales_czk,
     export_statements,
+    open_csv_writer,
+)
+from insurrector.exchange_rate_store import ExchangeRateStore
+from insurrector.exchange_rates import (
+    CNB_SOURCE_RANGE,
+    EXCHANGE_RATE_LOOKUP_NEAREST,
+    default_exchange_rate_provider,
+    iter_populated_exchange_rates,
+    populate_exchange_rates,
+)
+from insurrector.utils import (
+    get_unsupported_activity_types,
+    humanize_date,
+    merge_dict_of_lists,
 )
-from insurrector.exchange_rates import populate_exchange_rates
-from insurrector.utils import get_unsupported_activity_types, merge_dict_of_lists
 
 logger = logging.getLogger("process")
 
+STREAM_CHUNK_SIZE = 10000
+
 supported_parsers = {}
 
 supported_parsers = {
@@ -22,17 +46,21 @@ supported_parsers = {
 }
 
 
+def get_parser_file_path(output_dir, parser_name, filename, multiple_parsers):
+    if multiple_parsers:
+        output_dir = os.path.join(output_dir, parser_name)
+
+    os.makedirs(output_dir, exist_ok=True)
+    return os.path.join(output_dir, filename)
+
+
 def for_each_parser(func, statements, filename=None, output_dir=None, **kwargs):
     result = {}
     for parser_name, parser_statements in statements.items():
         if filename is not None:
-            if len(statements) > 1:
-                parser_output_dir = os.path.join(output_dir, parser_name)
-                kwargs["file_path"] = os.path.join(parser_output_dir, filename)
-                os.makedirs(parser_output_dir, exist_ok=True)
-            else:
-                kwargs["file_path"] = os.path.join(output_dir, filename)
-                os.makedirs(output_dir, exist_ok=True)
+            kwargs["file_path"] = get_parser_file_path(
+                output_dir, parser_name, filename, len(statements) > 1
+            )
 
         result[parser_name] = func(**{"statements": parser_statements}, **kwargs)
 
@@ -40,38 +68,92 @@ def for_each_parser(func, statements, filename=None, output_dir=None, **kwargs):
 
 
 class Process(object):
-    def __init__(self, input_dir, output_dir, parser_names, in_currency=False):
+    def __init__(
+        self,
+        input_dir,
+        output_dir,
+        parser_names,
+        in_currency=False,
+        jobs=1,
+        use_cache=True,
+        rebuild_cache=False,
+        stream=False,
+        chunk_size=STREAM_CHUNK_SIZE,
+    ):
         self.input_dir = input_dir
         self.output_dir = output_dir
         self.parser_names = parser_names
         self.in_currency = in_currency
+        self.jobs = jobs
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.use_cache = use_cache
+        self.rebuild_cache = rebuild_cache
+
+        self.cache = None
+        if use_cache:
+            self.cache = ActivitiesCache(rebuild=rebuild_cache)
 
         self.statements = {}
 
+    def get_parser_names(self):
+        return list(dict.fromkeys(self.parser_names))
+
+    def create_parser(self, parser_name):
+        parser_input_dir = self.input_dir
+        if len(self.get_parser_names()) > 1:
+            parser_input_dir = os.path.join(parser_input_dir, parser_name)
+
+        return supported_parsers[parser_name](
+            parser_input_dir, jobs=self.jobs, cache=self.cache
+        )
+
+    def evict_cache(self):
+        if self.cache is not None:
+            self.cache.evict()
+
     def _parse(self):
         logger.debug(f"Supported parsers: [{supported_parsers}]")
 
-        parser_names = list(dict.fromkeys(self.parser_names))
+        parser_names = self.get_parser_names()
 
         logger.info(f"Parsing statement files with parsers: {parser_names}.")
         statements = {}
         for parser_name in parser_names:
-            parser_input_dir = self.input_dir
-            if len(parser_names) > 1:
-                parser_input_dir = os.path.join(parser_input_dir, parser_name)
-
-            statements[parser_name] = supported_parsers[parser_name](
-                parser_input_dir
-            ).parse()
+            statements[parser_name] = self.create_parser(parser_name).parse()
 
             if not statements[parser_name]:
                 logger.error(
                     f"Not activities found with parser[{parser_name}]. Please, check the statement files."
                 )
                 raise SystemExit(1)
+        self.evict_cache()
         self.statements = statements
         return self.statements
 
+    def _iter_statement_chunks(self, parser_name):
+        """Yield activity chunks of a parser while writing them to statements.csv."""
+        parser_names = self.get_parser_names()
+        file_path = get_parser_file_path(
+            self.output_dir, parser_name, "statements.csv", len(parser_names) > 1
+        )
+
+        found_activities = False
+        with open_csv_writer(
+            file_path, STATEMENTS_FIELDNAMES, extrasaction="ignore"
+        ) as writer:
+            parser = self.create_parser(parser_name)
+            for statements in parser.iter_activity_chunks(self.chunk_size):
+                found_activities = True
+                writer.writerows(humanize_date(statements))
+                yield statements
+
+        if not found_activities:
+            logger.error(
+                f"Not activities found with parser[{parser_name}]. Please, check the statement files."
+            )
+            raise SystemExit(1)
+
     def _generate_statements(self):
         assert self.statements
         logger.info("Generating [statements.csv] file.")
@@ -84,22 +166,128 @@ class Process(object):
 
 
 class ProcessCzechia(Process):
-    def __init__(self, input_dir, output_dir, parser_names, use_cnb, in_currency=False):
+    def __init__(
+        self,
+        input_dir,
+        output_dir,
+        parser_names,
+        use_cnb,
+        in_currency=False,
+        rate_lookup=EXCHANGE_RATE_LOOKUP_NEAREST,
+        cnb_source=CNB_SOURCE_RANGE,
+        rate_provider=None,
+        snapshot_in=None,
+        snapshot_out=None,
+        snapshot_date=None,
+        **kwargs,
+    ):
         self.use_cnb = use_cnb
+        self.rate_lookup = rate_lookup
+        self.cnb_source = cnb_source
+        self.rate_provider = rate_provider or default_exchange_rate_provider
+        self.snapshot_in = snapshot_in
+        self.snapshot_out = snapshot_out
+        self.snapshot_date = snapshot_date
+        self.snapshot_in_states = {}
+        self.snapshot_out_states = {}
 
         self.parsers_calculations = None
         self.merged_sales = None
-        super().__init__(input_dir, output_dir, parser_names, in_currency)
+        super().__init__(input_dir, output_dir, parser_names, in_currency, **kwargs)
+
+        self.rate_store = None
+        if use_cnb and self.use_cache:
+            self.rate_store = ExchangeRateStore(rebuild=self.rebuild_cache)
+        if self.rebuild_cache:
+            self.rate_provider.clear()
+
+    def _log_rate_provider_stats(self, hits, misses):
+        logger.info(
+            f"Exchange rates cache hits: [{self.rate_provider.hits - hits}], misses: [{self.rate_provider.misses - misses}]."
+        )
 
     def _populate_exchange_rates(self):
         logger.info("Populating exchange rates.")
-        for_each_parser(populate_exchange_rates, self.statements, use_cnb=self.use_cnb)
+        hits, misses = self.rate_provider.hits, self.rate_provider.misses
+        for_each_parser(
+            populate_exchange_rates,
+            self.statements,
+            use_cnb=self.use_cnb,
+            lookup=self.rate_lookup,
+            store=self.rate_store,
+            source=self.cnb_source,
+            provider=self.rate_provider,
+        )
+        self._log_rate_provider_stats(hits, misses)
+
+    def _load_snapshot(self):
+        """Continue from the snapshot_in open lots with activities after its cutoff."""
+        cutoff_date, self.snapshot_in_states = load_snapshot(self.snapshot_in)
+        logger.info(
+            f"Starting from open lots snapshot [{self.snapshot_in}] of [{cutoff_date:{SNAPSHOT_DATE_FORMAT}}]."
+        )
+        if self.snapshot_out is not None and self.snapshot_date < cutoff_date:
+            logger.error(
+                f"Snapshot date [{self.snapshot_date:{SNAPSHOT_DATE_FORMAT}}] precedes the cutoff of snapshot [{self.snapshot_in}]."
+            )
+            raise SystemExit(1)
+
+        statements = {}
+        for parser_name, parser_statements in self.statements.items():
+            _, parser_statements = split_statements(parser_statements, cutoff_date)
+            if parser_statements:
+                statements[parser_name] = parser_statements
+
+        if not statements:
+            logger.error(
+                f"No activities found after the cutoff of snapshot [{self.snapshot_in}]."
+            )
+            raise SystemExit(1)
+        self.statements = statements
+
+    def _calculate_parser_sales(self, parser_name, statements):
+        purchases, ssp_surrendered_data = self.snapshot_in_states.get(
+            parser_name, (None, None)
+        )
+
+        sales = []
+        if self.snapshot_out is not None:
+            statements_before, statements = split_statements(
+                statements, self.snapshot_date
+            )
+            sales, purchases, ssp_surrendered_data = calculate_sales_czk(
+                statements_before, self.jobs, purchases, ssp_surrendered_data
+            )
+            self.snapshot_out_states[parser_name] = get_snapshot_state(
+                purchases, ssp_surrendered_data
+            )
+
+        parser_sales, purchases, ssp_surrendered_data = calculate_sales_czk(
+            statements, self.jobs, purchases, ssp_surrendered_data
+        )
+        return sales + parser_sales, purchases, ssp_surrendered_data
+
+    def _save_snapshot(self):
+        logger.info(
+            f"Generating open lots snapshot [{self.snapshot_out}] of [{self.snapshot_date:{SNAPSHOT_DATE_FORMAT}}]."
+        )
+        save_snapshot(self.snapshot_out, self.snapshot_date, self.snapshot_out_states)
 
     def _calculate_sales(self):
         logger.info("Calculating sales information.")
-        self.parsers_calculations = for_each_parser(
-            calculate_sales_czk, self.statements
-        )
+        # Parsers without activities after the snapshot_in cutoff keep their
+        # open lots.
+        self.snapshot_out_states = {
+            parser_name: get_snapshot_state(*state)
+            for parser_name, state in self.snapshot_in_states.items()
+            if parser_name not in self.statements
+        }
+        self.parsers_calculations = {
+            parser_name: self._calculate_parser_sales(parser_name, statements)
+            for parser_name, statements in self.statements.items()
+        }
+        if self.snapshot_out is not None:
+            self._save_snapshot()
 
         sales = {
             parser_name: parser_calculations[0]
@@ -107,34 +295,106 @@ class ProcessCzechia(Process):
         }
         self.merged_sales = merge_dict_of_lists(sales)
 
+    def _export_sales(self, file_path, sales):
+        if self.in_currency:
+            export_sales_in_currency_czk(file_path, sales)
+        else:
+            export_sales_czk(file_path, sales)
+
     def _generate_sales(self):
         assert self.merged_sales
         logger.info("Generating [sales.csv] file.")
-        if self.in_currency:
-            export_sales_in_currency_czk(
-                os.path.join(self.output_dir, "sales.csv"), self.merged_sales
+        self._export_sales(
+            os.path.join(self.output_dir, "sales.csv"), self.merged_sales
+        )
+
+    def _iter_populated_statements(self, parser_name, unsupported_activity_types):
+        statement_chunks = iter_populated_exchange_rates(
+            self._iter_statement_chunks(parser_name),
+            self.use_cnb,
+            self.rate_lookup,
+            self.rate_store,
+            self.cnb_source,
+            self.rate_provider,
+        )
+
+        parser_class = supported_parsers[parser_name]
+        for statements in statement_chunks:
+            unsupported_activity_types.update(
+                parser_class.get_unsupported_activity_types(statements)
             )
-        else:
-            export_sales_czk(
-                os.path.join(self.output_dir, "sales.csv"), self.merged_sales
+            yield from statements
+
+    def _process_stream(self):
+        logger.info(
+            f"Processing statement files with parsers: {self.get_parser_names()}."
+        )
+        unsupported_activity_types = set()
+        hits, misses = self.rate_provider.hits, self.rate_provider.misses
+        sales = chain.from_iterable(
+            iter_sales_czk(
+                self._iter_populated_statements(parser_name, unsupported_activity_types)
             )
+            for parser_name in self.get_parser_names()
+        )
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        file_path = os.path.join(self.output_dir, "sales.csv")
+        temp_file_path = file_path + ".tmp"
+        try:
+            self._export_sales(temp_file_path, sales)
+            self._log_rate_provider_stats(hits, misses)
+            if unsupported_activity_types:
+                logger.error(
+                    f"Statements contain unsupported activity types: {sorted(unsupported_activity_types)}."
+                )
+                return
+
+            logger.info("Generating [sales.csv] file.")
+            os.replace(temp_file_path, file_path)
+        finally:
+            self.evict_cache()
+            if os.path.exists(temp_file_path):
+                os.unlink(temp_file_path)
 
     def process(self):
+        if self.stream:
+            return self._process_stream()
+
         self._parse()
+        return self.process_statements(self.statements)
+
+    def process_statements(self, statements):
+        """Generate outputs of statements.
+
+        Return False without calculating sales when the statements contain
+        unsupported activity types.
+        """
+        self.statements = statements
         self._generate_statements()
+        if self.snapshot_in is not None:
+            self._load_snapshot()
         self._populate_exchange_rates()
 
         unsupported_activity_types = get_unsupported_activity_types(
             supported_parsers, self.statements
         )
 
-        if len(unsupported_activity_types) == 0:
-            self._calculate_sales()
-            self._generate_sales()
+        if unsupported_activity_types:
+            logger.error(
+                f"Statements contain unsupported activity types: {unsupported_activity_types}."
+            )
+            return False
+
+        self._calculate_sales()
+        self._generate_sales()
+        return True
 
 
-def process_mfcr(input_dir, output_dir, parser_names, use_cnb, in_currency=False):
+def process_mfcr(
+    input_dir, output_dir, parser_names, use_cnb, in_currency=False, **kwargs
+):
     process_obj = ProcessCzechia(
-        input_dir, output_dir, parser_names, use_cnb, in_currency
+        input_dir, output_dir, parser_names, use_cnb, in_currency, **kwargs
     )
     return process_obj.process()
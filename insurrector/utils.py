@@ -1,4 +1,5 @@
 import glob
+import hashlib
 import logging
 import os
 from datetime import datetime
@@ -20,11 +21,10 @@ def list_statement_files(dir, file_extension):
             continue
         statement_files.append(file)
 
-    return statement_files
+    return sorted(statement_files)
 
 
 def humanize_date(list_object):
-    result = []
     for elements in list_object:
         item = {}
         for key, value in elements.items():
@@ -34,8 +34,7 @@ def humanize_date(list_object):
 
             item[key] = value
 
-        result.append(item)
-    return result
+        yield item
 
 
 def get_parsers(supported_parsers, parsers, input_dir=None):
@@ -97,3 +96,20 @@ def merge_dict_of_lists(parser_statements):
         merged_list.extend(statements)
 
     return merged_list
+
+
+def get_cache_dir(*subdirs):
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    cache_dir = os.path.join(cache_home, "insurrector", *subdirs)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def hash_file(file_path, namespace=""):
+    digest = hashlib.sha256(namespace.encode("utf-8"))
+    with open(file_path, "rb") as fd:
+        for block in iter(lambda: fd.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,195 @@
+import json
+import logging
+import os
+import time
+
+from insurrector.process import ProcessCzechia
+from insurrector.utils import hash_file, list_statement_files
+
+logger = logging.getLogger("process")
+
+WATCH_INTERVAL = 5
+WATCH_MANIFEST_FILE = ".insurrector-manifest.json"
+WATCH_STALE_SUFFIX = ".stale"
+
+
+class StatementsWatcher(object):
+    """Keep outputs of a process up to date with its input directory.
+
+    A manifest of processed statement files (path, size, mtime and content
+    hash) is kept per parser. Each scan parses only new and changed files and
+    regenerates the outputs from the activities kept in memory.
+    """
+
+    def __init__(self, process, interval=WATCH_INTERVAL):
+        self.process = process
+        self.interval = interval
+        self.manifest_path = os.path.join(process.output_dir, WATCH_MANIFEST_FILE)
+
+        self.manifest = self.load_manifest()
+        self.activities = {}
+        self.pending = False
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, "r") as fd:
+                return json.load(fd)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning(f"Ignoring corrupted manifest[{self.manifest_path}].")
+            return {}
+
+    def save_manifest(self):
+        os.makedirs(self.process.output_dir, exist_ok=True)
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w") as fd:
+            json.dump(self.manifest, fd, indent=2, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+
+    def scan_parser(self, parser_name, parser):
+        manifest = self.manifest.setdefault(parser_name, {})
+        activities = self.activities.setdefault(parser_name, {})
+
+        if os.path.exists(parser.input_dir):
+            statement_files = list_statement_files(
+                parser.input_dir, parser.FILE_EXTENSION
+            )
+        else:
+            statement_files = []
+
+        changed_files = []
+        for statement_file in statement_files:
+            stat = os.stat(statement_file)
+            entry = manifest.get(statement_file)
+            if (
+                entry is not None
+                and entry["size"] == stat.st_size
+                and entry["mtime"] == stat.st_mtime
+                and statement_file in activities
+            ):
+                continue
+
+            file_hash = hash_file(statement_file)
+            if (
+                entry is None
+                or entry["hash"] != file_hash
+                or statement_file not in activities
+            ):
+                changed_files.append(statement_file)
+
+            manifest[statement_file] = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "hash": file_hash,
+            }
+
+        removed_files = set(manifest) - set(statement_files)
+        for statement_file in removed_files:
+            logger.info(f"Statement file[{statement_file}] was removed.")
+            del manifest[statement_file]
+            activities.pop(statement_file, None)
+
+        if changed_files:
+            logger.info(f"Parsing new or changed statement files: {changed_files}.")
+            for statement_file, file_activities in zip(
+                changed_files,
+                parser.map_statement_files(
+                    parser.extract_file_activities, changed_files
+                ),
+            ):
+                activities[statement_file] = file_activities
+
+        return bool(changed_files or removed_files)
+
+    def scan(self):
+        changed = False
+        for parser_name in self.process.get_parser_names():
+            parser = self.process.create_parser(parser_name)
+            if self.scan_parser(parser_name, parser):
+                changed = True
+
+        if changed:
+            self.process.evict_cache()
+        return changed
+
+    def get_statements(self):
+        statements = {}
+        for parser_name in self.process.get_parser_names():
+            parser = self.process.create_parser(parser_name)
+            statements[parser_name] = parser.merge_statements(
+                self.activities[parser_name].values()
+            )
+
+            if not statements[parser_name]:
+                logger.warning(
+                    f"Not activities found with parser[{parser_name}]. Waiting for statement files."
+                )
+                return None
+
+        return statements
+
+    def update(self, force=False):
+        if not self.scan() and not force and not self.pending:
+            return
+
+        self.pending = True
+        statements = self.get_statements()
+        if statements is None:
+            return
+
+        try:
+            processed = self.process.process_statements(statements)
+        except SystemExit:
+            processed = False
+
+        if not processed:
+            self.remove_stale_sales()
+            logger.error("Processing failed, retrying with the next scan.")
+            return
+
+        self.pending = False
+        self.save_manifest()
+
+    def remove_stale_sales(self):
+        """Rename sales.csv so it is not mistaken for the current statements."""
+        sales_path = os.path.join(self.process.output_dir, "sales.csv")
+        if os.path.exists(sales_path):
+            os.replace(sales_path, sales_path + WATCH_STALE_SUFFIX)
+            logger.warning(
+                f"Renamed outdated [sales.csv] to [sales.csv{WATCH_STALE_SUFFIX}]."
+            )
+
+    def run(self):
+        logger.info(
+            f"Watching input directory[{self.process.input_dir}] for statement files."
+        )
+        previous_manifest = self.manifest
+        self.manifest = {}
+        self.scan()
+        outputs_missing = not os.path.exists(
+            os.path.join(self.process.output_dir, "sales.csv")
+        )
+        self.update(force=self.manifest != previous_manifest or outputs_missing)
+
+        try:
+            while True:
+                time.sleep(self.interval)
+                self.update()
+        except KeyboardInterrupt:
+            logger.info("Stopped watching statement files.")
+
+
+def watch_mfcr(
+    input_dir,
+    output_dir,
+    parser_names,
+    use_cnb,
+    in_currency=False,
+    interval=WATCH_INTERVAL,
+    **kwargs,
+):
+    process_obj = ProcessCzechia(
+        input_dir, output_dir, parser_names, use_cnb, in_currency, **kwargs
+    )
+    StatementsWatcher(process_obj, interval).run()
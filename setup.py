@@ -13,7 +13,7 @@ requirements = [
     "python-dateutil==2.8.1",
 ]
 
-extras = {"gui": ["PyQt5"]}
+extras = {"gui": ["PyQt5"], "numpy": ["numpy"]}
 
 setup(
     name="insurrector",
@@ -37,6 +37,7 @@ setup(
             "insurrector-gui=insurrector.gui.main:main [gui]",
         ]
     },
+    package_data={"insurrector": ["data/*.bin"]},
     include_package_data=True,
     install_requires=requirements,
     extras_require=extras,
@@ -0,0 +1,140 @@
+import decimal
+from datetime import datetime
+
+import pytest
+
+from insurrector.activity_table import ActivityTable, find_exchange_rate_positions
+from insurrector.exchange_rates import (
+    EXCHANGE_RATE_LOOKUPS,
+    ExchangeRateIndex,
+    populate_exchange_rates,
+)
+from insurrector.records import Activity
+
+numpy = pytest.importorskip("numpy")
+
+ACTIVITIES = [
+    Activity(
+        trade_date=datetime(2020, 1, 2),
+        currency="USD",
+        activity_type="BUY",
+        symbol="AAPL",
+        quantity=decimal.Decimal(2),
+        price=decimal.Decimal("300.5"),
+        amount=decimal.Decimal("601.0"),
+    ),
+    Activity(
+        trade_date=datetime(2020, 1, 3),
+        currency="USD",
+        activity_type="CDEP",
+        amount=decimal.Decimal("1000.00"),
+    ),
+    Activity(
+        trade_date=datetime(2021, 2, 1),
+        currency="CZK",
+        activity_type="SELL",
+        symbol="MSFT",
+        quantity=decimal.Decimal(1),
+        price=decimal.Decimal("150"),
+        amount=decimal.Decimal("150"),
+    ),
+    Activity(
+        trade_date=datetime(2021, 3, 1),
+        currency="USD",
+        activity_type="SELL",
+        symbol="AAPL",
+        quantity=decimal.Decimal(1),
+        price=decimal.Decimal("320"),
+        amount=decimal.Decimal("320"),
+    ),
+]
+
+
+def test_from_chunks_matches_single_list():
+    table = ActivityTable(ACTIVITIES)
+    chunked = ActivityTable.from_chunks(
+        [ACTIVITIES[:1], ACTIVITIES[1:3], ACTIVITIES[3:]]
+    )
+
+    assert chunked.symbols == table.symbols == ["AAPL", None, "MSFT"]
+    assert chunked.currencies == table.currencies == ["USD", "CZK"]
+    for name in ("trade_days", "symbol_codes", "activity_type_codes", "currency_codes"):
+        assert numpy.array_equal(getattr(chunked, name), getattr(table, name))
+    for name in ("quantity", "price", "amount"):
+        assert (
+            chunked.decimal_columns[name].tolist()
+            == table.decimal_columns[name].tolist()
+        )
+        assert numpy.array_equal(
+            chunked.columns[name], table.columns[name], equal_nan=True
+        )
+    assert chunked.sum_by_year_and_symbol("amount", ["SELL"], exact=True) == {
+        (2021, "AAPL"): decimal.Decimal("320"),
+        (2021, "MSFT"): decimal.Decimal("150"),
+    }
+
+
+def test_from_no_chunks():
+    table = ActivityTable.from_chunks([])
+
+    assert len(table) == 0
+    assert table.symbols == []
+    assert table.columns["amount"].dtype == numpy.float64
+
+
+@pytest.mark.parametrize("lookup", EXCHANGE_RATE_LOOKUPS)
+def test_find_exchange_rate_positions_matches_index(lookup):
+    first_ordinal = datetime(2020, 1, 1).toordinal()
+    # Gaps of even length have ties in the middle.
+    ordinals = [first_ordinal + offset for offset in (10, 11, 14, 20, 27)]
+    days = [first_ordinal + offset for offset in range(32)]
+    index = ExchangeRateIndex(ordinals, [None] * len(ordinals))
+
+    positions = find_exchange_rate_positions(
+        numpy.asarray(ordinals, dtype=numpy.int64),
+        numpy.asarray(days, dtype=numpy.int64),
+        lookup=lookup,
+    )
+
+    assert positions.tolist() == [
+        index.find(datetime.fromordinal(day), lookup) for day in days
+    ]
+
+
+@pytest.mark.parametrize("lookup", EXCHANGE_RATE_LOOKUPS)
+def test_populate_exchange_rates_matches_list(lookup):
+    # Bundled rates cover USD from 2019-01-02 to 2020-12-31.
+    activities = [
+        Activity(
+            trade_date=trade_date,
+            currency=currency,
+            activity_type="CDEP",
+            amount=decimal.Decimal("1000.25"),
+        )
+        for trade_date, currency in [
+            (datetime(2018, 12, 30), "USD"),
+            (datetime(2019, 1, 5), "USD"),
+            (datetime(2019, 1, 6), "CZK"),
+            (datetime(2019, 12, 25), "USD"),
+            (datetime(2020, 6, 13), "USD"),
+            (datetime(2020, 6, 14), "CZK"),
+        ]
+    ] + [activity.copy() for activity in ACTIVITIES]
+    table = ActivityTable(activities)
+
+    table.populate_exchange_rates(use_cnb=False, lookup=lookup)
+    populate_exchange_rates(activities, use_cnb=False, lookup=lookup)
+
+    assert table.exchange_rate_decimals.tolist() == [
+        activity["exchange_rate"] for activity in activities
+    ]
+    assert table.exchange_rate_days.tolist() == [
+        activity["exchange_rate_date"].toordinal() for activity in activities
+    ]
+    amounts_czk = [
+        activity["amount"] * activity["exchange_rate"] for activity in activities
+    ]
+    assert table.get_column("amount_czk", exact=True).tolist() == amounts_czk
+    assert numpy.allclose(
+        table.get_column("amount_czk"), [float(amount) for amount in amounts_czk]
+    )
@@ -0,0 +1,63 @@
+import decimal
+from datetime import datetime
+
+import pytest
+
+from insurrector.cached_exchange_rates import (
+    load_exchange_rates,
+    write_exchange_rates,
+)
+
+EXCHANGE_RATES = {
+    datetime(2020, 1, 3): decimal.Decimal("22.725"),
+    datetime(2020, 1, 2): decimal.Decimal("22.627"),
+    datetime(2020, 1, 6): decimal.Decimal("22.700"),
+    datetime(2020, 1, 7): decimal.Decimal("0.208"),
+    datetime(2020, 1, 8): decimal.Decimal("12345.1"),
+}
+
+
+def read_exchange_rates(file_path):
+    # The loader caches files by path, read them afresh.
+    ordinals, rates = load_exchange_rates.__wrapped__(file_path)
+    return {datetime.fromordinal(day): rate for day, rate in zip(ordinals, rates)}
+
+
+def test_round_trip(tmp_path):
+    file_path = str(tmp_path / "exchange_rates.bin")
+    write_exchange_rates(EXCHANGE_RATES, file_path)
+
+    exchange_rates = read_exchange_rates(file_path)
+    assert list(exchange_rates) == sorted(EXCHANGE_RATES)
+    assert exchange_rates == EXCHANGE_RATES
+    assert str(exchange_rates[datetime(2020, 1, 6)]) == "22.700"
+
+
+def test_write_rejects_extra_digits(tmp_path):
+    with pytest.raises(ValueError):
+        write_exchange_rates(
+            {datetime(2020, 1, 2): decimal.Decimal("22.6271")},
+            str(tmp_path / "exchange_rates.bin"),
+        )
+
+
+def test_load_rejects_other_files(tmp_path):
+    file_path = tmp_path / "exchange_rates.bin"
+    file_path.write_bytes(b"NOTRATES" + bytes(8))
+
+    with pytest.raises(ValueError):
+        load_exchange_rates.__wrapped__(str(file_path))
+
+
+def test_bundled_rates():
+    ordinals, rates = load_exchange_rates()
+    assert len(ordinals) == len(rates) == 502
+    assert list(ordinals) == sorted(ordinals)
+    assert datetime.fromordinal(ordinals[0]) == datetime(2019, 1, 2)
+    assert str(rates[0]) == "22.594"
+    assert datetime.fromordinal(ordinals[-1]) == datetime(2020, 12, 31)
+    assert str(rates[-1]) == "21.387"
+    # Rates are published every business day.
+    assert all(
+        ordinal - previous < 7 for previous, ordinal in zip(ordinals, ordinals[1:])
+    )
@@ -0,0 +1,139 @@
+from datetime import datetime
+
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from insurrector import exchange_rates
+from insurrector.cnb_server import CNBServer
+from insurrector.exchange_rate_store import ExchangeRateStore
+from insurrector.exchange_rates import (
+    CNB_SOURCE_RANGE,
+    CNB_SOURCE_YEAR,
+    ExchangeRateProvider,
+    get_cnb_date_ranges,
+    get_exchange_rates,
+)
+
+FIRST_DATE = datetime(2019, 2, 1)
+LAST_DATE = datetime(2020, 11, 30)
+CURRENCIES = ["JPY", "USD"]
+
+
+@pytest.fixture
+def start_cnb_server(monkeypatch):
+    """Start CNBServer instances and point the CNB URLs at the latest one."""
+    servers = []
+    monkeypatch.setattr(exchange_rates, "CNB_RETRY_BACKOFF", 0.01)
+    # Enough attempts that injected errors never exhaust them by chance.
+    monkeypatch.setattr(exchange_rates, "CNB_MAX_ATTEMPTS", 10)
+
+    def start(**kwargs):
+        server = CNBServer(**kwargs).start()
+        servers.append(server)
+        monkeypatch.setattr(exchange_rates, "CNB_BASE_URL", server.url + "vybrane.txt?")
+        monkeypatch.setattr(exchange_rates, "CNB_YEAR_URL", server.url + "rok.txt?")
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def test_range_source_recovers_from_errors(start_cnb_server):
+    start_cnb_server()
+    expected = get_exchange_rates(FIRST_DATE, LAST_DATE, CURRENCIES)
+
+    server = start_cnb_server(latency=0.01, error_rate=0.3, seed=1)
+    assert get_exchange_rates(FIRST_DATE, LAST_DATE, CURRENCIES) == expected
+
+    chunks = len(
+        get_cnb_date_ranges(FIRST_DATE - relativedelta(months=1), LAST_DATE)
+    ) * len(CURRENCIES)
+    assert server.requests > chunks
+
+
+def test_range_source_gives_up(start_cnb_server, monkeypatch):
+    monkeypatch.setattr(exchange_rates, "CNB_MAX_ATTEMPTS", 2)
+    server = start_cnb_server(error_rate=1)
+
+    # A single chunk, so no other download is cut short by the failure.
+    with pytest.raises(SystemExit):
+        get_exchange_rates(datetime(2020, 1, 2), datetime(2020, 1, 31), ["USD"])
+    assert server.requests == 2
+
+
+def select_dates(exchange_rates, first_date, last_date):
+    return {
+        currency: {
+            day: rate
+            for day, rate in currency_rates.items()
+            if first_date <= day <= last_date
+        }
+        for currency, currency_rates in exchange_rates.items()
+    }
+
+
+def test_sources_agree(start_cnb_server):
+    start_cnb_server(latency=0.01, error_rate=0.3, seed=2)
+    ranges = get_exchange_rates(FIRST_DATE, LAST_DATE, CURRENCIES)
+    years = get_exchange_rates(
+        FIRST_DATE, LAST_DATE, CURRENCIES, source=CNB_SOURCE_YEAR
+    )
+
+    first_date = FIRST_DATE - relativedelta(months=1)
+    assert ranges["JPY"] and ranges["USD"]
+    assert select_dates(ranges, first_date, LAST_DATE) == select_dates(
+        years, first_date, LAST_DATE
+    )
+
+
+def test_year_source_downloads_each_year_once(start_cnb_server):
+    server = start_cnb_server()
+    get_exchange_rates(FIRST_DATE, LAST_DATE, CURRENCIES, source=CNB_SOURCE_YEAR)
+
+    assert server.requests == 2
+
+
+@pytest.mark.parametrize("source", [CNB_SOURCE_RANGE, CNB_SOURCE_YEAR])
+def test_warm_store_makes_no_requests(start_cnb_server, tmp_path, source):
+    server = start_cnb_server(latency=0.01, error_rate=0.3, seed=3)
+    store = ExchangeRateStore(str(tmp_path / "exchange_rates.sqlite3"))
+    cold = get_exchange_rates(FIRST_DATE, LAST_DATE, CURRENCIES, store, source)
+    assert server.requests
+
+    requests = server.requests
+    store = ExchangeRateStore(str(tmp_path / "exchange_rates.sqlite3"))
+    warm = get_exchange_rates(FIRST_DATE, LAST_DATE, CURRENCIES, store, source)
+    assert server.requests == requests
+    assert warm == cold
+
+
+def test_record_and_replay(start_cnb_server, tmp_path):
+    upstream = start_cnb_server()
+    expected = get_exchange_rates(FIRST_DATE, LAST_DATE, CURRENCIES)
+
+    record_dir = str(tmp_path / "recorded")
+    start_cnb_server(record_dir=record_dir, upstream_url=upstream.url)
+    assert get_exchange_rates(FIRST_DATE, LAST_DATE, CURRENCIES) == expected
+
+    requests = upstream.requests
+    start_cnb_server(replay_dir=record_dir, error_rate=0.3, seed=4)
+    assert get_exchange_rates(FIRST_DATE, LAST_DATE, CURRENCIES) == expected
+    assert upstream.requests == requests
+
+
+def test_provider_reuses_downloaded_rates(start_cnb_server):
+    server = start_cnb_server()
+    provider = ExchangeRateProvider(max_entries=2)
+    provider.get_indexes(FIRST_DATE, LAST_DATE, True, CURRENCIES)
+    requests = server.requests
+
+    provider.get_indexes(FIRST_DATE + relativedelta(months=1), LAST_DATE, True, ["USD"])
+    assert server.requests == requests
+
+    # Loading EUR evicts the least recently used JPY rates.
+    provider.get_indexes(FIRST_DATE, LAST_DATE, True, ["EUR"])
+    requests = server.requests
+    provider.get_indexes(FIRST_DATE, LAST_DATE, True, ["JPY"])
+    assert server.requests > requests
+    assert (provider.hits, provider.misses) == (1, 4)
@@ -0,0 +1,63 @@
+import csv
+import io
+from datetime import datetime
+
+import pytest
+
+from insurrector.parsers.csv import CSV_ISO_DATE_FORMAT, Parser
+
+CSV_HEADER = "Trade Date,Activity Type,Company,Symbol,Quantity,Price,Amount"
+
+
+def read_activities(rows):
+    text = "\n".join([CSV_HEADER] + rows)
+    return Parser(None).extract_activities(csv.reader(io.StringIO(text)))
+
+
+@pytest.mark.parametrize(
+    "date_string, date_format",
+    [
+        ("31.01.2020", "%d.%m.%Y"),
+        ("2020.01.31", "%Y.%m.%d"),
+        ("01-31-2020", "%m-%d-%Y"),
+        ("2020-01-31", "%Y-%m-%d"),
+        ("01/31/2020", "%m/%d/%Y"),
+        ("2020/01/31", "%Y/%m/%d"),
+    ],
+)
+def test_infer_date_format(date_string, date_format):
+    parser = Parser(None)
+    assert parser.infer_date_format(date_string) == date_format
+    assert parser.parse_date(date_string) == datetime(2020, 1, 31)
+
+
+def test_infer_date_format_unknown():
+    with pytest.raises(SystemExit):
+        Parser(None).infer_date_format("31 Jan 2020")
+
+
+def test_parse_date_iso():
+    parser = Parser(None)
+    assert parser.parse_date("2020-02-29", CSV_ISO_DATE_FORMAT) == datetime(2020, 2, 29)
+
+
+def test_parse_date_falls_back_to_detection():
+    parser = Parser(None)
+    assert parser.parse_date("01/31/2020", "%d.%m.%Y") == datetime(2020, 1, 31)
+    assert parser.parse_date("31.01.2020", CSV_ISO_DATE_FORMAT) == datetime(2020, 1, 31)
+
+
+def test_extract_activities_infers_format_per_file():
+    activities = read_activities(
+        [
+            "02.01.2020,BUY,Apple,AAPL,1,10,10",
+            "03.01.2020,SELL,Apple,AAPL,1,12,12",
+            "01/06/2020,BUY,Apple,AAPL,1,11,11",
+        ]
+    )
+
+    assert [activity["trade_date"] for activity in activities] == [
+        datetime(2020, 1, 2),
+        datetime(2020, 1, 3),
+        datetime(2020, 1, 6),
+    ]
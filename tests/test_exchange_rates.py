@@ -0,0 +1,177 @@
+import decimal
+import logging
+from datetime import datetime, timedelta
+
+import pytest
+
+from insurrector.exchange_rates import (
+    EXCHANGE_RATE_LOOKUP_LAST,
+    EXCHANGE_RATE_LOOKUP_NEAREST,
+    ExchangeRateIndex,
+    ExchangeRateProvider,
+    ExchangeRateTable,
+    parse_cnb_decimal,
+    parse_exchange_rates,
+    parse_year_exchange_rates,
+)
+
+EXCHANGE_RATES = {
+    datetime(2020, 1, 10): decimal.Decimal("22.5"),
+    datetime(2020, 1, 2): decimal.Decimal("22.1"),
+    datetime(2020, 1, 6): decimal.Decimal("22.3"),
+}
+
+
+def lookup(search_date, lookup=EXCHANGE_RATE_LOOKUP_NEAREST):
+    index = ExchangeRateIndex.from_exchange_rates(EXCHANGE_RATES)
+    return index.lookup(search_date, lookup)
+
+
+def test_lookup_published_date():
+    for lookup_rule in (EXCHANGE_RATE_LOOKUP_NEAREST, EXCHANGE_RATE_LOOKUP_LAST):
+        assert lookup(datetime(2020, 1, 6), lookup_rule) == (
+            datetime(2020, 1, 6),
+            decimal.Decimal("22.3"),
+        )
+
+
+def test_lookup_nearest():
+    assert lookup(datetime(2020, 1, 3))[0] == datetime(2020, 1, 2)
+    assert lookup(datetime(2020, 1, 5))[0] == datetime(2020, 1, 6)
+    assert lookup(datetime(2020, 1, 9))[0] == datetime(2020, 1, 10)
+
+
+def test_lookup_nearest_prefers_earlier_on_tie():
+    assert lookup(datetime(2020, 1, 4))[0] == datetime(2020, 1, 2)
+    assert lookup(datetime(2020, 1, 8))[0] == datetime(2020, 1, 6)
+
+
+def test_lookup_nearest_outside_range():
+    assert lookup(datetime(2019, 12, 1))[0] == datetime(2020, 1, 2)
+    assert lookup(datetime(2020, 3, 1))[0] == datetime(2020, 1, 10)
+
+
+def test_lookup_last():
+    assert lookup(datetime(2020, 1, 5), EXCHANGE_RATE_LOOKUP_LAST)[0] == datetime(
+        2020, 1, 2
+    )
+    assert lookup(datetime(2020, 1, 9), EXCHANGE_RATE_LOOKUP_LAST)[0] == datetime(
+        2020, 1, 6
+    )
+    assert lookup(datetime(2020, 3, 1), EXCHANGE_RATE_LOOKUP_LAST)[0] == datetime(
+        2020, 1, 10
+    )
+
+
+def test_lookup_last_before_first_rate(caplog):
+    with caplog.at_level(logging.WARNING, logger="exchange_rates"):
+        found = lookup(datetime(2019, 12, 31), EXCHANGE_RATE_LOOKUP_LAST)
+
+    assert found[0] == datetime(2020, 1, 2)
+    assert "No exchange rate published before" in caplog.text
+
+
+def test_table_base_currency():
+    exchange_rates = ExchangeRateTable()
+    assert "CZK" in exchange_rates
+    assert "USD" not in exchange_rates
+    assert exchange_rates.lookup("CZK", datetime(2020, 1, 4)) == (
+        datetime(2020, 1, 4),
+        decimal.Decimal(1),
+    )
+
+
+def test_parse_cnb_decimal():
+    assert parse_cnb_decimal("22,125") == decimal.Decimal("22.125")
+    assert parse_cnb_decimal("1 234,5") == decimal.Decimal("1234.5")
+    assert parse_cnb_decimal("1\xa0234,5") == decimal.Decimal("1234.5")
+    assert parse_cnb_decimal("17") == decimal.Decimal("17")
+
+
+def test_parse_exchange_rates():
+    text = "Měna: USD|Množství: 1\nDatum|Kurz\n02.01.2020|22,627\n03.01.2020|22,725\n"
+
+    assert parse_exchange_rates(text) == {
+        datetime(2020, 1, 2): decimal.Decimal("22.627"),
+        datetime(2020, 1, 3): decimal.Decimal("22.725"),
+    }
+
+
+def test_parse_exchange_rates_per_amount():
+    text = "Měna: JPY|Množství: 100\nDatum|Kurz\n02.01.2020|20,826\n\n"
+
+    assert parse_exchange_rates(text) == {
+        datetime(2020, 1, 2): decimal.Decimal("0.20826"),
+    }
+
+
+def test_parse_exchange_rates_invalid():
+    with pytest.raises(SystemExit):
+        parse_exchange_rates("Měna: USD|Množství: 1\nDatum|Kurz\n02.01.2020|n/a\n")
+
+
+def test_parse_year_exchange_rates():
+    text = (
+        "Datum|1 EUR|100 JPY\n"
+        "02.01.2020|25,410|20,826\n"
+        "03.01.2020|25,520|\n"
+        "Datum|1 EUR|1 USD\n"
+        "04.01.2020|25,600|22,600\n"
+    )
+
+    assert parse_year_exchange_rates(text) == {
+        "EUR": {
+            datetime(2020, 1, 2): decimal.Decimal("25.410"),
+            datetime(2020, 1, 3): decimal.Decimal("25.520"),
+            datetime(2020, 1, 4): decimal.Decimal("25.600"),
+        },
+        "JPY": {datetime(2020, 1, 2): decimal.Decimal("0.20826")},
+        "USD": {datetime(2020, 1, 4): decimal.Decimal("22.600")},
+    }
+
+
+def test_provider_serves_ranges_within_cached_ones():
+    provider = ExchangeRateProvider()
+    first_day = datetime(2020, 1, 1).toordinal()
+    last_day = datetime(2020, 6, 30).toordinal()
+    provider.add_index("USD", True, "range", first_day, last_day, "usd")
+
+    assert provider.find_index("USD", True, "range", first_day + 10, last_day) == "usd"
+    assert provider.find_index("USD", True, "range", first_day - 1, last_day) is None
+    assert provider.find_index("USD", True, "range", first_day, last_day + 1) is None
+    assert provider.find_index("USD", True, "year", first_day, last_day) is None
+    assert provider.find_index("EUR", True, "range", first_day, last_day) is None
+
+
+def test_provider_evicts_least_recently_used():
+    provider = ExchangeRateProvider(max_entries=2)
+    day = datetime(2020, 1, 1).toordinal()
+    provider.add_index("USD", True, "range", day, day, "usd")
+    provider.add_index("EUR", True, "range", day, day, "eur")
+    assert provider.find_index("USD", True, "range", day, day) == "usd"
+
+    provider.add_index("JPY", True, "range", day, day, "jpy")
+    assert list(provider.entries.values()) == ["usd", "jpy"]
+    assert provider.find_index("EUR", True, "range", day, day) is None
+
+
+def test_provider_distrusts_last_day_loaded_before_today():
+    provider = ExchangeRateProvider()
+    yesterday = (datetime.now() - timedelta(days=1)).toordinal()
+    # Rates up to yesterday, loaded yesterday before the last one was published.
+    key = ("USD", True, "range", yesterday - 30, yesterday, yesterday)
+    provider.entries[key] = "usd"
+
+    assert provider.find_index("USD", True, "range", yesterday - 30, yesterday - 1)
+    assert provider.find_index("USD", True, "range", yesterday - 30, yesterday) is None
+
+
+def test_provider_counts_hits_and_misses():
+    provider = ExchangeRateProvider()
+    for first_date in (datetime(2019, 6, 1), datetime(2020, 3, 1)):
+        indexes = provider.get_indexes(first_date, datetime(2020, 6, 1), False, ["USD"])
+        assert len(indexes["USD"].ordinals) == 502
+
+    # Bundled rates are loaded once for any date range.
+    assert (provider.hits, provider.misses) == (1, 1)
+    assert len(provider.entries) == 1
@@ -0,0 +1,242 @@
+import copy
+import decimal
+import logging
+import random
+from collections import deque
+from datetime import datetime, timedelta
+
+import pytest
+
+from insurrector import MFCR_DATE_FORMAT
+from insurrector.calculators.fifo import calculate_sales_czk
+from insurrector.calculators.ledger import LotLedger
+from insurrector.records import Activity, Lot
+
+
+def activity(activity_type, day, quantity, price, symbol="AAPL"):
+    return Activity(
+        trade_date=datetime(2020, 1, 1) + timedelta(days=day),
+        currency="USD",
+        activity_type=activity_type,
+        symbol=symbol,
+        quantity=decimal.Decimal(quantity),
+        price=decimal.Decimal(price),
+        exchange_rate=decimal.Decimal("22.5"),
+    )
+
+
+def buy(day, quantity, price, symbol="AAPL"):
+    return activity("BUY", day, quantity, price, symbol)
+
+
+def sell(day, quantity, price, symbol="AAPL"):
+    return activity("SELL", day, -decimal.Decimal(quantity), price, symbol)
+
+
+def purchase_date(day):
+    return (datetime(2020, 1, 1) + timedelta(days=day)).strftime(MFCR_DATE_FORMAT)
+
+
+def sold_lots(sales):
+    return [
+        (sale.quantity, sale.purchase_date, sale.purchase_item_price_in_currency)
+        for sale in sales
+    ]
+
+
+def test_sells_consume_lots():
+    sales, purchases, _ = calculate_sales_czk(
+        [buy(0, 5, 10), buy(1, 5, 20), sell(2, 5, 30), sell(3, 5, 30)]
+    )
+
+    assert sold_lots(sales) == [
+        (5, purchase_date(0), 10),
+        (5, purchase_date(1), 20),
+    ]
+    assert sales[1].purchase_price == 5 * 20 * decimal.Decimal("22.5")
+    assert sales[1].profit_in_currency == 50
+    assert len(purchases["AAPL"]) == 0
+
+
+def test_sell_splits_lot():
+    sales, purchases, _ = calculate_sales_czk(
+        [buy(0, 5, 10), buy(1, 5, 20), sell(2, 7, 30), sell(3, 2, 30)]
+    )
+
+    assert sold_lots(sales) == [
+        (5, purchase_date(0), 10),
+        (2, purchase_date(1), 20),
+        (2, purchase_date(1), 20),
+    ]
+    assert [(lot.quantity, lot.price) for lot in purchases["AAPL"]] == [(1, 20)]
+
+
+def test_sell_on_lot_boundary():
+    sales, purchases, _ = calculate_sales_czk(
+        [buy(0, 5, 10), buy(1, 5, 20), sell(2, 5, 30)]
+    )
+
+    # No zero-quantity sale of the following lot.
+    assert sold_lots(sales) == [(5, purchase_date(0), 10)]
+    assert [lot.quantity for lot in purchases["AAPL"]] == [5]
+
+
+def test_oversell_warns(caplog):
+    with caplog.at_level(logging.WARNING, logger="calculations"):
+        sales, purchases, _ = calculate_sales_czk(
+            [buy(0, 5, 10), buy(1, 5, 20), sell(2, 12, 30)]
+        )
+
+    assert sold_lots(sales) == [
+        (5, purchase_date(0), 10),
+        (5, purchase_date(1), 20),
+    ]
+    assert "Sold quantity exceeds open lots by [2]" in caplog.text
+    assert len(purchases["AAPL"]) == 0
+
+
+def test_split_adjusts_lots_bought_before():
+    sales, purchases, _ = calculate_sales_czk(
+        [
+            buy(0, 10, 100),
+            activity("SSP", 1, -10, 100, "AAPL.OLD"),
+            activity("SSP", 1, 20, 50, "AAPL"),
+            buy(2, 4, 60),
+            sell(3, 22, 70),
+        ]
+    )
+
+    assert sold_lots(sales) == [
+        (20, purchase_date(0), 50),
+        (2, purchase_date(2), 60),
+    ]
+    assert [(lot.quantity, lot.price) for lot in purchases["AAPL"]] == [(2, 60)]
+
+
+def test_ledger_applies_ratios_like_eager_adjustments():
+    ratios = [
+        (decimal.Decimal(3), decimal.Decimal(1) / decimal.Decimal(3)),
+        (decimal.Decimal(7) / decimal.Decimal(3), decimal.Decimal("0.45")),
+    ]
+    lots = [
+        Lot(decimal.Decimal("101.37"), decimal.Decimal(22), decimal.Decimal(7), day)
+        for day in range(3)
+    ]
+
+    ledger = LotLedger()
+    eager = []
+    for lot, ratio in zip(lots, ratios + [None]):
+        ledger.add(lot.copy())
+        eager.append(lot.copy())
+        if ratio is not None:
+            ledger.adjust(*ratio)
+            for eager_lot in eager:
+                eager_lot.quantity *= ratio[0]
+                eager_lot.price *= ratio[1]
+
+    # The first lot is read lazily through consume(), the rest by iterating.
+    sold = ledger.consume(decimal.Decimal(1))
+    assert sold[0].price == eager[0].price
+    assert [(lot.quantity, lot.price) for lot in ledger] == [
+        (eager[0].quantity - 1, eager[0].price),
+        (eager[1].quantity, eager[1].price),
+        (eager[2].quantity, eager[2].price),
+    ]
+
+
+def baseline_stock_sales(stock_queue, sold_quantity):
+    """Sold lots as matched before LotLedger, without consuming stock_queue."""
+    quantity_to_adjust = sold_quantity
+
+    sold_queue = deque()
+    local_stock_queue = copy.deepcopy(stock_queue)
+    for item in list(local_stock_queue):
+        quantity_after_abj = item["quantity"] - quantity_to_adjust
+
+        if quantity_after_abj > 0:
+            item["quantity"] = item["quantity"] - quantity_after_abj
+            sold_queue.append(item)
+            break
+
+        item = local_stock_queue.popleft()
+        sold_queue.append(item)
+        quantity_to_adjust -= item["quantity"]
+
+    return sold_queue
+
+
+def test_one_sell_per_symbol_matches_baseline():
+    rnd = random.Random(0)
+    statements = []
+    expected = []
+    for symbol_index in range(50):
+        symbol = f"S{symbol_index}"
+        stock_queue = deque()
+        for day in range(rnd.randrange(1, 6)):
+            quantity = rnd.randrange(1, 10)
+            price = decimal.Decimal(rnd.randrange(1000, 5000)) / 100
+            statements.append(buy(day, quantity, price, symbol))
+            stock_queue.append(
+                {"quantity": quantity, "price": price, "trade_date": purchase_date(day)}
+            )
+
+        # Sell up to every open share, often ending on a lot boundary.
+        total = sum(lot["quantity"] for lot in stock_queue)
+        boundaries = [
+            sum(lot["quantity"] for lot in list(stock_queue)[: end + 1])
+            for end in range(len(stock_queue))
+        ]
+        quantity = rnd.choice([rnd.randrange(1, total + 1), rnd.choice(boundaries)])
+        statements.append(sell(10, quantity, 50, symbol))
+        expected.extend(
+            (lot["quantity"], lot["trade_date"], lot["price"])
+            for lot in baseline_stock_sales(stock_queue, quantity)
+            # The baseline also sold zero of the lot following a boundary.
+            if lot["quantity"] != 0
+        )
+
+    sales, _, _ = calculate_sales_czk(statements)
+
+    assert sold_lots(sales) == expected
+
+
+def generate_history():
+    """Interleaved activities of several symbols with a split and an oversell."""
+    rnd = random.Random(1)
+    statements = []
+    for day in range(40):
+        for symbol in ("AAPL", "MSFT", "TSLA", "AMZN", "NFLX"):
+            if rnd.random() < 0.6:
+                price = decimal.Decimal(rnd.randrange(1000, 5000)) / 100
+                statements.append(buy(day, rnd.randrange(1, 10), price, symbol))
+            if rnd.random() < 0.4:
+                statements.append(sell(day, rnd.randrange(1, 8), 45, symbol))
+        if day == 20:
+            statements.append(activity("SSP", day, -10, 100, "AAPL.OLD"))
+            statements.append(activity("SSP", day, 30, 40, "AAPL"))
+    statements.append(sell(40, 1000, 50, "MSFT"))
+    # A surrender without its addition stays pending.
+    statements.append(activity("SSP", 40, -5, 80, "TSLA.OLD"))
+    return statements
+
+
+def calculation_rows(result):
+    sales, purchases, ssp_surrendered_data = result
+    return (
+        [sale.to_row() for sale in sales],
+        {
+            symbol: [lot.to_row() for lot in stock_queue]
+            for symbol, stock_queue in purchases.items()
+        },
+        ssp_surrendered_data,
+    )
+
+
+@pytest.mark.parametrize("jobs", [2, 3])
+def test_parallel_matches_sequential(jobs):
+    statements = generate_history()
+    expected = calculation_rows(calculate_sales_czk(statements, jobs=1))
+
+    assert calculation_rows(calculate_sales_czk(statements, jobs=jobs)) == expected
+    assert expected[2] == {"TSLA": {"quantity": 5, "price": 80}}
+    assert len(expected[1]["MSFT"]) == 0
@@ -0,0 +1,63 @@
+import decimal
+import pickle
+from datetime import datetime
+
+from insurrector.records import Activity, Lot
+
+
+def test_activity_missing_fields():
+    activity = Activity(
+        trade_date=datetime(2020, 1, 3),
+        currency="USD",
+        activity_type="CDEP",
+        symbol_description=None,
+        amount=decimal.Decimal("1000.00"),
+    )
+
+    assert "symbol" not in activity
+    assert activity.get("quantity") is None
+    assert list(activity) == [
+        "trade_date",
+        "currency",
+        "activity_type",
+        "symbol_description",
+        "amount",
+    ]
+    assert dict(pickle.loads(pickle.dumps(activity)).items()) == dict(activity.items())
+
+
+def test_activity_interns_categories():
+    first, second = [
+        Activity(
+            currency="".join(["U", "SD"]),
+            activity_type="".join(["BU", "Y"]),
+            symbol="".join(["AA", "PL"]),
+        )
+        for _ in range(2)
+    ]
+
+    assert first.currency is second.currency
+    assert first.activity_type is second.activity_type
+    assert first.symbol is second.symbol
+    assert Activity(symbol=None)["symbol"] is None
+
+
+def test_activity_copy():
+    activity = Activity(trade_date=datetime(2020, 1, 3), symbol="AAPL")
+    copy = activity.copy(exchange_rate=decimal.Decimal("22.5"))
+
+    assert "exchange_rate" not in activity
+    assert dict(copy.items()) == {
+        "trade_date": datetime(2020, 1, 3),
+        "symbol": "AAPL",
+        "exchange_rate": decimal.Decimal("22.5"),
+    }
+
+
+def test_lot_copy_and_pickle():
+    lot = Lot(decimal.Decimal("100"), decimal.Decimal("22.5"), decimal.Decimal(2), None)
+    copy = lot.copy(quantity=decimal.Decimal(1))
+
+    assert copy.to_row() == ("100", "22.5", "1", None)
+    assert pickle.loads(pickle.dumps(lot)).to_row() == lot.to_row()
+    assert Lot.from_row(lot.to_row()).to_row() == lot.to_row()
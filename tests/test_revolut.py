@@ -0,0 +1,240 @@
+import decimal
+from datetime import datetime
+
+from pdfreader import SimplePDFViewer
+
+from insurrector.parsers.revolut import (
+    REVOLUT_TOKEN_ACTIVITY,
+    REVOLUT_TOKEN_CASH_ACTIVITY,
+    REVOLUT_TOKEN_CURRENCY,
+    REVOLUT_TOKEN_DATE,
+    REVOLUT_TOKEN_NUMBER,
+    REVOLUT_TOKEN_TEXT,
+    Parser,
+)
+
+PAGE_STRINGS = [
+    "Trade Date",
+    "Settle Date",
+    "Currency",
+    "Activity Type",
+    "Symbol / Description",
+    "Quantity",
+    "Price",
+    "Amount",
+    "01/02/2020",
+    "01/06/2020",
+    "USD",
+    "BUY",
+    "TSLA - TESLA",
+    " INC - COM 88160R101",
+    "2",
+    "430.26",
+    "(860.52)",
+    "01/03/2020",
+    "01/03/2020",
+    "USD",
+    "CDEP",
+    "1,000.00",
+    "02/03/2020",
+    "02/05/2020",
+    "USD",
+    "SELL",
+    "AAPL - APPLE INC - COM",
+    "1.5",
+    "310.1",
+    "465.15",
+]
+
+
+def test_classify_string():
+    parser = Parser(None)
+    assert parser.classify_string("01/02/2020") == REVOLUT_TOKEN_DATE
+    assert parser.classify_string("USD") == REVOLUT_TOKEN_CURRENCY
+    assert parser.classify_string("SELL") == REVOLUT_TOKEN_ACTIVITY
+    assert parser.classify_string("CDEP") == REVOLUT_TOKEN_CASH_ACTIVITY
+    assert parser.classify_string("(1,234.56)") == REVOLUT_TOKEN_NUMBER
+    assert parser.classify_string("88160R101") == REVOLUT_TOKEN_TEXT
+    assert parser.classify_string("TSLA - TESLA") == REVOLUT_TOKEN_TEXT
+
+
+def test_tokenize_activities():
+    rows = list(Parser(None).tokenize_activities(PAGE_STRINGS))
+
+    assert rows == [
+        (
+            ["01/02/2020", "01/06/2020", "USD", "BUY"],
+            ["TSLA - TESLA", " INC - COM 88160R101"],
+            ["2", "430.26", "(860.52)"],
+        ),
+        (["01/03/2020", "01/03/2020", "USD", "CDEP"], [], ["1,000.00"]),
+        (
+            ["02/03/2020", "02/05/2020", "USD", "SELL"],
+            ["AAPL - APPLE INC - COM"],
+            ["1.5", "310.1", "465.15"],
+        ),
+    ]
+
+
+def test_tokenize_activities_incomplete_row():
+    rows = list(Parser(None).tokenize_activities(PAGE_STRINGS[:-1]))
+
+    assert len(rows) == 2
+
+
+def test_extract_activity():
+    parser = Parser(None)
+    buy, deposit, sell = [
+        parser.extract_activity(*row)
+        for row in parser.tokenize_activities(PAGE_STRINGS)
+    ]
+
+    assert dict(buy.items()) == {
+        "trade_date": datetime(2020, 1, 2),
+        "settle_date": datetime(2020, 1, 6),
+        "currency": "USD",
+        "activity_type": "BUY",
+        "company": "TESLA INC",
+        "symbol_description": "TSLA - TESLA INC - COM 88160R101",
+        "symbol": "TSLA",
+        "quantity": decimal.Decimal("2"),
+        "price": decimal.Decimal("430.26"),
+        "amount": decimal.Decimal("860.52"),
+    }
+    assert dict(deposit.items()) == {
+        "trade_date": datetime(2020, 1, 3),
+        "settle_date": datetime(2020, 1, 3),
+        "currency": "USD",
+        "activity_type": "CDEP",
+        "symbol_description": None,
+        "amount": decimal.Decimal("1000.00"),
+    }
+    assert sell["symbol"] == "AAPL"
+    assert sell["company"] == "APPLE INC"
+    assert sell["quantity"] == decimal.Decimal("1.5")
+
+
+# F2 decodes "A", "C" and "I" as "Z", so page text read with the wrong font
+# misses the activity page indicators.
+PDF_RESOURCES = (
+    b"<< /Font << /F1 << /Type /Font /Subtype /Type1 /BaseFont /Helvetica"
+    b" /Encoding /WinAnsiEncoding >>"
+    b" /F2 << /Type /Font /Subtype /Type1 /BaseFont /Helvetica"
+    b" /Encoding << /Type /Encoding /BaseEncoding /WinAnsiEncoding"
+    b" /Differences [65 /Z 67 /Z 73 /Z] >> >> >>"
+    b" /XObject << /Im1 << /Type /XObject /Subtype /Image >>"
+    b" /Fm1 << /Type /XObject /Subtype /Form >> >> >>"
+)
+
+
+def page_stream(strings):
+    literals = [
+        string.replace("(", "\\(").replace(")", "\\)").encode("latin1")
+        for string in strings
+    ]
+    return b"BT /F1 12 Tf " + b" ".join(b"(%s) Tj" % s for s in literals) + b" ET"
+
+
+def write_pdf(file_path, page_streams):
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None]
+    kids = []
+    for stream in page_streams:
+        kids.append(b"%d 0 R" % (len(objects) + 1))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources "
+            + PDF_RESOURCES
+            + b" /Contents %d 0 R >>" % (len(objects) + 2)
+        )
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(kids),
+        len(kids),
+    )
+
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref_offset = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref_offset,
+    )
+    with open(file_path, "wb") as fd:
+        fd.write(data)
+
+
+def scan_pages(tmp_path, page_streams):
+    file_path = tmp_path / "statement.pdf"
+    write_pdf(file_path, page_streams)
+
+    parser = Parser(None)
+    results = []
+    with open(file_path, "rb") as fd:
+        viewer = SimplePDFViewer(fd)
+        for index in range(len(page_streams)):
+            if index:
+                viewer.next()
+            results.append(parser.may_contain_activities(viewer))
+    return results
+
+
+def test_may_contain_activities(tmp_path):
+    assert scan_pages(
+        tmp_path,
+        [
+            page_stream(["ACTIVITY"] + PAGE_STRINGS),
+            page_stream(["Disclaimer", "Statements are not tax advice."]),
+            b"BT /F1 12 Tf <4143544956495459> Tj ET",
+            b"BT /F1 12 Tf (Balance Summary) Tj ET",
+        ],
+    ) == [True, False, True, True]
+
+
+def test_may_contain_activities_restores_font(tmp_path):
+    assert scan_pages(
+        tmp_path,
+        [
+            b"BT /F1 12 Tf q /F2 12 Tf (Page 2) Tj Q (ACTIVITY) Tj ET",
+            b"q BT /F2 12 Tf (Page 3) Tj ET Q BT (Equity) Tj ET",
+            b"BT /F2 12 Tf (ACTIVITY) Tj ET",
+        ],
+    ) == [True, True, False]
+
+
+def test_may_contain_activities_renders_unscannable_pages(tmp_path):
+    assert scan_pages(
+        tmp_path,
+        [
+            b"BI /W 1 /H 1 /CS /G /BPC 8 ID \x00 EI BT /F1 12 Tf (Disclaimer) Tj ET",
+            b"/Fm1 Do BT /F1 12 Tf (Disclaimer) Tj ET",
+            b"q /Im1 Do Q BT /F1 12 Tf (Disclaimer) Tj ET",
+            b"Q BT /F1 12 Tf (Disclaimer) Tj ET",
+        ],
+    ) == [True, True, False, True]
+
+
+def test_read_activities_stops_after_sweep_activity(tmp_path):
+    file_path = tmp_path / "statement.pdf"
+    write_pdf(
+        file_path,
+        [
+            page_stream(["Disclaimer"]),
+            page_stream(["ACTIVITY"] + PAGE_STRINGS[:17]),
+            page_stream(["ACTIVITY"] + PAGE_STRINGS[17:] + ["SWEEP ACTIVITY", "x"]),
+            page_stream(["ACTIVITY"] + PAGE_STRINGS[8:17]),
+        ],
+    )
+
+    activities = Parser(None).read_activities(str(file_path))
+
+    assert [activity["activity_type"] for activity in activities] == [
+        "BUY",
+        "CDEP",
+        "SELL",
+    ]
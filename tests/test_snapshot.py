@@ -0,0 +1,117 @@
+import csv
+import decimal
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from insurrector import MFCR_DATE_FORMAT
+from insurrector.calculators.ledger import LotLedger
+from insurrector.calculators.snapshot import (
+    get_snapshot_state,
+    load_snapshot,
+    save_snapshot,
+    split_statements,
+)
+from insurrector.process import ProcessCzechia
+from insurrector.records import Activity, Lot
+
+CSV_HEADER = "Trade Date,Activity Type,Company,Symbol,Quantity,Price,Amount"
+CSV_ROWS = [
+    "02.01.2020,BUY,Apple,AAPL,10,300,3000",
+    "03.01.2020,BUY,Microsoft,MSFT,5,150,750",
+    "04.02.2020,SELL,Apple,AAPL,-4,320,1280",
+    "05.03.2020,BUY,Apple,AAPL,6,250,1500",
+    "06.04.2020,SELL,Microsoft,MSFT,-2,170,340",
+    "07.05.2020,SELL,Apple,AAPL,-8,310,2480",
+    "08.06.2020,BUY,Tesla,TSLA,3,400,1200",
+    "09.07.2020,SELL,Microsoft,MSFT,-3,180,540",
+    "10.08.2020,SELL,Tesla,TSLA,-1,450,450",
+    "11.09.2020,SELL,Apple,AAPL,-4,330,1320",
+]
+CUTOFF_DATE = datetime(2020, 4, 30)
+
+
+def test_snapshot_round_trip(tmp_path):
+    lot = Lot(
+        decimal.Decimal("300.25"),
+        decimal.Decimal("22.451"),
+        decimal.Decimal("2.5"),
+        datetime(2020, 1, 2),
+    )
+    ssp_surrendered_data = {
+        "TSLA": {"quantity": decimal.Decimal(5), "price": decimal.Decimal("80.5")}
+    }
+    file_path = str(tmp_path / "snapshot.json")
+    save_snapshot(
+        file_path,
+        CUTOFF_DATE,
+        {"csv": get_snapshot_state({"AAPL": LotLedger([lot])}, ssp_surrendered_data)},
+    )
+
+    cutoff_date, states = load_snapshot(file_path)
+
+    purchases, loaded_ssp_surrendered_data = states["csv"]
+    assert cutoff_date == CUTOFF_DATE
+    assert [loaded_lot.to_row() for loaded_lot in purchases["AAPL"]] == [lot.to_row()]
+    assert type(next(iter(purchases["AAPL"])).trade_date) is datetime
+    assert loaded_ssp_surrendered_data == ssp_surrendered_data
+    assert type(loaded_ssp_surrendered_data["TSLA"]["price"]) is decimal.Decimal
+
+
+def test_snapshot_wrong_version(tmp_path):
+    file_path = str(tmp_path / "snapshot.json")
+    save_snapshot(file_path, CUTOFF_DATE, {})
+    with open(file_path, "r") as fd:
+        snapshot = json.load(fd)
+    snapshot["version"] += 1
+    with open(file_path, "w") as fd:
+        json.dump(snapshot, fd)
+
+    with pytest.raises(SystemExit):
+        load_snapshot(file_path)
+
+
+def test_split_statements_out_of_order():
+    statements = [
+        Activity(trade_date=datetime(2020, 5, 1)),
+        Activity(trade_date=datetime(2020, 4, 1)),
+    ]
+
+    with pytest.raises(SystemExit):
+        split_statements(statements, CUTOFF_DATE)
+
+
+def run_process(tmp_path, name, jobs, **kwargs):
+    input_dir = tmp_path / "in"
+    if not input_dir.exists():
+        input_dir.mkdir()
+        with open(input_dir / "statements.csv", "w") as fd:
+            fd.write("\n".join([CSV_HEADER] + CSV_ROWS) + "\n")
+
+    output_dir = str(tmp_path / name)
+    ProcessCzechia(
+        str(input_dir), output_dir, ["csv"], False, jobs=jobs, use_cache=False, **kwargs
+    ).process()
+    with open(os.path.join(output_dir, "sales.csv")) as fd:
+        return list(csv.reader(fd))
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_resume_from_snapshot_matches_full_run(tmp_path, jobs):
+    snapshot_path = str(tmp_path / "snapshot.json")
+    full_sales = run_process(
+        tmp_path, "full", jobs, snapshot_out=snapshot_path, snapshot_date=CUTOFF_DATE
+    )
+    resumed_sales = run_process(tmp_path, "resumed", jobs, snapshot_in=snapshot_path)
+
+    header, full_sales = full_sales[0], full_sales[1:]
+    trade_date_index = header.index("Trade Date")
+    sales_after = [
+        sale
+        for sale in full_sales
+        if datetime.strptime(sale[trade_date_index], MFCR_DATE_FORMAT) > CUTOFF_DATE
+    ]
+    assert len(sales_after) == 5
+    assert resumed_sales == [header] + sales_after
@@ -0,0 +1,106 @@
+import csv
+import os
+
+from insurrector.parsers.csv import Parser
+from insurrector.process import ProcessCzechia
+from insurrector.watch import WATCH_STALE_SUFFIX, StatementsWatcher
+
+CSV_HEADER = "Trade Date,Activity Type,Company,Symbol,Quantity,Price,Amount"
+
+
+def write_statement(file_path, rows):
+    with open(file_path, "w") as fd:
+        fd.write("\n".join([CSV_HEADER] + rows) + "\n")
+
+
+def create_watcher(tmp_path):
+    input_dir = tmp_path / "in"
+    input_dir.mkdir()
+    write_statement(
+        input_dir / "a.csv",
+        [
+            "02.01.2020,BUY,Apple,AAPL,10,300,3000",
+            "03.03.2020,SELL,Apple,AAPL,-4,280,1120",
+        ],
+    )
+    write_statement(input_dir / "b.csv", ["02.01.2020,BUY,Microsoft,MSFT,3,150,450"])
+    process = ProcessCzechia(
+        str(input_dir), str(tmp_path / "out"), ["csv"], False, use_cache=False
+    )
+    return input_dir, StatementsWatcher(process)
+
+
+def read_sales(watcher):
+    with open(os.path.join(watcher.process.output_dir, "sales.csv")) as fd:
+        return [row["Symbol"] for row in csv.DictReader(fd)]
+
+
+def record_parsed_files(monkeypatch):
+    parsed_files = []
+    map_statement_files = Parser.map_statement_files
+
+    def record(self, func, statement_files):
+        parsed_files.extend(os.path.basename(path) for path in statement_files)
+        return map_statement_files(self, func, statement_files)
+
+    monkeypatch.setattr(Parser, "map_statement_files", record)
+    return parsed_files
+
+
+def test_watch_reparses_changed_files(tmp_path, monkeypatch):
+    input_dir, watcher = create_watcher(tmp_path)
+    parsed_files = record_parsed_files(monkeypatch)
+
+    watcher.update(force=True)
+    assert sorted(parsed_files) == ["a.csv", "b.csv"]
+    assert read_sales(watcher) == ["AAPL"]
+
+    parsed_files.clear()
+    watcher.update()
+    assert parsed_files == []
+
+    write_statement(
+        input_dir / "b.csv",
+        [
+            "02.01.2020,BUY,Microsoft,MSFT,3,150,450",
+            "04.03.2020,SELL,Microsoft,MSFT,-1,170,170",
+        ],
+    )
+    write_statement(input_dir / "c.csv", ["02.01.2020,BUY,Tesla,TSLA,1,400,400"])
+    watcher.update()
+    assert sorted(parsed_files) == ["b.csv", "c.csv"]
+    assert sorted(read_sales(watcher)) == ["AAPL", "MSFT"]
+
+    parsed_files.clear()
+    os.unlink(input_dir / "a.csv")
+    watcher.update()
+    assert parsed_files == []
+    assert read_sales(watcher) == ["MSFT"]
+    assert sorted(
+        os.path.basename(path) for path in watcher.load_manifest()["csv"]
+    ) == ["b.csv", "c.csv"]
+
+
+def test_watch_keeps_pending_on_unsupported_activities(tmp_path, monkeypatch):
+    input_dir, watcher = create_watcher(tmp_path)
+    watcher.update(force=True)
+    manifest = watcher.load_manifest()
+    sales_path = os.path.join(watcher.process.output_dir, "sales.csv")
+
+    monkeypatch.setattr(
+        Parser, "get_unsupported_activity_types", staticmethod(lambda _: ["SPLIT"])
+    )
+    write_statement(input_dir / "c.csv", ["02.01.2020,BUY,Tesla,TSLA,1,400,400"])
+    watcher.update()
+
+    assert watcher.pending
+    assert not os.path.exists(sales_path)
+    assert os.path.exists(sales_path + WATCH_STALE_SUFFIX)
+    assert watcher.load_manifest() == manifest
+
+    monkeypatch.undo()
+    watcher.update()
+
+    assert not watcher.pending
+    assert read_sales(watcher) == ["AAPL"]
+    assert len(watcher.load_manifest()["csv"]) == 3